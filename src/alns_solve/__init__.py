@@ -1,5 +1,16 @@
-from .run_alns import run_alns
+from common.lazy_exports import lazy_exports
 
-__all__ = [
-    "run_alns",
-]
\ No newline at end of file
+# Exported name -> submodule. The submodules are imported on first access, so loading the
+# config does not pull in the alns library.
+_EXPORTS = {
+    "run_alns": ".run_alns",
+    "load_alns_config": ".config",
+    "run_island_alns": ".island_alns",
+    "run_decomposition": ".decomposition",
+    "run_racing": ".racing",
+    "reoptimize": ".reoptimize",
+    "get_lower_bound": ".lower_bound",
+}
+
+__all__ = list(_EXPORTS)
+lazy_exports(__name__)
@@ -7,6 +7,7 @@ class ALNSState:
         self.instance = instance
         self.routes = routes
         self.unassigned = unassigned if unassigned else []
+        self.rejected = False # set by a repair operator that stopped early, see early_abort.py
 
     def copy(self) -> 'ALNSState':
         return ALNSState(
@@ -16,6 +17,8 @@ class ALNSState:
         )
 
     def objective(self) -> float:
+        if self.rejected: # incomplete, it must not be accepted
+            return float("inf")
         return sum(compute_route_distance(self.instance, route) for route in self.routes)
 
     @property
@@ -0,0 +1,7 @@
+from pathlib import Path
+import json
+
+def load_alns_config() -> dict:
+    config_path = Path(__file__).parent.parent / "config" / "alns_config.json"
+    with open(config_path) as f:
+        return json.load(f)
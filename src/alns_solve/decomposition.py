@@ -0,0 +1,153 @@
+from concurrent.futures import ProcessPoolExecutor
+import copy
+import math
+import time
+
+from data.log_saver import save_log
+from data.station_reduction import build_station_candidates
+from model.instance import EVRPTWInstance
+from model.solution import Solution
+from common.utils import compute_route_distance, served_customers
+from .run_alns import run_alns, load_alns_config
+
+def run_decomposition(instance: EVRPTWInstance, initial_solution: Solution, log_path: str = None, stats: dict = None, config: dict = None) -> Solution:
+    """Optimizes a large instance by decomposing the solution into sub-problems of angularly neighbouring routes.
+    Each round sorts the routes by the polar angle of their customers around the depot and cuts the sequence into
+    groups of routes. Every group becomes a sub-instance (depot, all stations and the customers of the group) that is
+    optimized with ALNS in a separate process. Improved groups replace their routes in the solution, if they serve
+    exactly the customers of the group (a repair can leave customers unassigned, they must not get lost).
+    The cut points are rotated from round to round, so customers near a boundary end up in the same group later.
+    The settings are read from the "decomposition" section of the ALNS config.
+    """
+    if config is None:
+        config = load_alns_config()
+
+    dec_cfg = config["decomposition"]
+    routes_per_subproblem = dec_cfg["routes_per_subproblem"]
+    num_rounds = dec_cfg["num_rounds"]
+
+    routes = [list(r) for r in initial_solution.routes]
+    rounds_log = []
+
+    t_start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=dec_cfg["num_workers"]) as executor:
+        for round_idx in range(num_rounds):
+            offset = (round_idx * max(1, routes_per_subproblem // 2)) % max(1, len(routes))
+            groups = angular_route_groups(instance, routes, routes_per_subproblem, offset)
+
+            tasks = []
+            for group_idx, group in enumerate(groups):
+                group_routes = [routes[i] for i in group]
+                customers = [node for route in group_routes for node in route if instance.is_customer(node)]
+                sub_instance = build_sub_instance(instance, customers)
+                to_sub = {node: i for i, node in enumerate(sub_instance.node_map)}
+                sub_routes = [[to_sub[node] for node in route] for route in group_routes]
+                tasks.append((sub_instance, sub_routes, subproblem_config(config, round_idx, group_idx)))
+
+            results = list(executor.map(optimize_subproblem, tasks))
+
+            new_routes = []
+            improvement = 0.0
+            incomplete = 0
+            for group, (sub_instance, _, _), sub_routes in zip(groups, tasks, results):
+                old_group_routes = [routes[i] for i in group]
+                node_map = sub_instance.node_map
+                new_group_routes = [[node_map[node] for node in route] for route in sub_routes]
+
+                old_cost = sum(compute_route_distance(instance, r) for r in old_group_routes)
+                new_cost = sum(compute_route_distance(instance, r) for r in new_group_routes)
+                complete = served_customers(instance, new_group_routes) == served_customers(instance, old_group_routes)
+                incomplete += not complete
+                if complete and new_cost < old_cost:
+                    new_routes.extend(new_group_routes)
+                    improvement += old_cost - new_cost
+                else:
+                    new_routes.extend(old_group_routes)
+
+            routes = new_routes
+            rounds_log.append({
+                "round": round_idx,
+                "num_subproblems": len(groups),
+                "improvement": improvement,
+                "incomplete_subproblems": incomplete,
+                "total_distance": sum(compute_route_distance(instance, r) for r in routes),
+            })
+
+    total_runtime = time.perf_counter() - t_start
+
+    best_solution = Solution(routes=routes)
+    best_solution.compute_total_distance(instance)
+
+    if stats is not None:
+        stats["total_iterations"] = num_rounds
+        stats["total_time"] = total_runtime
+
+    if log_path:
+        log_data = {
+            "rounds": rounds_log,
+            "total_runtime": total_runtime,
+            "best_solution": {
+                "total_distance": best_solution.total_distance,
+                "routes": best_solution.routes
+            }
+        }
+        save_log(log_path, log_data)
+
+    return best_solution
+
+def angular_route_groups(instance: EVRPTWInstance, routes: list[list[int]], group_size: int, offset: int) -> list[list[int]]:
+    """Sorts the route indices by the polar angle of the route's customer centroid and cuts them into groups."""
+    depot = instance.nodes[instance.depot_id].coordinates
+
+    def angle(route: list[int]) -> float:
+        customers = [instance.nodes[node].coordinates for node in route if instance.is_customer(node)]
+        if not customers:
+            return 0.0
+        x = sum(c.x for c in customers) / len(customers)
+        y = sum(c.y for c in customers) / len(customers)
+        return math.atan2(y - depot.y, x - depot.x)
+
+    order = sorted(range(len(routes)), key=lambda i: angle(routes[i]))
+    order = order[offset:] + order[:offset]
+    return [order[i:i + group_size] for i in range(0, len(order), group_size)]
+
+def build_sub_instance(instance: EVRPTWInstance, customers: list[int]) -> EVRPTWInstance:
+    """Builds the sub-instance of the depot, all stations and the given customers.
+    The original node index of every sub-instance node is stored in its node_map attribute.
+    """
+    node_map = [instance.depot_id] + list(instance.station_ids) + list(customers)
+    m = len(node_map)
+    distances = [0.0] * (m * m)
+    for i, u in enumerate(node_map):
+        for j, v in enumerate(node_map):
+            distances[i * m + j] = instance.distance(u, v)
+
+    sub_instance = EVRPTWInstance(
+        num_stations=len(instance.station_ids),
+        num_customers=len(customers),
+        num_nodes=m,
+        nodes=[instance.nodes[node] for node in node_map],
+        vehicle_load_capacity=instance.vehicle_load_capacity,
+        vehicle_energy_capacity=instance.vehicle_energy_capacity,
+        vehicle_energy_consumption=instance.vehicle_energy_consumption,
+        inverse_recharging_rate=instance.inverse_recharging_rate,
+        distances=distances
+    )
+    sub_instance.node_map = node_map
+    build_station_candidates(sub_instance)
+    return sub_instance
+
+def subproblem_config(config: dict, round_idx: int, group_idx: int) -> dict:
+    """ALNS config of a sub-problem: fewer iterations, its own seed and no nested process pools."""
+    sub_config = copy.deepcopy(config)
+    sub_config["num_iterations"] = config["decomposition"]["iterations_per_subproblem"]
+    sub_config["seed"] = config["seed"] + 1000 * round_idx + group_idx
+    sub_config.get("parallel_repair", {})["enabled"] = False
+    return sub_config
+
+def optimize_subproblem(task: tuple) -> list[list[int]]:
+    """Worker task: runs ALNS on a sub-instance and returns its best routes (in sub-instance indices)."""
+    sub_instance, sub_routes, sub_config = task
+    solution = Solution(routes=sub_routes)
+    solution.compute_total_distance(sub_instance)
+    return run_alns(sub_instance, solution, config=sub_config).routes
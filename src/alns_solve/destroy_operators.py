@@ -1,6 +1,8 @@
+import heapq
+
 from .alns_state import ALNSState
 from model.instance import EVRPTWInstance
-from common.utils import compute_route_distance
+from .relatedness import get_relatedness_index
 
 def random_customer_removal(state: ALNSState, rnd, **kwargs) -> ALNSState:
     """Randomly removes a fraction of customers from the solution."""
@@ -36,16 +38,14 @@ def nearest_customers_removal(state: ALNSState, rnd, **kwargs) -> ALNSState:
     destroyed = state.copy()
 
     customer_nodes = instance.customer_ids
+    index = get_relatedness_index(instance, kwargs.get("relatedness"))
 
     central_customer = rnd.choice(customer_nodes)
 
-    others = [n for n in customer_nodes if n != central_customer]
-    others.sort(key=lambda n: instance.distance(central_customer, n))
-
     max_to_remove = max(1, int(len(customer_nodes) * xi))
     num_to_remove = rnd.integers(1, max_to_remove + 1)
 
-    to_remove = [central_customer] + others[:num_to_remove - 1]
+    to_remove = [central_customer] + index.nearest_customers(central_customer, int(num_to_remove) - 1)
 
     for node in to_remove:
         removed = False
@@ -109,6 +109,101 @@ def worst_customer_removal(state: ALNSState, rnd, **kwargs) -> ALNSState:
     destroyed.routes = [r for r in destroyed.routes if len(r) > 2]
     return destroyed
 
+def shaw_removal(state: ALNSState, rnd, **kwargs) -> ALNSState:
+    """Removes related customers (Shaw removal): distance, ready time and demand relatedness.
+    Each step picks an already removed customer and removes one of its most related customers (with a bit of randomness).
+    """
+    xi = kwargs.get("xi", 0.2)
+    p = kwargs.get("p", 6)
+    destroyed = state.copy()
+    instance: EVRPTWInstance = destroyed.instance
+    index = get_relatedness_index(instance, kwargs.get("relatedness"))
+
+    route_of = routes_of_customers(instance, destroyed.routes)
+    if not route_of:
+        return destroyed
+
+    routed_customers = list(route_of)
+    max_to_remove = max(1, int(len(routed_customers) * xi))
+    num_to_remove = rnd.integers(1, max_to_remove + 1)
+
+    removed = [routed_customers[rnd.integers(len(routed_customers))]]
+    removed_set = set(removed)
+    while len(removed) < num_to_remove:
+        reference = removed[rnd.integers(len(removed))]
+        candidates = [c for c in index.related_customers(reference) if c in route_of and c not in removed_set]
+        if not candidates:
+            break
+
+        customer = candidates[int(rnd.random() ** p * len(candidates))]
+        removed.append(customer)
+        removed_set.add(customer)
+
+    remove_customers(destroyed, route_of, removed)
+    return destroyed
+
+def string_removal(state: ALNSState, rnd, **kwargs) -> ALNSState:
+    """Slack induced string removal (SISR, Christiaens & Vanden Berghe): removes strings of consecutive customers
+    from the routes of a random customer and its nearest neighbours, at most one string per route.
+    """
+    string_cfg = kwargs.get("string_removal") or {}
+    max_string_length = string_cfg.get("max_string_length", 10)
+    avg_removed = string_cfg.get("avg_removed", 10)
+    destroyed = state.copy()
+    instance: EVRPTWInstance = destroyed.instance
+    index = get_relatedness_index(instance, kwargs.get("relatedness"))
+
+    route_of = routes_of_customers(instance, destroyed.routes)
+    if not route_of:
+        return destroyed
+
+    route_customers = [[node for node in route if instance.is_customer(node)] for route in destroyed.routes]
+    non_empty = [customers for customers in route_customers if customers]
+    string_length_limit = min(max_string_length, sum(len(c) for c in non_empty) / len(non_empty))
+    max_strings = 4 * avg_removed / (1 + string_length_limit) - 1
+    num_strings = int(rnd.uniform(1, max_strings + 1))
+
+    routed_customers = list(route_of)
+    seed_customer = routed_customers[rnd.integers(len(routed_customers))]
+
+    removed = []
+    ruined_routes = set()
+    for customer in [seed_customer] + index.nearest_customers(seed_customer):
+        if len(ruined_routes) >= num_strings:
+            break
+
+        route_idx = route_of.get(customer)
+        if route_idx is None or route_idx in ruined_routes:
+            continue
+
+        customers = route_customers[route_idx]
+        length = int(rnd.uniform(1, min(len(customers), string_length_limit) + 1))
+        position = customers.index(customer)
+        start = rnd.integers(max(0, position - length + 1), min(position, len(customers) - length) + 1)
+
+        removed.extend(customers[start:start + length])
+        ruined_routes.add(route_idx)
+
+    remove_customers(destroyed, route_of, removed)
+    return destroyed
+
+def routes_of_customers(instance: EVRPTWInstance, routes: list[list[int]]) -> dict[int, int]:
+    """Maps every routed customer to the index of its route."""
+    return {
+        node: route_idx
+        for route_idx, route in enumerate(routes)
+        for node in route
+        if instance.is_customer(node)
+    }
+
+def remove_customers(destroyed: ALNSState, route_of: dict[int, int], customers: list[int]) -> None:
+    """Removes the customers from their routes, adds them to the unassigned list and drops the emptied routes."""
+    for customer in customers:
+        destroyed.routes[route_of[customer]].remove(customer)
+        destroyed.unassigned.append(customer)
+
+    destroyed.routes = [r for r in destroyed.routes if len(r) > 2]
+
 def worst_station_removal(state: ALNSState, rnd, **kwargs) -> ALNSState:
     xi = kwargs.get("xi", 0.2)
     p = kwargs.get("p", 6)
@@ -117,15 +212,14 @@ def worst_station_removal(state: ALNSState, rnd, **kwargs) -> ALNSState:
 
     num_to_remove = rnd.integers(1, max(1, int(len(destroyed.routes)) * xi) + 1)
     removed_stations = set()
+    removable_stations = StationRemovalQueue(instance, destroyed.routes)
 
     for _ in range(num_to_remove):
-        removable_stations = get_removable_stations(instance, destroyed.routes)
         if not removable_stations:
             break
 
-        removable_stations.sort(reverse=True)
         index = int(rnd.random() ** p * len(removable_stations))
-        _, route_idx, station_index, station = removable_stations.pop(index)
+        _, route_idx, station_index, station = removable_stations.select(index)
 
         if station in removed_stations:
             continue
@@ -140,29 +234,17 @@ def worst_station_removal(state: ALNSState, rnd, **kwargs) -> ALNSState:
             start_index -= 1
         start_index = max(0, start_index + 1)
 
-        # Find end of the segment
-        end_index = station_index + 1
-        while end_index < len(route):
-            if instance.is_station(route[end_index]) or instance.is_depot(route[end_index]):
-                break
-            end_index += 1
-        end_index = min(len(route) - 1, end_index - 1)
-
         # Remove station
         route.pop(station_index)
         removed_stations.add(station)
 
-        # Adjust end index if it shifted due to pop
-        if station_index < end_index:
-            end_index -= 1
-
         remove_customers_until_energy_feasible(
             instance,
             route,
             start_index,
-            end_index,
             destroyed.unassigned,
         )
+        removable_stations.update_route(route_idx, route)
 
         # Final energy check
         #if not check_energy_feasibility(instance, route):
@@ -171,6 +253,64 @@ def worst_station_removal(state: ALNSState, rnd, **kwargs) -> ALNSState:
     destroyed.routes = [r for r in destroyed.routes if len(r) > 2]
     return destroyed
 
+class StationRemovalQueue:
+    """Stations of the routes ordered by removal gain, largest first (ties as in a reverse sorted
+    (gain, route_idx, position, station) list). The gains come from the neighbours in O(1).
+    Entries are kept in a heap. When a route changes, its old entries are invalidated by a version
+    counter and dropped lazily, and only the stations of that route are pushed again.
+    """
+    def __init__(self, instance: EVRPTWInstance, routes: list[list[int]]) -> None:
+        self.instance = instance
+        self._heap = []
+        self._versions = [0] * len(routes)
+        self._counts = [0] * len(routes)
+        self._size = 0
+        for route_idx, route in enumerate(routes):
+            self._add_route(route_idx, route)
+        heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def update_route(self, route_idx: int, route: list[int]) -> None:
+        """Replaces the entries of a changed route."""
+        self._versions[route_idx] += 1
+        self._size -= self._counts[route_idx]
+        self._add_route(route_idx, route, push=True)
+
+    def select(self, rank: int) -> tuple[float, int, int, int]:
+        """Returns (gain, route_idx, position, station) of the entry with the given rank (0 = largest gain)."""
+        popped = []
+        while len(popped) <= rank:
+            entry = heapq.heappop(self._heap)
+            if entry[4] == self._versions[-entry[1]]: # stale entries are dropped
+                popped.append(entry)
+
+        for entry in popped:
+            heapq.heappush(self._heap, entry)
+
+        neg_gain, neg_route_idx, neg_position, neg_station, _ = popped[-1]
+        return -neg_gain, -neg_route_idx, -neg_position, -neg_station
+
+    def _add_route(self, route_idx: int, route: list[int], push: bool = False) -> None:
+        version = self._versions[route_idx]
+        count = 0
+        for i in range(1, len(route) - 1):
+            node = route[i]
+            if not self.instance.is_station(node):
+                continue
+
+            gain = calculate_removal_gain(self.instance, route, i)
+            entry = (-gain, -route_idx, -i, -node, version)
+            if push:
+                heapq.heappush(self._heap, entry)
+            else:
+                self._heap.append(entry)
+            count += 1
+
+        self._counts[route_idx] = count
+        self._size += count
+
 def get_removable_stations(instance: EVRPTWInstance, routes: list[list[int]]) -> list[tuple[float, int, int, int]]:
     """Get all removable stations from the routes with their gain."""
     removable_stations = []
@@ -181,43 +321,40 @@ def get_removable_stations(instance: EVRPTWInstance, routes: list[list[int]]) ->
             if not instance.is_station(node):
                 continue
 
-            new_route = route[:i] + route[i + 1:]
-            old_cost = compute_route_distance(instance, route)
-            new_cost = compute_route_distance(instance, new_route)
-            gain = old_cost - new_cost
-
+            gain = calculate_removal_gain(instance, route, i)
             removable_stations.append((gain, route_idx, i, node))
 
     return removable_stations
 
-def remove_customers_until_energy_feasible(instance: EVRPTWInstance, route: list[int], start_index: int, end_index: int, unassigned: list[int]) -> None:
-    """Remove customers from a certain segment of the route until it becomes energy feasible."""
-    while not check_energy_feasibility(instance, route):
-        removed = False
+def remove_customers_until_energy_feasible(instance: EVRPTWInstance, route: list[int], start_index: int, unassigned: list[int]) -> None:
+    """Removes the shortest suffix of customers of the segment starting at start_index that makes the segment energy feasible.
+    The segment runs from the station/depot before start_index to the next station/depot. The state of charge of every
+    prefix is computed in one pass, the kept prefix is the longest one from which the end of the segment is reachable.
+    The removed customers are appended to unassigned from the last one backwards.
+    """
+    end_index = start_index
+    while end_index < len(route) and instance.is_customer(route[end_index]):
+        end_index += 1
+    if end_index == len(route): # no station/depot closes the segment
+        return
+    segment_end = route[end_index]
 
-        for i in range(end_index, start_index - 1, -1):
-            node = route[i]
-            if instance.is_customer(node):
-                unassigned.append(node)
-                route.pop(i)
-                end_index = min(end_index, len(route) - 1)
-                removed = True
-                break
-
-        if removed:
-            continue
+    soc = instance.vehicle_energy_capacity
+    last_node = route[start_index - 1]
+    num_kept = 0
+    for i in range(start_index, end_index):
+        node = route[i]
+        energy_used = instance.energy_consumption(last_node, node)
+        if soc - energy_used < 0:
+            break
+        soc -= energy_used
 
-        for i in range(start_index, min(end_index + 1, len(route))):
-            node = route[i]
-            if instance.is_customer(node):
-                unassigned.append(node)
-                route.pop(i)
-                end_index = min(end_index, len(route) - 1)
-                removed = True
-                break
+        if soc - instance.energy_consumption(node, segment_end) >= 0:
+            num_kept = i - start_index + 1
+        last_node = node
 
-        if not removed:
-            break
+    for i in range(end_index - 1, start_index + num_kept - 1, -1):
+        unassigned.append(route.pop(i))
 
 def check_energy_feasibility(instance: EVRPTWInstance, route: list[int]) -> bool:
     """Check if the given route is feasible in terms of energy consumption."""
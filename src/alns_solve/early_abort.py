@@ -0,0 +1,79 @@
+import math
+
+import numpy as np
+from alns.accept import SimulatedAnnealing
+from alns.accept.update import update
+
+from .alns_state import ALNSState
+
+# Off by default: on c103_21 and rc106_21 (5000 iterations) only 2.7-4.4% of the repairs were aborted, skipping
+# 1-2 insertions each, and the CPU time difference was within run-to-run noise, so enabling it gives no speedup.
+DEFAULT_EARLY_ABORT = {
+    "enabled": False,
+}
+
+class ThresholdAnnealing(SimulatedAnnealing):
+    """Simulated annealing with the random draw u of the acceptance made before the candidate exists.
+    The candidate is accepted iff exp((f(current) - f(candidate)) / T) >= u, i.e. iff its cost is at most
+    threshold() = f(current) - T * ln(u), which the repair operators can use to stop early.
+    u is drawn from the criterion's own RNG. The acceptance still draws (and discards) one number from the ALNS RNG,
+    as the plain SimulatedAnnealing does, so that stream advances in the same way; which candidates are accepted,
+    and so the results, differ from it.
+    """
+    def __init__(self, *args, rng: np.random.Generator, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._rng = rng
+        self._u = None
+
+    def _draw(self) -> float:
+        if self._u is None:
+            self._u = self._rng.random()
+        return self._u
+
+    def threshold(self, current_cost: float) -> float:
+        """Returns the highest candidate cost the next acceptance will accept."""
+        u = self._draw()
+        return current_cost - self._temperature * math.log(u) if u > 0 else math.inf
+
+    def __call__(self, rng, best, current, candidate) -> bool:
+        u = self._draw()
+        self._u = None
+        rng.random() # keeps the ALNS RNG in step with SimulatedAnnealing
+        probability = np.exp((current.objective() - candidate.objective()) / self._temperature)
+        self._temperature = max(self.end_temperature, update(self._temperature, self.step, self.method))
+        return probability >= u
+
+class EarlyAbort:
+    """Passes the acceptance threshold of the iteration to the repair operators as abort_threshold.
+    A repair operator stops as soon as the cost of its partial solution plus a lower bound of the remaining insertions
+    exceeds the threshold, and returns the state flagged as rejected (see ALNSState.rejected), which the acceptance
+    rejects; a rejected candidate can never be a new best, as the threshold is at least the current cost.
+    With the local search hook, the threshold is raised to the hook's trigger cost, so candidates it would improve are
+    completed. The repairs and the aborted ones (with the insertions they skipped) are counted in stats.
+    """
+    def __init__(self, criterion: ThresholdAnnealing, hook=None) -> None:
+        self.criterion = criterion
+        self.hook = hook
+        self._current_cost = math.inf
+        self.stats = {"repairs": 0, "aborted": 0, "skipped_insertions": 0}
+
+    def wrap_destroy(self, operator):
+        def destroy(state: ALNSState, rng, **kwargs) -> ALNSState:
+            self._current_cost = state.objective()
+            return operator(state, rng, **kwargs)
+        destroy.__name__ = operator.__name__
+        return destroy
+
+    def wrap_repair(self, operator):
+        def repair(state: ALNSState, rng, **kwargs) -> ALNSState:
+            threshold = self.criterion.threshold(self._current_cost)
+            if self.hook is not None:
+                threshold = max(threshold, self.hook.trigger_cost())
+            candidate = operator(state, rng, abort_threshold=threshold, **kwargs)
+            self.stats["repairs"] += 1
+            if candidate.rejected:
+                self.stats["aborted"] += 1
+                self.stats["skipped_insertions"] += len(candidate.unassigned)
+            return candidate
+        repair.__name__ = operator.__name__
+        return repair
@@ -0,0 +1,185 @@
+from concurrent.futures import ProcessPoolExecutor
+from collections import defaultdict
+import copy
+import time
+import numpy.random as rnd
+
+from alns.stop import MaxIterations
+
+from data.log_saver import save_log
+from data.shared_instance import publish_instance, init_worker, worker_instance
+from model.instance import EVRPTWInstance
+from model.solution import Solution
+from .alns_state import ALNSState
+from .run_alns import (
+    OPERATOR_OUTCOME_LABELS,
+    load_alns_config,
+    build_alns,
+    build_selector,
+    build_criterion,
+    temperature_after,
+    operator_statistics,
+    operator_kwargs,
+)
+
+def run_island_alns(instance: EVRPTWInstance, initial_solution: Solution, log_path: str = None, stats: dict = None, config: dict = None,
+                    start_solutions: list[Solution] = None) -> Solution:
+    """Runs several ALNS islands in separate processes (island model).
+    The iterations of every island are split into epochs. After each epoch the islands exchange their best routes:
+    - "best" migration: every island restarts from the global best,
+    - "ring" migration: island i restarts from the best of island i-1 if that is better than its own.
+    The simulated annealing schedule and the operator weights of an island continue across the epochs.
+    The island settings are read from the "islands" section of the ALNS config.
+    If start_solutions is given (e.g. the top solutions of the construction portfolio), island i starts from
+    start_solutions[i % len(start_solutions)] instead of the initial solution.
+    """
+    if config is None:
+        config = load_alns_config()
+
+    island_cfg = config["islands"]
+    num_islands = island_cfg["num_islands"]
+    num_epochs = island_cfg["num_epochs"]
+    migration = island_cfg["migration"]
+    if migration not in ("best", "ring"):
+        raise ValueError(f"Unknown migration: {migration}")
+
+    island_configs = [island_config(config, island) for island in range(num_islands)]
+    iterations_per_epoch = max(1, config["num_iterations"] // num_epochs)
+
+    if not start_solutions:
+        start_solutions = [initial_solution]
+    islands = [
+        {"routes": [list(r) for r in start_solutions[island % len(start_solutions)].routes], "cost": None,
+         "destroy_weights": None, "repair_weights": None}
+        for island in range(num_islands)
+    ]
+    objectives = [[] for _ in range(num_islands)]
+    destroy_counts = defaultdict(lambda: [0, 0, 0, 0])
+    repair_counts = defaultdict(lambda: [0, 0, 0, 0])
+    epoch_bests = []
+
+    start_costs = [solution.compute_total_distance(instance) for solution in start_solutions]
+    best_index = min(range(len(start_solutions)), key=start_costs.__getitem__)
+    best_routes = [list(r) for r in start_solutions[best_index].routes]
+    best_cost = start_costs[best_index]
+
+    t_start = time.perf_counter()
+    with publish_instance(instance) as shared:
+        with ProcessPoolExecutor(max_workers=num_islands, initializer=init_worker, initargs=(shared.handle,)) as executor:
+            for epoch in range(num_epochs):
+                tasks = [
+                    (island, epoch, islands[island], island_configs[island], iterations_per_epoch)
+                    for island in range(num_islands)
+                ]
+                results = list(executor.map(run_island_epoch, tasks))
+
+                for island, result in enumerate(results):
+                    islands[island] = {
+                        "routes": result["best_routes"],
+                        "cost": result["best_cost"],
+                        "destroy_weights": result["destroy_weights"],
+                        "repair_weights": result["repair_weights"],
+                    }
+                    objectives[island].extend(result["objectives"])
+                    for name, counts in result["destroy_counts"].items():
+                        destroy_counts[name] = [a + b for a, b in zip(destroy_counts[name], counts)]
+                    for name, counts in result["repair_counts"].items():
+                        repair_counts[name] = [a + b for a, b in zip(repair_counts[name], counts)]
+
+                    if result["best_cost"] < best_cost:
+                        best_cost = result["best_cost"]
+                        best_routes = result["best_routes"]
+
+                epoch_bests.append(best_cost)
+                migrate(islands, best_routes, best_cost, migration)
+
+    total_runtime = time.perf_counter() - t_start
+
+    best_solution = Solution(routes=[list(r) for r in best_routes])
+    best_solution.compute_total_distance(instance)
+
+    total_iterations = iterations_per_epoch * num_epochs * num_islands
+    if stats is not None:
+        stats["total_iterations"] = total_iterations
+        stats["total_time"] = total_runtime
+
+    if log_path:
+        log_data = {
+            "island_objectives": objectives,
+            "epoch_best_objectives": epoch_bests,
+            **operator_statistics(destroy_counts, repair_counts),
+            "operator_outcome_labels": OPERATOR_OUTCOME_LABELS,
+            "total_runtime": total_runtime,
+            "num_islands": num_islands,
+            "num_epochs": num_epochs,
+            "migration": migration,
+            "num_iterations": total_iterations,
+            "best_solution": {
+                "total_distance": best_solution.total_distance,
+                "routes": best_solution.routes
+            }
+        }
+        save_log(log_path, log_data)
+
+    return best_solution
+
+def island_config(config: dict, island: int) -> dict:
+    """Returns the config of an island: the base config with its own seed and the optional per island overrides."""
+    result = copy.deepcopy(config)
+    result["seed"] = config["seed"] + island
+    overrides = config["islands"].get("overrides", [])
+    if island < len(overrides):
+        for key, value in overrides[island].items():
+            if isinstance(value, dict):
+                result[key].update(value)
+            else:
+                result[key] = value
+    return result
+
+def migrate(islands: list[dict], best_routes: list[list[int]], best_cost: float, migration: str) -> None:
+    """Sets the start routes of the islands for the next epoch."""
+    if migration == "best":
+        for island in islands:
+            island["routes"] = best_routes
+            island["cost"] = best_cost
+        return
+
+    # Ring: compare to the previous island's result of this epoch (before any update)
+    previous = [(island["routes"], island["cost"]) for island in islands]
+    for i, island in enumerate(islands):
+        routes, cost = previous[i - 1]
+        if cost < island["cost"]:
+            island["routes"] = routes
+            island["cost"] = cost
+
+def run_island_epoch(task: tuple) -> dict:
+    """Runs one epoch of one island in a worker process."""
+    island, epoch, island_state, config, num_iterations = task
+    instance = worker_instance()
+
+    alns = build_alns(config, rng=rnd.default_rng([config["seed"], epoch]))
+    selector = build_selector(config)
+    if island_state["destroy_weights"] is not None:
+        selector.destroy_weights[:] = island_state["destroy_weights"]
+        selector.repair_weights[:] = island_state["repair_weights"]
+    criterion = build_criterion(config, start_temperature=temperature_after(config, epoch * num_iterations))
+
+    result = alns.iterate(
+        initial_solution=ALNSState(instance, [list(r) for r in island_state["routes"]]),
+        op_select=selector,
+        accept=criterion,
+        stop=MaxIterations(num_iterations),
+        objective=lambda state: state.cost,
+        **operator_kwargs(config)
+    )
+
+    statistics = result.statistics
+    return {
+        "best_routes": result.best_state.routes,
+        "best_cost": result.best_state.objective(),
+        "destroy_weights": selector.destroy_weights.tolist(),
+        "repair_weights": selector.repair_weights.tolist(),
+        "objectives": statistics.objectives.tolist(),
+        "destroy_counts": dict(statistics.destroy_operator_counts),
+        "repair_counts": dict(statistics.repair_operator_counts),
+    }
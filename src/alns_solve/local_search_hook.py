@@ -0,0 +1,81 @@
+import time
+
+from local_search import local_search
+from model.solution import Solution
+from .alns_state import ALNSState
+
+DEFAULT_LOCAL_SEARCH = {
+    "enabled": False,
+    "trigger_gap": 0.0, # percent: improve candidates within this gap of the best cost (0: new bests only)
+    "max_moves": 20, # relocate moves per call
+    "time_limit": 0.05, # seconds per call
+}
+
+class LocalSearchHook:
+    """Intensification inside ALNS: after the repair, promising candidates (new bests, or within trigger_gap percent of
+    the best) are improved by a move and time budgeted relocate descent on the routes touched by the iteration, i.e.
+    the routes of the candidate that are not in the state the destroy operator started from.
+    The time spent and the gains are counted in stats, apart from the ALNS statistics.
+    """
+    def __init__(self, cfg: dict, best_cost: float) -> None:
+        self.cfg = {**DEFAULT_LOCAL_SEARCH, **(cfg or {})}
+        self.best_cost = best_cost
+        self._current_routes: set[tuple] = set()
+        self.stats = {"calls": 0, "improved": 0, "moves": 0, "gain": 0.0, "time": 0.0}
+
+    def wrap_destroy(self, operator):
+        def destroy(state: ALNSState, rng, **kwargs) -> ALNSState:
+            self._current_routes = {tuple(route) for route in state.routes}
+            return operator(state, rng, **kwargs)
+        destroy.__name__ = operator.__name__
+        return destroy
+
+    def wrap_repair(self, operator):
+        def repair(state: ALNSState, rng, **kwargs) -> ALNSState:
+            candidate = operator(state, rng, **kwargs)
+            cost = candidate.objective()
+            if cost <= self.trigger_cost():
+                cost = self.improve(candidate, cost)
+            self.best_cost = min(self.best_cost, cost)
+            return candidate
+        repair.__name__ = operator.__name__
+        return repair
+
+    def trigger_cost(self) -> float:
+        """Returns the highest candidate cost the local search is run for."""
+        return self.best_cost * (1 + self.cfg["trigger_gap"] / 100)
+
+    def improve(self, candidate: ALNSState, cost: float) -> float:
+        """Runs the local search on the touched routes of the candidate in place and returns the new cost."""
+        touched = [i for i, route in enumerate(candidate.routes) if tuple(route) not in self._current_routes]
+        if len(touched) < 2: # relocate moves customers between routes
+            return cost
+
+        t_start = time.perf_counter()
+        ls_stats = {}
+        steps = 0
+        def should_stop() -> bool: # called before every descent step
+            nonlocal steps
+            if steps >= self.cfg["max_moves"] or time.perf_counter() - t_start > self.cfg["time_limit"]:
+                return True
+            steps += 1
+            return False
+
+        instance = candidate.instance
+        sub_solution = Solution(routes=[candidate.routes[i] for i in touched])
+        before = sub_solution.compute_total_distance(instance)
+        improved = local_search(instance, sub_solution, stats=ls_stats, should_stop=should_stop)
+
+        self.stats["calls"] += 1
+        self.stats["moves"] += ls_stats["total_iterations"]
+        self.stats["time"] += time.perf_counter() - t_start
+        gain = before - improved.total_distance
+        if gain <= 1e-9:
+            return cost
+
+        touched = set(touched)
+        untouched = [route for i, route in enumerate(candidate.routes) if i not in touched]
+        candidate.routes = untouched + [route for route in improved.routes if any(instance.is_customer(node) for node in route)]
+        self.stats["improved"] += 1
+        self.stats["gain"] += gain
+        return cost - gain
@@ -0,0 +1,278 @@
+import math
+import time
+
+import numpy as np
+
+from model.instance import EVRPTWInstance
+
+# Up to this many customers the O(n²) memory bounds (assignment, k-tree) are used, above it the degree bound
+FULL_MATRIX_MAX_CUSTOMERS = 1000
+# The assignment bound is O(n³): "auto" only uses it up to this many customers (about 1.5 sec at 300)
+ASSIGNMENT_MAX_CUSTOMERS = 300
+KTREE_ITERATIONS = 300
+KTREE_TIME_LIMIT = 2.0 # seconds, the best bound so far is returned when it runs out
+INFEASIBLE = 1e9
+
+LOWER_BOUND_METHODS = ["auto", "degree", "assignment", "ktree"]
+
+DEFAULT_LOWER_BOUND = {
+    "enabled": False,
+    "method": "auto",
+    "stop_gap": None, # stop the search when the gap to the lower bound is at most this many percent
+}
+
+def get_lower_bound(instance: EVRPTWInstance, method: str = "auto") -> float:
+    """Returns a lower bound of the total distance. It is computed on first use and cached on the instance."""
+    cached = getattr(instance, "_lower_bound", None)
+    if cached is not None and cached[0] == method:
+        return cached[1]
+
+    t_start = time.perf_counter()
+    bound = compute_lower_bound(instance, method)
+    print(f"[INFO] Lower bound: {bound:.2f} ({method}, {time.perf_counter() - t_start:.2f} sec)")
+    instance._lower_bound = (method, bound)
+    return bound
+
+def optimality_gap(cost: float, lower_bound: float) -> float:
+    """Gap of a solution cost above the lower bound, in percent of the lower bound."""
+    if lower_bound <= 0:
+        return math.inf
+    return max(0.0, (cost - lower_bound) / lower_bound * 100)
+
+def compute_lower_bound(instance: EVRPTWInstance, method: str = "auto") -> float:
+    """Lower bound of the total distance by relaxing the routes over the customers and the depot:
+    - "degree": every customer has an incoming and an outgoing arc, half of the cheapest ones (O(n) memory),
+    - "assignment": every customer has one successor and one predecessor, subtours without the depot allowed,
+    - "ktree": Lagrangian relaxation of the customer degrees on undirected edges (Held-Karp k-tree), stronger on
+      clustered instances, but it ignores the direction of the time windows,
+    - "auto": the best of assignment and ktree up to ASSIGNMENT_MAX_CUSTOMERS customers, ktree (time capped) up to
+      FULL_MATRIX_MAX_CUSTOMERS customers, degree above.
+    Stations only enter through the arc costs, see arc_cost_row.
+    """
+    if method not in LOWER_BOUND_METHODS:
+        raise ValueError(f"Unknown lower bound method: {method} (expected one of {LOWER_BOUND_METHODS})")
+    if method == "degree" or (method == "auto" and len(instance.customer_ids) > FULL_MATRIX_MAX_CUSTOMERS):
+        return degree_bound(instance)
+
+    costs = arc_costs(instance)
+    min_vehicles = math.ceil(sum(instance.demand(c) for c in instance.customer_ids) / instance.vehicle_load_capacity)
+    if method == "assignment":
+        return assignment_bound(costs, min_vehicles)
+    if method == "ktree":
+        return ktree_bound(costs, min_vehicles)
+    ktree = ktree_bound(costs, min_vehicles, time_limit=KTREE_TIME_LIMIT)
+    if len(instance.customer_ids) > ASSIGNMENT_MAX_CUSTOMERS:
+        return ktree
+    return max(assignment_bound(costs, min_vehicles), ktree)
+
+def arc_costs(instance: EVRPTWInstance) -> np.ndarray:
+    """Cost matrix over [depot] + customers, see arc_cost_row."""
+    context = ArcContext(instance)
+    return np.array([arc_cost_row(context, i) for i in range(len(context.nodes))])
+
+class ArcContext:
+    """Per node data of [depot] + customers used by arc_cost_row."""
+    def __init__(self, instance: EVRPTWInstance) -> None:
+        self.instance = instance
+        self.nodes = np.asarray([instance.depot_id] + list(instance.customer_ids), dtype=np.int64)
+        self.stations = np.asarray(instance.station_ids, dtype=np.int64)
+
+        # Distances are symmetric, the rows of the charge points give every node's distance to them
+        self.from_depot = np.asarray(instance.distance_row(instance.depot_id), dtype=np.float64)[self.nodes]
+        self.to_stations = np.array([np.asarray(instance.distance_row(int(s)), dtype=np.float64)[self.nodes]
+                                     for s in self.stations]).reshape(len(self.stations), len(self.nodes)).T
+        # Distance from the closest charge point: the energy used since the last charge is at least this much
+        self.from_charge = np.minimum(self.from_depot, self.to_stations.min(axis=1, initial=np.inf))
+        self.from_charge[0] = 0.0
+
+        self.demand = np.array([instance.demand(u) for u in self.nodes])
+        self.ready = np.array([instance.ready(u) for u in self.nodes])
+        self.due = np.array([instance.due(u) for u in self.nodes])
+        self.service = np.array([instance.service_time(u) for u in self.nodes])
+        self.service[0] = 0.0
+        self.departure = np.maximum(self.ready, self.from_depot) + self.service # earliest departure
+        self.departure[0] = 0.0
+
+def arc_cost_row(context: ArcContext, i: int, detours: bool = True) -> np.ndarray:
+    """Costs of the arcs from the i-th node of [depot] + customers: the shortest way a feasible route can take to
+    the other node. Customer to customer arcs that no feasible route can use are INFEASIBLE: the two demands exceed
+    the capacity, or leaving as early as possible, the next customer or after it the depot is not reached in time.
+    An arc that needs more energy than a vehicle can have left costs the cheapest detour over a station that fits the
+    energy and time limits (by the triangle inequality, detours over several stations are not shorter).
+    With detours=False such arcs cost the direct distance (weaker, but O(n) instead of O(n * stations) per row).
+    Arcs from and to the depot are never eliminated, they cost at least the direct distance.
+    """
+    c = context
+    instance = c.instance
+    consumption = instance.vehicle_energy_consumption
+    energy_capacity = instance.vehicle_energy_capacity
+    distances = np.asarray(instance.distance_row(int(c.nodes[i])), dtype=np.float64)[c.nodes]
+
+    # Energy used at least since the last charge when arriving directly, plus what the next node needs to get to a charge
+    direct_ok = (c.from_charge[i] + distances + c.from_charge) * consumption <= energy_capacity
+    costs = np.where(direct_ok | (not detours), distances, np.inf)
+    detour = np.flatnonzero(~direct_ok)
+    if detours and len(c.stations) and len(detour):
+        to_stations = c.to_stations[detour].T # station x detour node
+        via = c.to_stations[i][:, None] + to_stations
+        usable = ((c.from_charge[i] + c.to_stations[i]) * consumption <= energy_capacity)[:, None] \
+            & ((to_stations + c.from_charge[detour]) * consumption <= energy_capacity) \
+            & (c.departure[i] + via <= c.due[detour])
+        costs[detour] = np.where(usable, via, np.inf).min(axis=0)
+
+    end_of_service = np.maximum(c.departure[i] + distances, c.ready) + c.service
+    in_time = (c.departure[i] + distances <= c.due) & (end_of_service + c.from_depot <= c.due[0])
+    costs = np.where(in_time & (c.demand[i] + c.demand <= instance.vehicle_load_capacity), costs, np.inf)
+
+    costs[0] = distances[0] if np.isinf(costs[0]) else costs[0]
+    if i == 0:
+        costs = np.where(np.isinf(costs), distances, costs)
+    costs[i] = np.inf
+    return np.where(np.isinf(costs), INFEASIBLE, costs)
+
+def degree_bound(instance: EVRPTWInstance) -> float:
+    """Half of the cheapest incoming and outgoing arc of every customer, computed row by row without station detours."""
+    context = ArcContext(instance)
+    min_in = np.full(len(context.nodes), np.inf)
+    min_out = np.full(len(context.nodes), np.inf)
+    for i in range(len(context.nodes)):
+        row = arc_cost_row(context, i, detours=False)
+        min_out[i] = row.min()
+        np.minimum(min_in, row, out=min_in)
+    return float(min_out[1:].sum() + min_in[1:].sum()) / 2
+
+def assignment_bound(costs: np.ndarray, min_vehicles: int) -> float:
+    """Minimum cost assignment of successors over the customers and one depot copy per customer (every vehicle that
+    may be used). Unused copies are assigned among themselves, the first min_vehicles copies must start a route."""
+    m = costs.shape[0] - 1
+    matrix = np.full((2 * m, 2 * m), INFEASIBLE)
+    matrix[:m, :m] = costs[1:, 1:]
+    matrix[:m, m:] = costs[1:, :1]
+    matrix[m:, :m] = costs[:1, 1:]
+    matrix[m + min_vehicles:, m:] = 0.0
+    return solve_assignment(matrix)
+
+def solve_assignment(costs: np.ndarray) -> float:
+    """Minimum cost perfect assignment of a square matrix (Hungarian method with potentials, O(n³),
+    the inner loop over the columns is vectorized). Returns the optimal cost."""
+    n = costs.shape[0]
+    u = np.zeros(n + 1)
+    v = np.zeros(n + 1)
+    row_of = np.zeros(n + 1, dtype=np.int64) # column -> assigned row (1-based, 0 = free)
+    way = np.zeros(n + 1, dtype=np.int64)
+
+    for row in range(1, n + 1):
+        row_of[0] = row
+        column = 0
+        min_reduced = np.full(n + 1, np.inf)
+        used = np.zeros(n + 1, dtype=bool)
+        while True:
+            used[column] = True
+            current_row = row_of[column]
+            reduced = costs[current_row - 1] - u[current_row] - v[1:]
+            free = ~used[1:]
+            better = free & (reduced < min_reduced[1:])
+            min_reduced[1:][better] = reduced[better]
+            way[1:][better] = column
+
+            candidates = np.where(free, min_reduced[1:], np.inf)
+            next_column = int(np.argmin(candidates)) + 1
+            delta = candidates[next_column - 1]
+            u[row_of[used]] += delta
+            v[used] -= delta
+            min_reduced[~used] -= delta
+            column = next_column
+            if row_of[column] == 0:
+                break
+
+        while column:
+            previous = way[column]
+            row_of[column] = row_of[previous]
+            column = previous
+
+    rows = row_of[1:] - 1
+    return float(costs[rows, np.arange(n)].sum())
+
+def ktree_bound(costs: np.ndarray, min_vehicles: int, iterations: int = KTREE_ITERATIONS, time_limit: float = None) -> float:
+    """Held-Karp bound for k >= min_vehicles routes. Without the depot, k routes are a spanning forest of the
+    customers with m - k edges, plus 2k depot edges (a customer served alone uses its depot edge twice).
+    With penalties on the customer degrees, the cheapest such graph over all k is the forest of the m - k shortest
+    minimum spanning tree edges plus the 2k cheapest depot edges. The penalties follow subgradient steps towards
+    degree 2, the best Lagrangian value is the bound. Every Lagrangian value is a bound, so the iterations may stop
+    after time_limit seconds."""
+    symmetric = np.minimum(costs, costs.T)
+    edges = symmetric[1:, 1:]
+    depot_edges = symmetric[0, 1:]
+    m = len(depot_edges)
+    vehicles = np.arange(max(1, min_vehicles), m + 1)
+
+    penalties = np.zeros(m)
+    best_bound = -np.inf
+    step_scale = 2.0
+    stalled = 0
+    deadline = time.perf_counter() + time_limit if time_limit is not None else math.inf
+    for _ in range(iterations):
+        if time.perf_counter() > deadline:
+            break
+        tree_from, tree_to, tree_costs = minimum_spanning_tree(edges + penalties[:, None] + penalties[None, :])
+        tree_order = np.argsort(tree_costs, kind="stable")
+        tree_sums = np.concatenate(([0.0], np.cumsum(tree_costs[tree_order])))
+        depot_costs = np.tile(depot_edges + penalties, 2)
+        depot_order = np.argsort(depot_costs, kind="stable")
+        depot_sums = np.concatenate(([0.0], np.cumsum(depot_costs[depot_order])))
+
+        totals = tree_sums[m - vehicles] + depot_sums[2 * vehicles]
+        k = int(vehicles[np.argmin(totals)])
+        bound = float(totals.min() - 2 * penalties.sum())
+        if bound > best_bound + 1e-9:
+            best_bound = bound
+            stalled = 0
+        else:
+            stalled += 1
+            if stalled >= 10:
+                step_scale /= 2
+                stalled = 0
+
+        degrees = np.zeros(m)
+        np.add.at(degrees, tree_from[tree_order[:m - k]], 1)
+        np.add.at(degrees, tree_to[tree_order[:m - k]], 1)
+        np.add.at(degrees, depot_order[:2 * k] % m, 1)
+        subgradient = degrees - 2
+        norm = subgradient @ subgradient
+        if norm == 0 or step_scale < 1e-3:
+            break
+        penalties += step_scale * 0.05 * abs(best_bound) / norm * subgradient
+    return best_bound
+
+def minimum_spanning_tree(weights: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Prim's algorithm on a dense symmetric matrix. Returns the (from, to, weight) arrays of the edges."""
+    n = len(weights)
+    in_tree = np.zeros(n, dtype=bool)
+    in_tree[0] = True
+    closest = weights[0].copy()
+    parent = np.zeros(n, dtype=np.int64)
+    tree_from, tree_to, tree_costs = np.zeros(n - 1, dtype=np.int64), np.zeros(n - 1, dtype=np.int64), np.zeros(n - 1)
+    for e in range(n - 1):
+        candidates = np.where(in_tree, np.inf, closest)
+        node = int(np.argmin(candidates))
+        tree_from[e], tree_to[e], tree_costs[e] = parent[node], node, candidates[node]
+        in_tree[node] = True
+        closer = ~in_tree & (weights[node] < closest)
+        closest[closer] = weights[node][closer]
+        parent[closer] = node
+    return tree_from, tree_to, tree_costs
+
+class GapStop:
+    """Stops when the best solution is within gap percent of the lower bound, otherwise asks the run's criterion.
+    The run's criterion is called every iteration, so iteration counting criteria stay exact."""
+    def __init__(self, stop, lower_bound: float, gap: float) -> None:
+        self.stop = stop
+        self.lower_bound = lower_bound
+        self.gap = gap
+        self.reached = False
+
+    def __call__(self, rng, best, current) -> bool:
+        stopped = self.stop(rng, best, current)
+        if optimality_gap(best.objective(), self.lower_bound) <= self.gap:
+            self.reached = True
+        return stopped or self.reached
@@ -0,0 +1,64 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from data.shared_instance import publish_instance, init_worker, worker_instance
+from model.instance import EVRPTWInstance
+from model.array_solution import ArraySolution
+from .alns_state import ALNSState
+from .repair_operators import InsertionOption, get_all_feasible_insertion_options
+
+class InsertionPool:
+    """Persistent process pool that builds the initial insertion cache of the repair operators in parallel.
+    The instance is published once into shared memory and attached by every worker.
+    The unassigned customers are split into one batch per worker, so the routes are sent once per worker and call.
+    The pool is only used for instances with at least min_customers customers and destroy sizes of at least min_unassigned.
+    """
+    def __init__(self, instance: EVRPTWInstance, num_workers: int, min_customers: int = 0, min_unassigned: int = 0) -> None:
+        self.num_workers = num_workers
+        self.min_customers = min_customers
+        self.min_unassigned = min_unassigned
+        self._shared = publish_instance(instance)
+        self._executor = ProcessPoolExecutor(max_workers=num_workers, initializer=init_worker, initargs=(self._shared.handle,))
+
+    def __enter__(self) -> 'InsertionPool':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._executor.shutdown()
+        self._shared.close()
+
+    def should_use(self, state: ALNSState) -> bool:
+        return state.instance.num_customers >= self.min_customers and len(state.unassigned) >= self.min_unassigned
+
+    def insertion_cache(self, state: ALNSState) -> dict[int, list[InsertionOption]]:
+        """Returns the feasible insertion options of every unassigned customer (same result as the sequential cache).
+        The workers build the array representation from the same routes, so the slots of the options match.
+        """
+        batches = [state.unassigned[i::self.num_workers] for i in range(self.num_workers)]
+        futures = [
+            self._executor.submit(evaluate_insertion_batch, state.routes, batch)
+            for batch in batches if batch
+        ]
+
+        cache = {}
+        for future in futures:
+            cache.update(future.result())
+        return {customer: cache[customer] for customer in state.unassigned}
+
+def create_insertion_pool(instance: EVRPTWInstance, config: dict) -> InsertionPool | None:
+    """Creates the insertion pool from the "parallel_repair" config section, or returns None if it is disabled or not worth it."""
+    pool_cfg = config.get("parallel_repair", {})
+    if not pool_cfg.get("enabled", False) or instance.num_customers < pool_cfg["min_customers"]:
+        return None
+    return InsertionPool(instance, pool_cfg["num_workers"], pool_cfg["min_customers"], pool_cfg["min_unassigned"])
+
+def evaluate_insertion_batch(routes: list[list[int]], customers: list[int]) -> dict[int, list[InsertionOption]]:
+    """Worker task: insertion options of a batch of customers for the given routes."""
+    instance = worker_instance()
+    arrays = ArraySolution.from_routes(instance, routes)
+    return {
+        customer: get_all_feasible_insertion_options(instance, arrays, customer)
+        for customer in customers
+    }
@@ -0,0 +1,163 @@
+import copy
+import math
+import time
+from collections import defaultdict
+
+from alns.stop import MaxIterations, MaxRuntime
+
+from data.log_saver import save_log
+from model.instance import EVRPTWInstance
+from model.solution import Solution
+from .alns_state import ALNSState
+from .run_alns import (
+    OPERATOR_OUTCOME_LABELS,
+    load_alns_config,
+    build_alns,
+    build_selector,
+    build_criterion,
+    operator_statistics,
+    operator_kwargs,
+)
+
+DEFAULT_RACING = {
+    "num_candidates": 8,
+    "initial_iterations": 250,
+    "initial_time": None, # seconds per candidate in the first round, replaces initial_iterations if set
+    "keep_fraction": 0.5,
+    "budget_growth": 2.0,
+    "overrides": [],
+}
+
+class ResumableRun:
+    """An ALNS run that can be continued: the RNG, the operator weights and the simulated annealing temperature are
+    kept between the calls of advance(), which continues from the current (not the best) state of the last call."""
+    def __init__(self, instance: EVRPTWInstance, initial_solution: Solution, config: dict) -> None:
+        self.config = config
+        self.alns = build_alns(config)
+        self.selector = build_selector(config)
+        self.criterion = build_criterion(config)
+        self.current = ALNSState.from_solution(instance, initial_solution)
+        self.best = self.current
+        self.best_cost = self.current.objective()
+        self.num_iterations = 0
+        self.objectives = [self.best_cost]
+        self.destroy_counts = defaultdict(lambda: [0, 0, 0, 0])
+        self.repair_counts = defaultdict(lambda: [0, 0, 0, 0])
+
+    def advance(self, stop) -> None:
+        def tracking_stop(rng, best, current) -> bool:
+            self.current = current
+            return stop(rng, best, current)
+
+        result = self.alns.iterate(
+            initial_solution=self.current,
+            op_select=self.selector,
+            accept=self.criterion,
+            stop=tracking_stop,
+            objective=lambda state: state.cost,
+            **operator_kwargs(self.config)
+        )
+        statistics = result.statistics
+        self.num_iterations += len(statistics.objectives) - 1
+        self.objectives.extend(statistics.objectives[1:].tolist())
+        for counts, totals in ((statistics.destroy_operator_counts, self.destroy_counts),
+                               (statistics.repair_operator_counts, self.repair_counts)):
+            for name, outcomes in counts.items():
+                totals[name] = [a + b for a, b in zip(totals[name], outcomes)]
+
+        cost = result.best_state.objective()
+        if cost < self.best_cost:
+            self.best, self.best_cost = result.best_state, cost
+
+def run_racing(instance: EVRPTWInstance, initial_solution: Solution, log_path: str = None, stats: dict = None, config: dict = None) -> Solution:
+    """Races several ALNS runs (seeds, optionally with per candidate config overrides) by successive halving.
+    Every round runs the remaining candidates for the round's budget, then keeps the keep_fraction of them with the
+    best solutions; the survivors continue from their current state with a budget grown by budget_growth.
+    The last survivor runs until it has done num_iterations iterations in total (with an iteration budget), so it
+    follows the whole simulated annealing schedule. The settings are read from the "racing" section of the ALNS config.
+    """
+    if config is None:
+        config = load_alns_config()
+    race_cfg = {**DEFAULT_RACING, **config.get("racing", {})}
+    if not 0 < race_cfg["keep_fraction"] < 1:
+        raise ValueError(f"keep_fraction must be between 0 and 1, got {race_cfg['keep_fraction']}")
+
+    runs = [ResumableRun(instance, initial_solution, racing_config(config, race_cfg, candidate))
+            for candidate in range(race_cfg["num_candidates"])]
+    alive = list(range(len(runs)))
+    rounds = []
+
+    t_start = time.perf_counter()
+    round_index = 0
+    while True:
+        growth = race_cfg["budget_growth"] ** round_index
+        final = len(alive) == 1
+        if race_cfg["initial_time"] is not None:
+            budget = race_cfg["initial_time"] * growth
+        elif final:
+            budget = max(0, config["num_iterations"] - runs[alive[0]].num_iterations)
+        else:
+            budget = max(1, round(race_cfg["initial_iterations"] * growth))
+
+        t_round = time.perf_counter()
+        for candidate in alive:
+            runs[candidate].advance(MaxRuntime(budget) if race_cfg["initial_time"] is not None else MaxIterations(budget))
+
+        ranked = sorted(alive, key=lambda candidate: runs[candidate].best_cost)
+        kept = ranked if final else ranked[:max(1, math.ceil(len(alive) * race_cfg["keep_fraction"]))]
+        rounds.append({
+            "round": round_index,
+            "budget": budget,
+            "candidates": [{"candidate": c, "seed": runs[c].config["seed"], "best": runs[c].best_cost,
+                            "iterations": runs[c].num_iterations} for c in alive],
+            "kept": kept,
+            "time": time.perf_counter() - t_round,
+        })
+        print(f"[INFO] Racing round {round_index}: {len(alive)} candidates, budget {budget}, "
+              f"best {runs[ranked[0]].best_cost:.2f} (candidate {ranked[0]})")
+        if final:
+            break
+        alive = kept
+        round_index += 1
+
+    total_runtime = time.perf_counter() - t_start
+    winner = runs[alive[0]]
+    best_solution = Solution(routes=[list(r) for r in winner.best.routes])
+    best_solution.compute_total_distance(instance)
+    total_iterations = sum(run.num_iterations for run in runs)
+
+    if stats is not None:
+        stats["total_iterations"] = total_iterations
+        stats["total_time"] = total_runtime
+
+    if log_path:
+        log_data = {
+            "objectives": winner.objectives,
+            **operator_statistics(dict(winner.destroy_counts), dict(winner.repair_counts)),
+            "operator_outcome_labels": OPERATOR_OUTCOME_LABELS,
+            "rounds": rounds,
+            "winner": alive[0],
+            "total_runtime": total_runtime,
+            "num_iterations": total_iterations,
+            "best_solution": {
+                "total_distance": best_solution.total_distance,
+                "routes": best_solution.routes
+            }
+        }
+        save_log(log_path, log_data)
+
+    return best_solution
+
+def racing_config(config: dict, race_cfg: dict, candidate: int) -> dict:
+    """Returns the config of a candidate: the base config with its own seed and the optional per candidate overrides
+    (cycled if there are fewer overrides than candidates)."""
+    result = copy.deepcopy(config)
+    result["seed"] = config["seed"] + candidate
+    overrides = race_cfg["overrides"]
+    if overrides:
+        for key, value in overrides[candidate % len(overrides)].items():
+            if isinstance(value, dict):
+                result[key].update(value)
+            else:
+                result[key] = value
+    return result
@@ -0,0 +1,94 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from model.instance import EVRPTWInstance
+
+CHUNK_ENTRIES = 4_000_000 # relatedness matrix entries computed at a time
+
+DEFAULT_RELATEDNESS = {
+    "max_neighbors": 100,
+    "distance_weight": 9.0,
+    "time_weight": 3.0,
+    "demand_weight": 2.0,
+}
+
+@dataclass
+class RelatednessIndex:
+    """Ranked neighbour arrays of the customers, computed once per instance.
+    Row i of nearest/related holds the other customers ranked by distance / by Shaw relatedness
+    to the customer in row i, capped at max_neighbors columns.
+    """
+    instance: EVRPTWInstance
+    row_of: np.ndarray # node -> row, -1 for depot and stations
+    nearest: np.ndarray
+    related: np.ndarray
+
+    def nearest_customers(self, customer: int, count: int = None) -> list[int]:
+        """The count nearest other customers (all indexed ones if count is None).
+        Ties keep the order of instance.customer_ids. Counts above max_neighbors fall back to a full sort.
+        """
+        if count is not None and count > self.nearest.shape[1]:
+            others = [n for n in self.instance.customer_ids if n != customer]
+            others.sort(key=lambda n: self.instance.distance(customer, n))
+            return others[:count]
+        return self.nearest[self.row_of[customer], :count].tolist()
+
+    def related_customers(self, customer: int) -> list[int]:
+        """The most related other customers, most related first."""
+        return self.related[self.row_of[customer]].tolist()
+
+def get_relatedness_index(instance: EVRPTWInstance, relatedness_cfg: dict = None) -> RelatednessIndex:
+    """Returns the relatedness index of the instance. It is built on first use and cached on the instance."""
+    cfg = {**DEFAULT_RELATEDNESS, **(relatedness_cfg or {})}
+    key = tuple(sorted(cfg.items()))
+    cached = getattr(instance, "_relatedness_index", None)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    index = build_relatedness_index(instance, **cfg)
+    instance._relatedness_index = (key, index)
+    return index
+
+def build_relatedness_index(instance: EVRPTWInstance, max_neighbors: int, distance_weight: float,
+                            time_weight: float, demand_weight: float) -> RelatednessIndex:
+    """Shaw relatedness of customers i and j (lower is more related):
+    distance_weight * d(i,j) / max d + time_weight * |ready_i - ready_j| / max ready difference + demand_weight * |q_i - q_j| / max q difference
+    The rows are computed in chunks, so memory stays O(customers * max_neighbors) with any distance backend.
+    """
+    customers = np.asarray(instance.customer_ids, dtype=np.int64)
+    n = instance.num_nodes
+    m = len(customers)
+    k = max(0, min(max_neighbors, m - 1))
+    chunk_size = max(1, CHUNK_ENTRIES // max(1, m))
+
+    def distance_rows(chunk: np.ndarray) -> np.ndarray:
+        return np.array([np.asarray(instance.distance_row(c), dtype=np.float64)[customers] for c in chunk]).reshape(len(chunk), m)
+
+    ready = np.array([instance.ready(c) for c in customers])
+    demand = np.array([instance.demand(c) for c in customers])
+    max_distance = max((distance_rows(customers[i:i + chunk_size]).max() for i in range(0, m, chunk_size)), default=0.0)
+    max_time_diff = ready.max() - ready.min() if m else 0.0
+    max_demand_diff = demand.max() - demand.min() if m else 0.0
+
+    nearest = np.empty((m, k), dtype=np.int64)
+    related = np.empty((m, k), dtype=np.int64)
+    for start in range(0, m, chunk_size):
+        rows = np.arange(start, min(m, start + chunk_size))
+        distances = distance_rows(customers[rows])
+        relatedness = (
+            distance_weight * distances / (max_distance or 1.0)
+            + time_weight * np.abs(ready[rows, None] - ready[None, :]) / (max_time_diff or 1.0)
+            + demand_weight * np.abs(demand[rows, None] - demand[None, :]) / (max_demand_diff or 1.0)
+        )
+
+        # The customer itself goes last, stable sorting keeps ties in customer_ids order
+        distances[np.arange(len(rows)), rows] = np.inf
+        relatedness[np.arange(len(rows)), rows] = np.inf
+        nearest[rows] = customers[np.argsort(distances, axis=1, kind="stable")[:, :k]]
+        related[rows] = customers[np.argsort(relatedness, axis=1, kind="stable")[:, :k]]
+
+    row_of = np.full(n, -1, dtype=np.int64)
+    row_of[customers] = np.arange(m)
+
+    return RelatednessIndex(instance=instance, row_of=row_of, nearest=nearest, related=related)
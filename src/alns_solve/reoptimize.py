@@ -0,0 +1,136 @@
+import copy
+import time
+import numpy.random as rnd
+
+from alns.stop import MaxIterations, MaxRuntime
+
+from data.instance_update import add_customers, remove_customers
+from model.instance import EVRPTWInstance, Node
+from model.solution import Solution
+from common.utils import compute_route_distance, check_route_feasibility_constraints, served_customers
+from .alns_state import ALNSState
+from .repair_operators import regret_repair
+from .decomposition import build_sub_instance
+from .run_alns import run_alns, load_alns_config, operator_kwargs
+
+DEFAULT_REOPTIMIZE = {
+    "time_limit": 2.0,
+    "max_iterations": 2000,
+    "extra_routes": 2,
+}
+
+def reoptimize(instance: EVRPTWInstance, solution: Solution, added: list[Node] = None, removed: list[int] = None,
+               stats: dict = None, config: dict = None) -> Solution:
+    """Patches an existing plan after customers arrived or cancelled, instead of solving from scratch.
+    The instance is updated in place: added customer nodes are appended (their ids are reported in stats["added"]),
+    removed customers are dropped from customer_ids. The removed customers are cut out of their routes, the new ones
+    are inserted with the regret repair operator, then a time-boxed ALNS runs on the sub-instance of the affected routes
+    (plus the extra_routes routes closest to them). The other routes are not touched.
+    Customers that could not be inserted are missing from the returned plan, their ids are reported in
+    stats["unassigned"] (empty if the plan serves every customer).
+    The settings are read from the "reoptimize" section of the ALNS config.
+    """
+    if config is None:
+        config = load_alns_config()
+    reopt_cfg = {**DEFAULT_REOPTIMIZE, **config.get("reoptimize", {})}
+    t_start = time.perf_counter()
+
+    added_ids = add_customers(instance, added) if added else []
+    if removed:
+        remove_customers(instance, removed)
+
+    routes, shortened, dissolved = cut_customers(instance, solution.routes, set(removed or []))
+    state = ALNSState(instance, routes, unassigned=list(added_ids) + dissolved)
+    if state.unassigned:
+        state = regret_repair(state, rnd.default_rng(config["seed"]), **operator_kwargs(config))
+        if state.unassigned:
+            print(f"[WARNING] {len(state.unassigned)} customers could not be inserted.")
+    routes = state.routes
+
+    # The repair reorders the routes, the affected ones are found by their content
+    affected_customers = set(added_ids) | set(dissolved) | {node for route in shortened for node in route if instance.is_customer(node)}
+    affected = [i for i, route in enumerate(routes) if any(node in affected_customers for node in route)]
+    affected += closest_routes(instance, routes, affected, reopt_cfg["extra_routes"])
+
+    if affected:
+        routes = optimize_routes(instance, routes, affected, config, reopt_cfg, t_start)
+
+    patched = Solution(routes=routes)
+    patched.compute_total_distance(instance)
+
+    if stats is not None:
+        stats["added"] = added_ids
+        stats["unassigned"] = list(state.unassigned)
+        stats["affected_routes"] = len(affected)
+        stats["total_time"] = time.perf_counter() - t_start
+    return patched
+
+def cut_customers(instance: EVRPTWInstance, routes: list[list[int]], removed: set[int]) -> tuple[list[list[int]], list[list[int]], list[int]]:
+    """Removes the given customers from the routes. Returns (routes, shortened routes, customers of dissolved routes).
+    Routes left without customers are dropped. With the triangle inequality a shortened route stays feasible,
+    one that does not is dissolved and its customers have to be inserted again."""
+    result = []
+    shortened = []
+    dissolved = []
+    for route in routes:
+        if not removed.intersection(route):
+            result.append(list(route))
+            continue
+        route = [node for node in route if node not in removed]
+        # Removed customers can leave the same station twice in a row
+        route = [node for i, node in enumerate(route) if i == 0 or node != route[i - 1]]
+        if not any(instance.is_customer(node) for node in route):
+            continue
+        if all(check_route_feasibility_constraints(instance, route)):
+            result.append(route)
+            shortened.append(route)
+        else:
+            dissolved.extend(node for node in route if instance.is_customer(node))
+    return result, shortened, dissolved
+
+def closest_routes(instance: EVRPTWInstance, routes: list[list[int]], affected: list[int], count: int) -> list[int]:
+    """The count unaffected routes with the smallest distance between one of their customers and an affected customer."""
+    if count <= 0 or not affected:
+        return []
+    affected_customers = [node for i in affected for node in routes[i] if instance.is_customer(node)]
+
+    def gap(route: list[int]) -> float:
+        return min(instance.distance(u, v) for u in route if instance.is_customer(u) for v in affected_customers)
+
+    affected = set(affected)
+    others = [i for i in range(len(routes)) if i not in affected]
+    return sorted(others, key=lambda i: gap(routes[i]))[:count]
+
+def optimize_routes(instance: EVRPTWInstance, routes: list[list[int]], selected: list[int], config: dict,
+                    reopt_cfg: dict, t_start: float) -> list[list[int]]:
+    """Runs a time-boxed ALNS on the sub-instance of the selected routes, returns the routes with the improved group.
+    The group is only replaced if the new routes are shorter and serve exactly the customers of the old ones."""
+    group_routes = [routes[i] for i in selected]
+    customers = [node for route in group_routes for node in route if instance.is_customer(node)]
+    sub_instance = build_sub_instance(instance, customers)
+    to_sub = {node: i for i, node in enumerate(sub_instance.node_map)}
+    sub_solution = Solution(routes=[[to_sub[node] for node in route] for route in group_routes])
+    sub_solution.compute_total_distance(sub_instance)
+
+    sub_config = copy.deepcopy(config)
+    sub_config.get("parallel_repair", {})["enabled"] = False
+    remaining = max(0.0, reopt_cfg["time_limit"] - (time.perf_counter() - t_start))
+    stop = BudgetStop(remaining, reopt_cfg["max_iterations"])
+    sub_routes = run_alns(sub_instance, sub_solution, config=sub_config, stop=stop).routes
+
+    new_group_routes = [[sub_instance.node_map[node] for node in route] for route in sub_routes]
+    old_cost = sum(compute_route_distance(instance, r) for r in group_routes)
+    new_cost = sum(compute_route_distance(instance, r) for r in new_group_routes)
+    if new_cost >= old_cost or served_customers(instance, new_group_routes) != served_customers(instance, group_routes):
+        return routes
+    selected = set(selected)
+    return [route for i, route in enumerate(routes) if i not in selected] + new_group_routes
+
+class BudgetStop:
+    """Stops at the time limit or at the iteration limit, whichever comes first."""
+    def __init__(self, time_limit: float, max_iterations: int) -> None:
+        self.criteria = [MaxRuntime(time_limit), MaxIterations(max_iterations)]
+
+    def __call__(self, rng, best, current) -> bool:
+        # Every criterion is called, so all of them keep their own state up to date
+        return any([criterion(rng, best, current) for criterion in self.criteria])
@@ -1,67 +1,110 @@
 from .alns_state import ALNSState
-from common.utils import check_route_feasibility_constraints, find_best_station_for_customer_insert, compute_route_distance
 from model.instance import EVRPTWInstance
+from model.array_solution import ArraySolution
+
+# (cost, route_idx, after_slot, inserted_nodes)
+InsertionOption = tuple[float, int, int, tuple[int, ...]]
+
+class ResultingRoute:
+    """Tie-break of insertion options with the same cost and route: the route after the insertion, compared as a list.
+    The route lists are only built when two options are compared on it, i.e. on exact ties.
+    """
+    __slots__ = ("arrays", "option", "_route")
+
+    def __init__(self, arrays: ArraySolution, option: InsertionOption) -> None:
+        self.arrays = arrays
+        self.option = option
+        self._route = None
+
+    def route(self) -> list[int]:
+        if self._route is None:
+            _, route_idx, after_slot, nodes = self.option
+            if route_idx == self.arrays.num_routes:
+                depot = self.arrays.instance.depot_id
+                self._route = [depot, *nodes, depot]
+            else:
+                slots = self.arrays.route_slots(route_idx)
+                route = [self.arrays.node_of[slot] for slot in slots]
+                pos = slots.index(after_slot) + 1
+                self._route = route[:pos] + list(nodes) + route[pos:]
+        return self._route
+
+    def __lt__(self, other: 'ResultingRoute') -> bool:
+        return self.route() < other.route()
+
+    def __eq__(self, other: 'ResultingRoute') -> bool:
+        return self.route() == other.route()
+
+def sort_insertion_options(arrays: ArraySolution, options: list[InsertionOption]) -> None:
+    """Sorts the options by (cost, route_idx, resulting route), the order of the route list based options."""
+    options.sort(key=lambda option: (option[0], option[1], ResultingRoute(arrays, option)))
 
 def greedy_repair(state: ALNSState, rnd, **kwargs) -> ALNSState:
-    """Greedy repair operator that inserts unassigned customers into the best feasible positions (with a bit of randomness)."""
+    """Greedy repair operator that inserts unassigned customers into the best feasible positions (with a bit of randomness).
+    If an abort_threshold is given, the repair stops early once the candidate cannot get below it (see abort_repair)."""
     repaired = state.copy()
     instance = repaired.instance
     p = kwargs.get("p", 10)
 
-    insertion_cache = {
-        customer: get_all_feasible_insertion_options(instance, repaired, customer)
-        for customer in repaired.unassigned
-    }
+    arrays = ArraySolution.from_routes(instance, repaired.routes)
+    insertion_cache = build_insertion_cache(instance, repaired, arrays, kwargs.get("insertion_pool"))
+    threshold = kwargs.get("abort_threshold")
+    cost = repaired.objective() if threshold is not None else 0.0
 
     while repaired.unassigned:
         best_customer = None
         best_option = None
         best_cost = float("inf")
+        cheapest = float("inf")
 
         for customer, options in insertion_cache.items():
             if not options:
                 continue
-            options.sort()
+            sort_insertion_options(arrays, options)
+            cheapest = min(cheapest, options[0][0])
             index = int(rnd.random() ** p * len(options))
-            cost, route_idx, updated_route = options[index]
+            option = options[index]
 
-            if cost < best_cost:
-                best_cost = cost
+            if option[0] < best_cost:
+                best_cost = option[0]
                 best_customer = customer
-                best_option = (cost, route_idx, updated_route)
+                best_option = option
 
         if best_customer is None:
             print("[WARNING] No feasible insertions found for remaining customers.")
             break
+        if threshold is not None:
+            if cost + cheapest > threshold + 1e-9:
+                return abort_repair(repaired, arrays)
+            cost += best_cost
 
-        _, route_idx, updated_route = best_option
-        if route_idx == len(repaired.routes):
-            repaired.routes.append(updated_route)
-        else:
-            repaired.routes[route_idx] = updated_route
+        route_idx = best_option[1]
+        apply_insertion_option(arrays, best_option)
         repaired.unassigned.remove(best_customer)
 
         affected_customers = [
             customer for customer in repaired.unassigned
-            if any(route_idx == idx for _, idx, _ in insertion_cache.get(customer, []))
+            if any(route_idx == option[1] for option in insertion_cache.get(customer, []))
         ]
         for customer in affected_customers:
-            insertion_cache[customer] = get_all_feasible_insertion_options(instance, repaired, customer)
+            insertion_cache[customer] = get_all_feasible_insertion_options(instance, arrays, customer)
 
         insertion_cache.pop(best_customer, None)
 
+    repaired.routes = arrays.to_routes()
     return repaired
 
 def regret_repair(state: ALNSState, rnd, **kwargs) -> ALNSState:
-    """Regret-based repair operator that selects the customer with the highest regret for insertion. (with a bit of randomness)"""
+    """Regret-based repair operator that selects the customer with the highest regret for insertion. (with a bit of randomness)
+    If an abort_threshold is given, the repair stops early once the candidate cannot get below it (see abort_repair)."""
     repaired = state.copy()
     instance = repaired.instance
     p = kwargs.get("p", 10)
 
-    insertion_cache = {
-        customer: get_all_feasible_insertion_options(instance, repaired, customer)
-        for customer in repaired.unassigned
-    }
+    arrays = ArraySolution.from_routes(instance, repaired.routes)
+    insertion_cache = build_insertion_cache(instance, repaired, arrays, kwargs.get("insertion_pool"))
+    threshold = kwargs.get("abort_threshold")
+    cost = repaired.objective() if threshold is not None else 0.0
 
     while repaired.unassigned:
         regret_list = []
@@ -70,7 +113,7 @@ def regret_repair(state: ALNSState, rnd, **kwargs) -> ALNSState:
             if len(options) < 1:
                 continue
 
-            options.sort()
+            sort_insertion_options(arrays, options)
             if len(options) == 1:
                 regret = 0
                 best_option = options[0]
@@ -84,78 +127,112 @@ def regret_repair(state: ALNSState, rnd, **kwargs) -> ALNSState:
             print("[WARNING] No feasible insertions found for remaining customers.")
             break
 
+        if threshold is not None and cost + min(option[0] for _, _, option in regret_list) > threshold + 1e-9:
+            return abort_repair(repaired, arrays)
+
         regret_list.sort(reverse=True)
         index = int(rnd.random() ** p * len(regret_list))
-        _, selected_customer, (_, route_idx, updated_route) = regret_list[index]
+        _, selected_customer, selected_option = regret_list[index]
+        cost += selected_option[0]
 
-        if route_idx == len(repaired.routes):
-            repaired.routes.append(updated_route)
-        else:
-            repaired.routes[route_idx] = updated_route
+        route_idx = selected_option[1]
+        apply_insertion_option(arrays, selected_option)
         repaired.unassigned.remove(selected_customer)
 
         affected_customers = [
             customer for customer in repaired.unassigned
-            if any(route_idx == idx for _, idx, _ in insertion_cache.get(customer, []))
+            if any(route_idx == option[1] for option in insertion_cache.get(customer, []))
         ]
         for customer in affected_customers:
-            insertion_cache[customer] = get_all_feasible_insertion_options(instance, repaired, customer)
+            insertion_cache[customer] = get_all_feasible_insertion_options(instance, arrays, customer)
 
         insertion_cache.pop(selected_customer, None)
 
+    repaired.routes = arrays.to_routes()
+    return repaired
+
+def abort_repair(repaired: ALNSState, arrays: ArraySolution) -> ALNSState:
+    """Returns the partially repaired state flagged as rejected (see early_abort.py).
+    A repair stops when its cost so far plus the cheapest insertion option of the remaining customers exceeds the
+    abort threshold: the next insertion costs at least that much, the ones after it are not negative (triangle
+    inequality), so the complete candidate would exceed the threshold too."""
+    repaired.routes = arrays.to_routes()
+    repaired.rejected = True
     return repaired
 
-def get_all_feasible_insertion_options(instance: EVRPTWInstance, repaired: ALNSState, customer: int) -> list[tuple[float, int, list[int]]]:
-    """Finds all feasible insertion options for a customer"""
+def build_insertion_cache(instance: EVRPTWInstance, repaired: ALNSState, arrays: ArraySolution, insertion_pool=None) -> dict[int, list[InsertionOption]]:
+    """Returns the insertion options of every unassigned customer, evaluated in the insertion pool if it is worth it.
+    The slots of the options refer to arrays, which must be built from repaired.routes.
+    """
+    if insertion_pool is not None and insertion_pool.should_use(repaired):
+        return insertion_pool.insertion_cache(repaired)
+
+    return {
+        customer: get_all_feasible_insertion_options(instance, arrays, customer)
+        for customer in repaired.unassigned
+    }
+
+def get_all_feasible_insertion_options(instance: EVRPTWInstance, arrays: ArraySolution, customer: int) -> list[InsertionOption]:
+    """Finds all feasible insertion options for a customer.
+    An option is (cost, route_idx, after_slot, inserted_nodes); route_idx == num_routes means a new route.
+    The costs are computed with the same floating point operations as the route list based version did, so exact
+    ties (and the choices depending on them) stay the same.
+    """
+    distance = instance.distance
     insertion_options = []
 
     fallback_needed = True
 
-    for route_idx, route in enumerate(repaired.routes):
-        for pos in range(1, len(route)):
-            new_route = route[:pos] + [customer] + route[pos:]
-            time_ok, cap_ok, energy_ok = check_route_feasibility_constraints(instance, new_route)
+    for route_idx in range(arrays.num_routes):
+        for after_slot in arrays.candidate_slots(route_idx, customer):
+            time_ok, cap_ok, energy_ok, _ = arrays.evaluate_insertion(after_slot, (customer,))
 
             if time_ok and cap_ok and energy_ok: # Direct insertion without station
-                cost = (
-                    instance.distance(route[pos - 1], customer)
-                    + instance.distance(customer, route[pos])
-                    - instance.distance(route[pos - 1], route[pos])
-                )
-                insertion_options.append((cost, route_idx, new_route))
+                before_node, after_node = arrays.node_of[after_slot], arrays.node_of[arrays.next[after_slot]]
+                cost = distance(before_node, customer) + distance(customer, after_node) - distance(before_node, after_node)
+                insertion_options.append((cost, route_idx, after_slot, (customer,)))
                 fallback_needed = False
             elif time_ok and cap_ok:
                 for before in [True, False]: # [..., station, customer, ...] or [..., customer, station, ...]
-                    updated_route = find_best_station_for_customer_insert(instance, route, customer, pos, before=before)
-                    if updated_route:
-                        cost = compute_route_distance(instance, updated_route) - compute_route_distance(instance, route)
-                        insertion_options.append((cost, route_idx, updated_route))
+                    station_insert = arrays.best_station_insertion(after_slot, customer, before=before)
+                    if station_insert:
+                        nodes = station_insert[1]
+                        cost = arrays.inserted_route_distance(after_slot, nodes) - arrays.route_distance[route_idx]
+                        insertion_options.append((cost, route_idx, after_slot, nodes))
                         fallback_needed = False
 
-    # Try to insert a new vehicle 
-    depot = instance.depot_id
-    base_route = [depot, customer, depot]
-    time_ok, cap_ok, energy_ok = check_route_feasibility_constraints(instance, base_route)
+    # Try to insert a new vehicle
+    new_route_idx = arrays.num_routes
+    time_ok, cap_ok, energy_ok, cost = arrays.evaluate_new_route((customer,))
 
     if time_ok and cap_ok and energy_ok:
-        cost = compute_route_distance(instance, base_route)
-        insertion_options.append((cost, len(repaired.routes), base_route))
+        insertion_options.append((cost, new_route_idx, -1, (customer,)))
         fallback_needed = False
     elif time_ok and cap_ok:
         for before in [True, False]: # [depot, station, customer, depot] or [depot, customer, station, depot]
-            route_with_station = find_best_station_for_customer_insert(instance, [depot, depot], customer, 1, before=before)
-            if route_with_station:
-                cost = compute_route_distance(instance, route_with_station)
-                insertion_options.append((cost, len(repaired.routes), route_with_station))
+            best = None
+            for station_id in (instance.stations_before[customer] if before else instance.stations_after[customer]):
+                nodes = (station_id, customer) if before else (customer, station_id)
+                time_ok, cap_ok, energy_ok, cost = arrays.evaluate_new_route(nodes)
+                if time_ok and cap_ok and energy_ok and (best is None or cost < best[0]):
+                    best = (cost, new_route_idx, -1, nodes)
+            if best:
+                insertion_options.append(best)
                 fallback_needed = False
 
     if fallback_needed: # [depot, station, customer, station, depot]
-        for station1 in instance.station_ids:
-            for station2 in instance.station_ids:
-                fallback_route = [depot, station1, customer, station2, depot]
-                time_ok, cap_ok, energy_ok = check_route_feasibility_constraints(instance, fallback_route)
+        for station1 in instance.stations_before[customer]:
+            for station2 in instance.stations_after[customer]:
+                nodes = (station1, customer, station2)
+                time_ok, cap_ok, energy_ok, cost = arrays.evaluate_new_route(nodes)
                 if time_ok and cap_ok and energy_ok:
-                    cost = compute_route_distance(instance, fallback_route)
-                    insertion_options.append((cost, len(repaired.routes), fallback_route))
+                    insertion_options.append((cost, new_route_idx, -1, nodes))
 
     return insertion_options
+
+def apply_insertion_option(arrays: ArraySolution, option: InsertionOption) -> None:
+    _, route_idx, after_slot, nodes = option
+    if route_idx == arrays.num_routes:
+        arrays.add_route(nodes)
+    else:
+        arrays.insert_after(after_slot, nodes)
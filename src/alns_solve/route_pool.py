@@ -0,0 +1,233 @@
+import time
+
+import numpy as np
+
+from model.instance import EVRPTWInstance
+from common.utils import compute_route_distance, check_route_feasibility_constraints
+
+DEFAULT_ROUTE_POOL = {
+    "enabled": False,
+    "max_size": 5000,
+    "interval": 1000,
+    "method": "auto", # "lagrangian", "milp" (needs scipy) or "auto"
+    "lagrangian_iterations": 200,
+    "time_limit": 5.0,
+}
+
+class RoutePool:
+    """Distinct feasible routes seen during the search.
+    Routes are keyed by their customer set: for set partitioning only the shortest route serving a set matters.
+    When the pool grows past max_size, the routes with the highest distance per customer are evicted.
+    """
+    def __init__(self, instance: EVRPTWInstance, max_size: int = 5000) -> None:
+        self.instance = instance
+        self.max_size = max_size
+        self.routes: dict[frozenset, tuple[float, list[int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.routes)
+
+    def add(self, route: list[int], check: bool = True) -> bool:
+        """Adds the route if it is feasible and shorter than the pooled route of the same customers.
+        With check=False the feasibility check is skipped (for routes of the incumbent, which are kept as they are)."""
+        customers = frozenset(node for node in route if self.instance.is_customer(node))
+        if not customers:
+            return False
+        cost = compute_route_distance(self.instance, route)
+        pooled = self.routes.get(customers)
+        if pooled is not None and pooled[0] <= cost + 1e-9:
+            return False
+        if check and not all(check_route_feasibility_constraints(self.instance, route)):
+            return False
+
+        self.routes[customers] = (cost, list(route))
+        # Evicting in batches keeps add() amortized O(1)
+        if len(self.routes) > self.max_size * 1.2:
+            self.evict()
+        return True
+
+    def add_routes(self, routes: list[list[int]]) -> None:
+        for route in routes:
+            self.add(route)
+
+    def evict(self) -> None:
+        """Keeps the max_size routes with the lowest distance per customer."""
+        ranked = sorted(self.routes.items(), key=lambda item: item[1][0] / len(item[0]))
+        self.routes = dict(ranked[:self.max_size])
+
+def recombine(instance: EVRPTWInstance, pool: RoutePool, incumbent: list[list[int]], cfg: dict) -> tuple[float, list[list[int]]]:
+    """Selects a customer-disjoint subset of the pooled routes with minimum total distance (set partitioning).
+    The routes of the incumbent are added to the pool first (unchecked), so they are always a valid answer.
+    Returns (distance, routes), never worse than the incumbent.
+    """
+    cfg = {**DEFAULT_ROUTE_POOL, **(cfg or {})}
+    for route in incumbent:
+        pool.add(route, check=False)
+    incumbent_cost = sum(compute_route_distance(instance, route) for route in incumbent)
+
+    entries = list(pool.routes.items())
+    column_of = {customer: i for i, customer in enumerate(instance.customer_ids)}
+    costs = np.array([cost for _, (cost, _) in entries])
+    incidence = np.zeros((len(entries), len(column_of)), dtype=bool)
+    for row, (customers, _) in enumerate(entries):
+        incidence[row, [column_of[c] for c in customers]] = True
+    routes = [route for _, (_, route) in entries]
+
+    method = cfg["method"]
+    if method == "auto":
+        method = "milp" if load_milp() is not None else "lagrangian"
+
+    if method == "milp":
+        selected = solve_partition_milp(incidence, costs, cfg["time_limit"])
+        if selected is None:
+            return incumbent_cost, incumbent
+        candidate = [list(routes[row]) for row in selected]
+        cost = float(costs[selected].sum())
+    elif method == "lagrangian":
+        cost, candidate = lagrangian_partition(instance, incidence, costs, routes, incumbent_cost,
+                                               cfg["lagrangian_iterations"], cfg["time_limit"])
+        if candidate is None:
+            return incumbent_cost, incumbent
+    else:
+        raise ValueError(f"Unknown recombination method: {method}")
+
+    if cost < incumbent_cost - 1e-9:
+        return cost, candidate
+    return incumbent_cost, incumbent
+
+def lagrangian_partition(instance: EVRPTWInstance, incidence: np.ndarray, costs: np.ndarray, routes: list[list[int]],
+                         upper_bound: float, iterations: int, time_limit: float) -> tuple[float, list[list[int]] | None]:
+    """Lagrangian heuristic for set covering (Beasley): subgradient optimization of the customer multipliers,
+    every iteration turns the Lagrangian solution into a cover (greedy completion, redundant routes dropped),
+    then into a partition by removing the customers served twice. Returns the best partition found, or None
+    (also if a customer is served by no pooled route, there is no partition then).
+    """
+    if not incidence.any(axis=0).all():
+        return upper_bound, None
+
+    t_start = time.perf_counter()
+    matrix = incidence.astype(np.float64)
+    sizes = matrix.sum(axis=1)
+    # Start from the cheapest distance per customer of every customer
+    multipliers = np.array([(costs[incidence[:, col]] / sizes[incidence[:, col]]).min() for col in range(incidence.shape[1])])
+
+    best_cost, best_routes = upper_bound, None
+    best_bound = -np.inf
+    step_scale = 2.0
+    stalled = 0
+    seen_covers = set()
+
+    for _ in range(iterations):
+        reduced = costs - matrix @ multipliers
+        lagrangian = reduced < 0
+        bound = multipliers.sum() + reduced[lagrangian].sum()
+        if bound > best_bound + 1e-9:
+            best_bound = bound
+            stalled = 0
+        else:
+            stalled += 1
+            if stalled >= 5:
+                step_scale /= 2
+                stalled = 0
+
+        cover = greedy_cover(incidence, costs, lagrangian)
+        key = tuple(cover) if cover is not None else None
+        if key is not None and key not in seen_covers:
+            seen_covers.add(key)
+            partition = cover_to_partition(instance, [routes[row] for row in cover])
+            if partition is not None:
+                cost = sum(compute_route_distance(instance, route) for route in partition)
+                if cost < best_cost - 1e-9:
+                    best_cost, best_routes = cost, partition
+
+        subgradient = 1 - matrix[lagrangian].sum(axis=0)
+        norm = subgradient @ subgradient
+        if norm == 0 or best_cost - best_bound < 1e-6 or step_scale < 1e-4 or time.perf_counter() - t_start > time_limit:
+            break
+        multipliers = np.maximum(0.0, multipliers + step_scale * (best_cost - bound) / norm * subgradient)
+
+    return best_cost, best_routes
+
+def greedy_cover(incidence: np.ndarray, costs: np.ndarray, start: np.ndarray) -> list[int] | None:
+    """Completes the start rows to a cover, always adding the row with the lowest cost per newly covered column,
+    then drops redundant rows, most expensive first. Returns the sorted row indices, or None if a column is not
+    covered by any row."""
+    selected = start.copy()
+    cover_count = incidence[selected].sum(axis=0)
+    while not cover_count.all():
+        new = incidence[:, cover_count == 0].sum(axis=1)
+        if not new.any():
+            return None
+        with np.errstate(divide="ignore"):
+            score = np.where(new > 0, costs / new, np.inf)
+        row = int(np.argmin(score))
+        selected[row] = True
+        cover_count += incidence[row]
+
+    for row in sorted(np.flatnonzero(selected), key=lambda r: -costs[r]):
+        if (cover_count[incidence[row]] > 1).all():
+            selected[row] = False
+            cover_count -= incidence[row]
+    return np.flatnonzero(selected).tolist()
+
+def cover_to_partition(instance: EVRPTWInstance, cover: list[list[int]]) -> list[list[int]] | None:
+    """Removes every customer served by several routes from all of them but one: it stays in the route whose
+    distance it increases least. Returns None if a shortened route is infeasible (it is not when the distances
+    satisfy the triangle inequality)."""
+    routes = [list(route) for route in cover]
+    routes_of = {}
+    for r, route in enumerate(routes):
+        for node in route:
+            if instance.is_customer(node):
+                routes_of.setdefault(node, []).append(r)
+
+    for customer, owners in routes_of.items():
+        if len(owners) < 2:
+            continue
+        gains = [removal_gain(instance, routes[r], customer) for r in owners]
+        keep = owners[gains.index(min(gains))]
+        for r in owners:
+            if r != keep:
+                routes[r].remove(customer)
+
+    partition = []
+    for original, route in zip(cover, routes):
+        if len(route) == len(original): # unchanged, pooled routes are feasible
+            partition.append(route)
+            continue
+        if not any(instance.is_customer(node) for node in route):
+            continue
+        # Removed customers can leave the same station twice in a row
+        route = [node for i, node in enumerate(route) if i == 0 or node != route[i - 1]]
+        if not all(check_route_feasibility_constraints(instance, route)):
+            return None
+        partition.append(route)
+    return partition
+
+def removal_gain(instance: EVRPTWInstance, route: list[int], customer: int) -> float:
+    i = route.index(customer)
+    prev_node, next_node = route[i - 1], route[i + 1]
+    return instance.distance(prev_node, customer) + instance.distance(customer, next_node) - instance.distance(prev_node, next_node)
+
+def load_milp():
+    """Returns scipy.optimize.milp, or None if scipy is not installed. Imported on first use only."""
+    try:
+        from scipy.optimize import milp
+    except ImportError: # the MIP recombination is optional, the Lagrangian heuristic needs NumPy only
+        return None
+    return milp
+
+def solve_partition_milp(incidence: np.ndarray, costs: np.ndarray, time_limit: float) -> list[int] | None:
+    """Solves the set partitioning problem with the HiGHS MIP solver of scipy. Returns the selected rows, or None."""
+    milp = load_milp()
+    if milp is None:
+        raise RuntimeError("The milp recombination method requires scipy")
+    from scipy.optimize import Bounds, LinearConstraint
+    from scipy.sparse import csr_array
+
+    constraint = LinearConstraint(csr_array(incidence.T.astype(np.float64)), lb=1, ub=1)
+    result = milp(costs, constraints=constraint, integrality=np.ones(len(costs)), bounds=Bounds(0, 1),
+                  options={"time_limit": time_limit})
+    if result.x is None:
+        return None
+    return np.flatnonzero(result.x > 0.5).tolist()
@@ -1,5 +1,4 @@
-from pathlib import Path
-import json
+import time
 import numpy.random as rnd
 #import matplotlib.pyplot as plt
 
@@ -7,61 +6,147 @@ from alns import ALNS
 from alns.accept import SimulatedAnnealing
 from alns.select import SegmentedRouletteWheel
 from alns.stop import MaxIterations
+from alns.Outcome import Outcome
 
+from common.memory_profile import measure
 from data.log_saver import save_log
 from model.instance import EVRPTWInstance
 from model.solution import Solution
 from .alns_state import ALNSState
-from .destroy_operators import random_customer_removal, nearest_customers_removal, worst_customer_removal, worst_station_removal
+from .config import load_alns_config
+from .destroy_operators import (
+    random_customer_removal,
+    nearest_customers_removal,
+    worst_customer_removal,
+    worst_station_removal,
+    shaw_removal,
+    string_removal,
+)
 from .repair_operators import greedy_repair, regret_repair
+from .parallel_insertion import create_insertion_pool
+from .route_pool import DEFAULT_ROUTE_POOL, RoutePool, recombine
+from .lower_bound import DEFAULT_LOWER_BOUND, GapStop, get_lower_bound, optimality_gap
+from .local_search_hook import DEFAULT_LOCAL_SEARCH, LocalSearchHook
+from .early_abort import DEFAULT_EARLY_ABORT, EarlyAbort, ThresholdAnnealing
 
-def run_alns(instance: EVRPTWInstance, initial_solution: Solution, log_path: str = None) -> Solution:
-    """Runs the Adaptive Large Neighborhood Search algorithm """
-    config_path = Path(__file__).parent.parent / "config" / "alns_config.json"
-    with open(config_path) as f:
-        config = json.load(f)
+OPERATOR_OUTCOME_LABELS = ["best", "better", "accepted", "rejected"]
 
-    alns = ALNS(rnd.default_rng(config["seed"]))
+# Operators selectable by name in the "destroy_operators" / "repair_operators" config lists
+DESTROY_OPERATORS = {
+    "random_customer_removal": random_customer_removal,
+    "nearest_customers_removal": nearest_customers_removal,
+    "worst_customer_removal": worst_customer_removal,
+    "worst_station_removal": worst_station_removal,
+    "shaw_removal": shaw_removal,
+    "string_removal": string_removal,
+}
+REPAIR_OPERATORS = {
+    "greedy_repair": greedy_repair,
+    "regret_repair": regret_repair,
+}
+DEFAULT_DESTROY_OPERATORS = ["random_customer_removal", "nearest_customers_removal", "worst_customer_removal", "worst_station_removal"]
+DEFAULT_REPAIR_OPERATORS = ["greedy_repair", "regret_repair"]
 
-    alns.add_destroy_operator(random_customer_removal)
-    alns.add_destroy_operator(nearest_customers_removal)
-    alns.add_destroy_operator(worst_customer_removal)
-    alns.add_destroy_operator(worst_station_removal)
-    alns.add_repair_operator(greedy_repair)
-    alns.add_repair_operator(regret_repair)
+def run_alns(instance: EVRPTWInstance, initial_solution: Solution, log_path: str = None, stats: dict = None, config: dict = None,
+             stop=None, on_best=None) -> Solution:
+    """Runs the Adaptive Large Neighborhood Search algorithm.
+    The config is read from config/alns_config.json unless given.
+    If a stats dict is given, the iteration count and the runtime are written into it.
+    The stopping criterion defaults to MaxIterations(num_iterations), on_best is called with every new best state.
+    With the route pool enabled, the search runs in segments of route_pool.interval iterations: the routes of every
+    candidate are pooled, and after each segment a set partitioning recombination of the pool and the best solution
+    is made (see route_pool.py). The next segment continues from the current solution, as if the run was not split,
+    unless the recombination found a new best solution, then it continues from that.
+    With the lower bound enabled, the optimality gap of the best solution is printed and written into the stats and
+    the log; with lower_bound.stop_gap set, the search stops early once the gap is at most stop_gap percent (see
+    lower_bound.py). The bound is computed before the search, outside its time limit.
+    With local_search enabled, promising candidates are improved by a budgeted relocate descent on the routes the
+    iteration touched (see local_search_hook.py); its calls, moves, gain and time are reported in the stats and the log.
+    With early_abort enabled, the acceptance draw is made before the repair and the repair operators stop as soon as
+    the candidate would be rejected anyway (see early_abort.py); the aborted repairs are reported like the local search.
+    It is off by default: too few repairs are aborted for a measurable speedup (see DEFAULT_EARLY_ABORT).
+    """
+    if config is None:
+        config = load_alns_config()
+    pool_cfg = {**DEFAULT_ROUTE_POOL, **config.get("route_pool", {})}
+    route_pool = RoutePool(instance, pool_cfg["max_size"]) if pool_cfg["enabled"] else None
 
-    num_iterations = config["num_iterations"]
+    ls_cfg = {**DEFAULT_LOCAL_SEARCH, **config.get("local_search", {})}
+    hook = LocalSearchHook(ls_cfg, initial_solution.compute_total_distance(instance)) if ls_cfg["enabled"] else None
 
-    initial_state = ALNSState.from_solution(instance, initial_solution)
-    sel_cfg = config["selector"]
-    sa_cfg = config["simulated_annealing"]
-    selector = SegmentedRouletteWheel(
-        scores=sel_cfg["scores"],
-        decay=sel_cfg["decay"],
-        seg_length=sel_cfg["seg_length"],
-        num_destroy=sel_cfg["num_destroy"],
-        num_repair=sel_cfg["num_repair"]
-    )
-    criterion = SimulatedAnnealing(
-        start_temperature=sa_cfg["start_temperature"],
-        end_temperature=sa_cfg["end_temperature"],
-        step=1 - sa_cfg["step"],
-        method=sa_cfg["method"]
-    )
-    stop = MaxIterations(num_iterations)
-
-    result = alns.iterate(
-        initial_solution=initial_state,
-        op_select=selector,
-        accept=criterion,
-        stop=stop,
-        objective=lambda state: state.cost,
-        xi=config["xi"],
-        p=config["p"]
-    )
+    abort_cfg = {**DEFAULT_EARLY_ABORT, **config.get("early_abort", {})}
+    criterion = build_criterion(config, threshold_rng=rnd.default_rng([config["seed"], 1]) if abort_cfg["enabled"] else None)
+    early_abort = EarlyAbort(criterion, hook) if abort_cfg["enabled"] else None
+
+    rng = rnd.default_rng(config["seed"])
+    alns = build_alns(config, rng=rng, hook=hook, early_abort=early_abort)
+    callbacks = CallbackDispatcher(alns)
+    if on_best is not None:
+        # A segment's best starts from its initial solution, only report the candidates that beat the run's best
+        callbacks.add(Outcome.BEST, lambda candidate, rng, **kwargs:
+                      on_best(candidate, rng, **kwargs) if candidate.objective() < best.objective() else None)
+    if route_pool is not None:
+        callbacks.add_all(lambda state, rng, **kwargs: route_pool.add_routes(state.routes))
 
-    best_state: ALNSState = result.best_state
-    best_solution = Solution(routes=best_state.routes)
+    state = ALNSState.from_solution(instance, initial_solution)
+    best = state
+    selector = build_selector(config)
+    if stop is None:
+        stop = MaxIterations(config["num_iterations"])
+
+    bound_cfg = {**DEFAULT_LOWER_BOUND, **config.get("lower_bound", {})}
+    lower_bound = None
+    if bound_cfg["enabled"] or bound_cfg["stop_gap"] is not None:
+        lower_bound = get_lower_bound(instance, bound_cfg["method"])
+        if bound_cfg["stop_gap"] is not None:
+            stop = GapStop(stop, lower_bound, bound_cfg["stop_gap"])
+    insertion_pool = create_insertion_pool(instance, config)
+
+    # The selector and the criterion are shared by the segments, so the operator weights and the temperature carry over
+    results = []
+    recombinations = []
+    t_start = time.perf_counter()
+    try:
+        while True:
+            segment_stop = SegmentStop(stop, pool_cfg["interval"] if route_pool is not None else None)
+            result = alns.iterate(
+                initial_solution=state,
+                op_select=selector,
+                accept=criterion,
+                stop=segment_stop,
+                objective=lambda state: state.cost,
+                insertion_pool=insertion_pool,
+                **operator_kwargs(config)
+            )
+            results.append(result)
+            if result.best_state.objective() < best.objective():
+                best = result.best_state
+            state = segment_stop.current
+
+            if route_pool is not None:
+                t_recombine = time.perf_counter()
+                cost_before = best.objective()
+                cost, routes = recombine(instance, route_pool, best.routes, pool_cfg)
+                if cost < cost_before:
+                    best = state = ALNSState(instance, [list(r) for r in routes])
+                    if on_best is not None:
+                        on_best(best, rng)
+                    if hook is not None:
+                        hook.best_cost = min(hook.best_cost, cost)
+                recombinations.append({
+                    "iteration": sum(len(r.statistics.objectives) - 1 for r in results),
+                    "pool_size": len(route_pool),
+                    "before": cost_before,
+                    "after": min(cost, cost_before),
+                    "time": time.perf_counter() - t_recombine,
+                })
+            if not segment_stop.segment_ended:
+                break
+    finally:
+        if insertion_pool is not None:
+            insertion_pool.close()
+
+    best_solution = Solution(routes=best.routes)
     best_solution.compute_total_distance(instance)
 
     #result.plot_operator_counts()
@@ -70,34 +155,179 @@ def run_alns(instance: EVRPTWInstance, initial_solution: Solution, log_path: str
 
     #plt.savefig("operator_counts_large.png", dpi=200)
 
-    stats = result.statistics
+    # The first objective of a segment is its initial solution
+    objectives = list(results[0].statistics.objectives)
+    for result in results[1:]:
+        objectives.extend(result.statistics.objectives[1:])
+    num_iterations = len(objectives) - 1
+    total_runtime = time.perf_counter() - t_start
 
-    destroy_operator_names = list(stats.destroy_operator_counts.keys())
-    destroy_operator_counts = [stats.destroy_operator_counts[name] for name in destroy_operator_names]
-    destroy_operator_total_counts = [sum(stats.destroy_operator_counts[name]) for name in destroy_operator_names]
+    gap = optimality_gap(best_solution.total_distance, lower_bound) if lower_bound is not None else None
+    if gap is not None:
+        print(f"[INFO] Optimality gap: {gap:.2f}% (lower bound {lower_bound:.2f})")
 
-    repair_operator_names = list(stats.repair_operator_counts.keys())
-    repair_operator_counts = [stats.repair_operator_counts[name] for name in repair_operator_names]
-    repair_operator_total_counts = [sum(stats.repair_operator_counts[name]) for name in repair_operator_names]
+    if stats is not None:
+        stats["total_iterations"] = num_iterations
+        stats["total_time"] = total_runtime
+        if lower_bound is not None:
+            stats["lower_bound"] = lower_bound
+            stats["gap"] = gap
+        if hook is not None:
+            stats["local_search"] = dict(hook.stats)
+        if early_abort is not None:
+            stats["early_abort"] = dict(early_abort.stats)
 
     if log_path:
+        destroy_counts, repair_counts = {}, {}
+        for result in results:
+            for counts, totals in ((result.statistics.destroy_operator_counts, destroy_counts),
+                                   (result.statistics.repair_operator_counts, repair_counts)):
+                for name, outcomes in counts.items():
+                    totals[name] = [a + b for a, b in zip(totals.get(name, [0] * len(outcomes)), outcomes)]
+
         log_data = {
-            "objectives": list(stats.objectives),
-            "destroy_operator_names": destroy_operator_names,
-            "destroy_operator_outcome_counts": destroy_operator_counts,
-            "destroy_operator_total_counts": destroy_operator_total_counts,
-            "repair_operator_names": repair_operator_names,
-            "repair_operator_outcome_counts": repair_operator_counts,
-            "repair_operator_total_counts": repair_operator_total_counts,
-            "operator_outcome_labels": ["best", "better", "accepted", "rejected"],
-            "runtimes": list(stats.runtimes),
-            "total_runtime": stats.total_runtime,
+            "objectives": objectives,
+            **operator_statistics(destroy_counts, repair_counts),
+            "operator_outcome_labels": OPERATOR_OUTCOME_LABELS,
+            "runtimes": [runtime for result in results for runtime in result.statistics.runtimes],
+            "total_runtime": total_runtime,
             "num_iterations": num_iterations,
             "best_solution": {
                 "total_distance": best_solution.total_distance,
                 "routes": best_solution.routes
             }
         }
+        if route_pool is not None:
+            log_data["recombinations"] = recombinations
+        if lower_bound is not None:
+            log_data["lower_bound"] = lower_bound
+            log_data["gap"] = gap
+        if hook is not None:
+            log_data["local_search"] = hook.stats
+        if early_abort is not None:
+            log_data["early_abort"] = early_abort.stats
         save_log(log_path, log_data)
 
     return best_solution
+
+class CallbackDispatcher:
+    """The alns library keeps one callback per outcome, this lets several listeners share them."""
+    def __init__(self, alns: ALNS) -> None:
+        self.listeners = {outcome: [] for outcome in Outcome}
+        for outcome, register in ((Outcome.BEST, alns.on_best), (Outcome.BETTER, alns.on_better),
+                                  (Outcome.ACCEPT, alns.on_accept), (Outcome.REJECT, alns.on_reject)):
+            register(self._dispatcher(outcome))
+
+    def _dispatcher(self, outcome: Outcome):
+        listeners = self.listeners[outcome]
+        def dispatch(state, rng, **kwargs) -> None:
+            for listener in listeners:
+                listener(state, rng, **kwargs)
+        dispatch.__name__ = f"dispatch_{outcome.name.lower()}"
+        return dispatch
+
+    def add(self, outcome: Outcome, listener) -> None:
+        self.listeners[outcome].append(listener)
+
+    def add_all(self, listener) -> None:
+        """Registers the listener for every outcome, i.e. for every candidate solution."""
+        for outcome in Outcome:
+            self.add(outcome, listener)
+
+class SegmentStop:
+    """Stops after segment_length iterations (segment_ended is set) or when the run's own criterion stops.
+    The run's criterion is not called once the segment has ended, so iteration counting criteria stay exact.
+    The last current solution is kept, the next segment continues from it."""
+    def __init__(self, stop, segment_length: int = None) -> None:
+        self.stop = stop
+        self.segment_length = segment_length
+        self.segment_ended = False
+        self._iterations = 0
+        self.current = None
+
+    def __call__(self, rng, best, current) -> bool:
+        self.current = current
+        if self.segment_length is not None and self._iterations >= self.segment_length:
+            self.segment_ended = True
+            return True
+        self._iterations += 1
+        return self.stop(rng, best, current)
+
+def build_alns(config: dict, rng: rnd.Generator = None, hook: LocalSearchHook = None, early_abort: EarlyAbort = None) -> ALNS:
+    """Creates the ALNS instance with the operators listed in the config. The RNG is seeded from the config unless given.
+    If a local search hook or an early abort is given, the operators are wrapped by them (the early abort innermost, so
+    the hook sees the rejected candidates). While memory profiling is active, every operator call is measured (the
+    hook's local search is not part of the repair operator's measurement)."""
+    alns = ALNS(rng if rng is not None else rnd.default_rng(config["seed"]))
+
+    for name in config.get("destroy_operators", DEFAULT_DESTROY_OPERATORS):
+        if name not in DESTROY_OPERATORS:
+            raise ValueError(f"Unknown destroy operator: {name}")
+        operator = measure(name, DESTROY_OPERATORS[name])
+        if early_abort is not None:
+            operator = early_abort.wrap_destroy(operator)
+        alns.add_destroy_operator(hook.wrap_destroy(operator) if hook is not None else operator, name)
+    for name in config.get("repair_operators", DEFAULT_REPAIR_OPERATORS):
+        if name not in REPAIR_OPERATORS:
+            raise ValueError(f"Unknown repair operator: {name}")
+        operator = measure(name, REPAIR_OPERATORS[name])
+        if early_abort is not None:
+            operator = early_abort.wrap_repair(operator)
+        alns.add_repair_operator(hook.wrap_repair(operator) if hook is not None else operator, name)
+
+    return alns
+
+def operator_kwargs(config: dict) -> dict:
+    """Keyword arguments passed to every operator call."""
+    return {
+        "xi": config["xi"],
+        "p": config["p"],
+        "relatedness": config.get("relatedness"),
+        "string_removal": config.get("string_removal"),
+    }
+
+def build_selector(config: dict) -> SegmentedRouletteWheel:
+    sel_cfg = config["selector"]
+    return SegmentedRouletteWheel(
+        scores=sel_cfg["scores"],
+        decay=sel_cfg["decay"],
+        seg_length=sel_cfg["seg_length"],
+        num_destroy=len(config.get("destroy_operators", DEFAULT_DESTROY_OPERATORS)),
+        num_repair=len(config.get("repair_operators", DEFAULT_REPAIR_OPERATORS))
+    )
+
+def build_criterion(config: dict, start_temperature: float = None, threshold_rng: rnd.Generator = None) -> SimulatedAnnealing:
+    """Creates the simulated annealing criterion. A start temperature can be given to continue an interrupted schedule.
+    With a threshold RNG, it is a ThresholdAnnealing that draws its acceptance threshold in advance from that RNG."""
+    sa_cfg = config["simulated_annealing"]
+    kwargs = {
+        "start_temperature": sa_cfg["start_temperature"] if start_temperature is None else start_temperature,
+        "end_temperature": sa_cfg["end_temperature"],
+        "step": 1 - sa_cfg["step"],
+        "method": sa_cfg["method"],
+    }
+    if threshold_rng is not None:
+        return ThresholdAnnealing(rng=threshold_rng, **kwargs)
+    return SimulatedAnnealing(**kwargs)
+
+def temperature_after(config: dict, num_iterations: int) -> float:
+    """Returns the simulated annealing temperature after the given number of iterations."""
+    sa_cfg = config["simulated_annealing"]
+    if sa_cfg["method"] == "exponential":
+        temperature = sa_cfg["start_temperature"] * (1 - sa_cfg["step"]) ** num_iterations
+    else:
+        temperature = sa_cfg["start_temperature"] - (1 - sa_cfg["step"]) * num_iterations
+    return max(sa_cfg["end_temperature"], temperature)
+
+def operator_statistics(destroy_counts: dict, repair_counts: dict) -> dict:
+    """Converts the per operator outcome counts into the log format."""
+    destroy_operator_names = list(destroy_counts.keys())
+    repair_operator_names = list(repair_counts.keys())
+    return {
+        "destroy_operator_names": destroy_operator_names,
+        "destroy_operator_outcome_counts": [list(destroy_counts[name]) for name in destroy_operator_names],
+        "destroy_operator_total_counts": [sum(destroy_counts[name]) for name in destroy_operator_names],
+        "repair_operator_names": repair_operator_names,
+        "repair_operator_outcome_counts": [list(repair_counts[name]) for name in repair_operator_names],
+        "repair_operator_total_counts": [sum(repair_counts[name]) for name in repair_operator_names],
+    }
@@ -0,0 +1,221 @@
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Heuristic mode names of the CLI -> HeuristicMode member names
+SOLVE_MODES = {
+    "construct": "CONSTRUCT_ONLY",
+    "local_search": "CONSTRUCT_LOCAL",
+    "alns": "CONSTRUCT_ALNS",
+    "island_alns": "CONSTRUCT_ISLAND_ALNS",
+    "decomposition": "CONSTRUCT_DECOMPOSITION",
+    "racing": "CONSTRUCT_RACING",
+}
+
+# Modules each entry point needs before it can start working, timed by bench-startup
+ENTRY_IMPORTS = {
+    "verify": ["test.verifier"],
+    "construct": ["test.run_heuristic", "construction"],
+    "local_search": ["test.run_heuristic", "local_search"],
+    "alns": ["test.run_heuristic", "alns_solve.run_alns"],
+    "island_alns": ["test.run_heuristic", "alns_solve.island_alns"],
+    "decomposition": ["test.run_heuristic", "alns_solve.decomposition"],
+    "racing": ["test.run_heuristic", "alns_solve.racing"],
+    "serve": ["service.server"],
+}
+
+SRC_FOLDER = Path(__file__).parent
+
+def heuristic_mode(name: str):
+    from test.heuristic_mode import HeuristicMode
+    return HeuristicMode[SOLVE_MODES[name]]
+
+def cmd_solve(args: argparse.Namespace) -> None:
+    from test.run_heuristic import run_heuristic_on_all_instances
+    from data import ResultsStore, ResultCache, RunArchive
+
+    if not args.solutions and not args.archive:
+        raise ValueError("Either --solutions or --archive is required")
+    archive = RunArchive(args.archive) if args.archive else None
+    run_heuristic_on_all_instances(
+        instance_folder=args.instances,
+        solution_folder=args.solutions or "",
+        mode=heuristic_mode(args.mode),
+        log_folder=args.logs,
+        results_store=ResultsStore(args.results) if args.results else None,
+        warm_start_folder=args.warm_start or None,
+        result_cache=ResultCache(args.cache) if args.cache else None,
+        force=args.force,
+        archive=archive,
+        memory=args.memory,
+    )
+    if archive is not None:
+        archive.close()
+
+def cmd_multi_seed(args: argparse.Namespace) -> None:
+    from test.multi_seed_run import multi_seed_alns_experiment
+
+    multi_seed_alns_experiment(
+        instance_folder=args.instances,
+        base_solution_folder=args.solutions,
+        base_log_folder=args.logs,
+        base_config_path=args.config,
+        seed_values=args.seeds,
+        mode=heuristic_mode(args.mode),
+        results_path=args.results,
+        warm_start=args.warm_start,
+        cache_path=args.cache,
+        force=args.force,
+        archive_path=args.archive,
+    )
+
+def cmd_tune(args: argparse.Namespace) -> None:
+    from test.parameter_tuning import tune_wait_time_weight_on_folder
+
+    weight_values = args.weights
+    if weight_values is None:
+        weight_values = [round(x * args.step, 3) for x in range(0, int(1 / args.step) + 1)]
+    tune_wait_time_weight_on_folder(args.instances, args.solutions, args.config, weight_values,
+                                    results_path=args.results, cache_path=args.cache, force=args.force)
+
+def cmd_archive(args: argparse.Namespace) -> None:
+    from data import RunArchive
+
+    with RunArchive(args.archive) as archive:
+        if args.export_solutions:
+            count = archive.export(args.export_solutions, args.export_logs)
+            print(f"[INFO] Exported {count} entries from {args.archive}")
+        else:
+            for instance, seed, phase, kind in archive.keys():
+                print(f"{instance}\t{seed}\t{phase}\t{kind}")
+
+def cmd_memory_diff(args: argparse.Namespace) -> None:
+    from common.memory_profile import load_memory_logs, diff_memory_logs, format_bytes
+
+    base, other = load_memory_logs(args.base), load_memory_logs(args.other)
+    common = base.keys() & other.keys()
+    print(f"{len(common)} common instances ({len(base)} in {args.base}, {len(other)} in {args.other})")
+    print(f"{'scope':<36}{'base peak':>12}{'other peak':>12}{'change':>9}{'base net':>12}{'other net':>12}")
+    for row in diff_memory_logs(base, other):
+        a, b = row["base_peak"], row["other_peak"]
+        change = f"{(b - a) / a * 100:+.1f}%" if a and b is not None else ""
+        print(f"{row['scope']:<36}{format_bytes(a):>12}{format_bytes(b):>12}{change:>9}"
+              f"{format_bytes(row['base_net']):>12}{format_bytes(row['other_net']):>12}")
+
+def cmd_verify(args: argparse.Namespace) -> None:
+    from test.verifier import run_verifier_all_solutions_in_directories
+    run_verifier_all_solutions_in_directories(args.verifier, args.instances, args.solutions)
+
+def cmd_serve(args: argparse.Namespace) -> None:
+    import asyncio
+    from service.server import serve
+    asyncio.run(serve(args.host, args.port, args.workers, args.max_queue, args.job_ttl, args.max_finished))
+
+def cmd_bench_startup(args: argparse.Namespace) -> None:
+    """Times a fresh interpreter that imports what an entry point needs, against a bare interpreter.
+    Every measurement is a new process, so nothing is cached in sys.modules between repeats."""
+    entries = args.entries or list(ENTRY_IMPORTS)
+    for entry in entries:
+        if entry not in ENTRY_IMPORTS:
+            raise ValueError(f"Unknown entry point: {entry} (expected one of {list(ENTRY_IMPORTS)})")
+
+    baseline = median_startup_time("pass", args.repeats)
+    print(f"{'entry point':<16}{'median [ms]':>14}{'imports [ms]':>14}")
+    print(f"{'(interpreter)':<16}{baseline * 1000:>14.1f}{0.0:>14.1f}")
+    for entry in entries:
+        code = "; ".join(f"import {module}" for module in ENTRY_IMPORTS[entry])
+        elapsed = median_startup_time(code, args.repeats)
+        print(f"{entry:<16}{elapsed * 1000:>14.1f}{(elapsed - baseline) * 1000:>14.1f}")
+
+def median_startup_time(code: str, repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=SRC_FOLDER, check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="E-VRPTW solver (run from src/)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    solve = commands.add_parser("solve", help="solve every instance of a folder")
+    solve.add_argument("--mode", choices=list(SOLVE_MODES), default="construct")
+    solve.add_argument("--instances", default="../instances/instances", help="instance folder")
+    solve.add_argument("--solutions", help="output folder of the .sol files (required unless --archive is given)")
+    solve.add_argument("--logs", help="log folder (no logs if omitted)")
+    solve.add_argument("--results", help="results store folder")
+    solve.add_argument("--cache", help="result cache folder")
+    solve.add_argument("--force", action="store_true", help="re-run jobs that are already in the result cache")
+    solve.add_argument("--warm-start", nargs="+", metavar="FOLDER", help="folders of saved solutions to start from")
+    solve.add_argument("--archive", help="archive file of the solutions and logs (instead of the --solutions and --logs folders)")
+    solve.add_argument("--memory", action="store_true", help="measure the memory of the phases and operators into memory logs (slow)")
+    solve.set_defaults(handler=cmd_solve)
+
+    multi_seed = commands.add_parser("multi-seed", help="run an experiment with several seeds")
+    multi_seed.add_argument("--mode", choices=list(SOLVE_MODES), default="alns")
+    multi_seed.add_argument("--instances", default="../instances/instances")
+    multi_seed.add_argument("--solutions", default="../solutions/alns", help="base solution folder, one subfolder per seed")
+    multi_seed.add_argument("--logs", default="../logs/alns", help="base log folder, one subfolder per seed")
+    multi_seed.add_argument("--config", default="./config/alns_config.json", help="base ALNS config")
+    multi_seed.add_argument("--seeds", type=int, nargs="+", default=[1234, 5678, 42, 10001, 4321])
+    multi_seed.add_argument("--results", default="../results/alns")
+    multi_seed.add_argument("--cache", default="../results/cache")
+    multi_seed.add_argument("--force", action="store_true")
+    multi_seed.add_argument("--warm-start", action="store_true", help="start from the best saved solution of any seed")
+    multi_seed.add_argument("--archive", help="one archive file for the solutions and logs of all seeds (instead of the folders)")
+    multi_seed.set_defaults(handler=cmd_multi_seed)
+
+    tune = commands.add_parser("tune", help="tune the wait time weight of the construction")
+    tune.add_argument("--instances", default="../instances/instances")
+    tune.add_argument("--solutions", default="../solutions/construction")
+    tune.add_argument("--config", default="./config/construction_config.json")
+    tune.add_argument("--weights", type=float, nargs="+", help="weights to try (default: 0 to 1 by --step)")
+    tune.add_argument("--step", type=float, default=0.025)
+    tune.add_argument("--results")
+    tune.add_argument("--cache")
+    tune.add_argument("--force", action="store_true")
+    tune.set_defaults(handler=cmd_tune)
+
+    archive = commands.add_parser("archive", help="list the entries of a run archive or export them as files")
+    archive.add_argument("archive", help="archive file")
+    archive.add_argument("--export-solutions", metavar="FOLDER", help="base solution folder, one subfolder per seed")
+    archive.add_argument("--export-logs", metavar="FOLDER", help="base log folder, one subfolder per seed")
+    archive.set_defaults(handler=cmd_archive)
+
+    memory_diff = commands.add_parser("memory-diff", help="compare the memory logs of two runs")
+    memory_diff.add_argument("base", help="memory log file, log folder or run archive")
+    memory_diff.add_argument("other", help="memory log file, log folder or run archive")
+    memory_diff.set_defaults(handler=cmd_memory_diff)
+
+    verify = commands.add_parser("verify", help="run the verifier on every solution of a folder")
+    verify.add_argument("--verifier", default="../pyEVRPVerifier/src/main.py")
+    verify.add_argument("--instances", default="../instances/instances")
+    verify.add_argument("--solutions", required=True)
+    verify.set_defaults(handler=cmd_verify)
+
+    serve = commands.add_parser("serve", help="start the local solve service")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--workers", type=int, default=2, help="maximum number of concurrently running jobs")
+    serve.add_argument("--max-queue", type=int, default=100)
+    serve.add_argument("--job-ttl", type=float, default=3600.0, help="seconds a finished job stays queryable")
+    serve.add_argument("--max-finished", type=int, default=1000, help="maximum number of finished jobs kept")
+    serve.set_defaults(handler=cmd_serve)
+
+    bench = commands.add_parser("bench-startup", help="measure the import time of the entry points")
+    bench.add_argument("entries", nargs="*", help=f"entry points to measure (default: all of {list(ENTRY_IMPORTS)})")
+    bench.add_argument("--repeats", type=int, default=5)
+    bench.set_defaults(handler=cmd_bench_startup)
+
+    return parser
+
+def main(argv: list[str] = None) -> None:
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import sys
+from importlib import import_module
+from types import ModuleType
+
+class LazyPackage(ModuleType):
+    """Package whose exported names (the _EXPORTS map: name -> relative submodule) are imported on first access."""
+    def __getattr__(self, name: str):
+        exports = self.__dict__["_EXPORTS"]
+        if name not in exports:
+            raise AttributeError(f"module {self.__name__!r} has no attribute {name!r}")
+        value = getattr(import_module(exports[name], self.__name__), name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self) -> list[str]:
+        return list(self.__dict__["_EXPORTS"])
+
+    def __setattr__(self, name: str, value) -> None:
+        # Importing a submodule binds it on the package. If it is named like its export (run_alns.run_alns),
+        # keep the exported object, otherwise `from package import name` returns the module afterwards.
+        if isinstance(value, ModuleType) and self.__dict__["_EXPORTS"].get(name) == "." + name:
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+def lazy_exports(package: str) -> None:
+    """Turns the package into a LazyPackage. Call at the end of its __init__, after defining _EXPORTS."""
+    sys.modules[package].__class__ = LazyPackage
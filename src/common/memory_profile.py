@@ -0,0 +1,235 @@
+from contextlib import contextmanager
+from pathlib import Path
+import json
+import os
+import threading
+import tracemalloc
+
+try:
+    import resource # not available on Windows
+except ImportError:
+    resource = None
+
+RSS_SAMPLE_INTERVAL = 0.01 # seconds
+TOP_SITES = 10
+
+_active: 'MemoryProfiler | None' = None
+
+class MemoryProfiler:
+    """Attributes Python allocations (tracemalloc) and the resident set size (RSS) to named scopes.
+    A scope is a phase (construction, local search, ALNS, logging) or a wrapped function (an ALNS operator); every
+    call of a scope records the net allocation (memory still held at its end), the allocation peak above the
+    memory at its start and, for phases, the sampled RSS peak and the allocation sites that grew the most.
+    Nested scopes are measured separately, an outer scope's peak includes its inner scopes.
+    Only the calling process is traced, work done in worker processes is not counted.
+    """
+    def __init__(self, top_sites: int = TOP_SITES, sample_interval: float = RSS_SAMPLE_INTERVAL) -> None:
+        self.top_sites = top_sites
+        self.sample_interval = sample_interval
+        self.phases: dict[str, dict] = {}
+        self.functions: dict[str, dict] = {}
+        self._stack = [] # (allocation peak, RSS peak) of the open scopes before their last reset
+        self._rss_peak = 0
+        self._sampler = None
+        self._stop_sampler = threading.Event()
+
+    def start(self) -> None:
+        tracemalloc.start()
+        rss = current_rss()
+        if rss is not None:
+            self._rss_peak = rss
+            self._sampler = threading.Thread(target=self._sample_rss, name="rss-sampler", daemon=True)
+            self._sampler.start()
+
+    def stop(self) -> None:
+        self._stop_sampler.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        tracemalloc.stop()
+
+    def _sample_rss(self) -> None:
+        while not self._stop_sampler.wait(self.sample_interval):
+            self._rss_peak = max(self._rss_peak, current_rss())
+
+    @contextmanager
+    def phase(self, name: str):
+        snapshot = tracemalloc.take_snapshot() if self.top_sites else None
+        rss_start = current_rss()
+        start = self._enter()
+        try:
+            yield
+        finally:
+            net, peak, rss_peak = self._exit(start)
+            entry = self.phases.setdefault(name, new_entry(rss=True))
+            add_call(entry, net, peak)
+            if rss_start is not None:
+                if entry["calls"] == 1:
+                    entry["rss_start"] = rss_start
+                entry["rss_peak"] = max(entry["rss_peak"], rss_peak)
+                entry["rss_end"] = current_rss()
+            if snapshot is not None:
+                entry["top_sites"] = top_sites(snapshot, tracemalloc.take_snapshot(), self.top_sites)
+
+    def wrap(self, name: str, function):
+        """Returns the function measured as the scope name (functools.wraps is not used: the alns library reads
+        the __name__ only)."""
+        def measured(*args, **kwargs):
+            start = self._enter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                net, peak, _ = self._exit(start)
+                add_call(self.functions.setdefault(name, new_entry()), net, peak)
+        measured.__name__ = function.__name__
+        return measured
+
+    def _enter(self) -> int:
+        current, peak = tracemalloc.get_traced_memory()
+        # The peaks are reset for the new scope: fold them into the enclosing scope first
+        if self._stack:
+            outer_peak, outer_rss_peak = self._stack[-1]
+            self._stack[-1] = (max(outer_peak, peak), max(outer_rss_peak, self._rss_peak))
+        self._stack.append((0, 0))
+        tracemalloc.reset_peak()
+        self._rss_peak = current_rss() or 0
+        return current
+
+    def _exit(self, start: int) -> tuple[int, int, int]:
+        """Returns the net allocation, the allocation peak above the start and the RSS peak of the scope."""
+        current, peak = tracemalloc.get_traced_memory()
+        folded_peak, folded_rss_peak = self._stack.pop()
+        peak = max(folded_peak, peak)
+        rss_peak = max(folded_rss_peak, self._rss_peak)
+        if self._stack:
+            outer_peak, outer_rss_peak = self._stack[-1]
+            self._stack[-1] = (max(outer_peak, peak), max(outer_rss_peak, rss_peak))
+        return current - start, peak - start, rss_peak
+
+    def report(self) -> dict:
+        """Returns the results in the log format (bytes)."""
+        return {
+            "phases": self.phases,
+            "functions": self.functions,
+            "max_rss": max_rss(),
+        }
+
+def new_entry(rss: bool = False) -> dict:
+    entry = {"calls": 0, "net": 0, "max_net": 0, "peak": 0}
+    if rss:
+        entry.update({"rss_start": 0, "rss_peak": 0, "rss_end": 0})
+    return entry
+
+def add_call(entry: dict, net: int, peak: int) -> None:
+    entry["calls"] += 1
+    entry["net"] += net
+    entry["max_net"] = max(entry["max_net"], net)
+    entry["peak"] = max(entry["peak"], peak)
+
+def top_sites(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, limit: int) -> list[dict]:
+    """Returns the source lines whose allocated size grew the most between the snapshots."""
+    ignored = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__),
+               tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")]
+    differences = after.filter_traces(ignored).compare_to(before.filter_traces(ignored), "lineno")
+    return [
+        {"site": f"{Path(diff.traceback[0].filename).name}:{diff.traceback[0].lineno}", "size": diff.size_diff, "count": diff.count_diff}
+        for diff in differences[:limit] if diff.size_diff > 0
+    ]
+
+def current_rss() -> int | None:
+    """Returns the resident set size of the process in bytes, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def max_rss() -> int | None:
+    """Returns the peak resident set size of the process in bytes so far, or None without the resource module."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == "Darwin" else peak * 1024 # kilobytes on Linux
+
+@contextmanager
+def memory_profiling(enabled: bool = True, top_sites: int = TOP_SITES):
+    """Traces the allocations in the block and yields the active MemoryProfiler (None if not enabled).
+    While it is active, memory_phase() and measure() record into it, they do nothing otherwise."""
+    global _active
+    if not enabled:
+        yield None
+        return
+    if _active is not None:
+        raise RuntimeError("Memory profiling is already active")
+
+    profiler = MemoryProfiler(top_sites=top_sites)
+    profiler.start()
+    _active = profiler
+    try:
+        with profiler.phase("total"):
+            yield profiler
+    finally:
+        _active = None
+        profiler.stop()
+
+def active_profiler() -> MemoryProfiler | None:
+    return _active
+
+@contextmanager
+def memory_phase(name: str | None):
+    """Records the block as a phase of the active profiler, if there is one (and a name is given)."""
+    if _active is None or name is None:
+        yield
+        return
+    with _active.phase(name):
+        yield
+
+def measure(name: str, function):
+    """Returns the function wrapped as a scope of the active profiler, or the function itself without one."""
+    return _active.wrap(name, function) if _active is not None else function
+
+def format_bytes(size: int | None) -> str:
+    if size is None:
+        return "n/a"
+    for unit in ("B", "KB", "MB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.2f} GB"
+
+def load_memory_logs(path: str) -> dict[str, dict]:
+    """Reads the memory logs of a run: a memory log file, a log folder (or its memory subfolder) or a run archive.
+    Returns instance -> report (the archive keys get the seed appended unless it is -1)."""
+    path = Path(path)
+    if path.is_dir():
+        folder = path / "memory" if (path / "memory").is_dir() else path
+        return {file.name.removesuffix("_log.json"): json.loads(file.read_text()) for file in sorted(folder.glob("*_log.json"))}
+    if path.suffix == ".json":
+        return {path.name.removesuffix(".json").removesuffix("_log"): json.loads(path.read_text())}
+    if not path.exists():
+        raise FileNotFoundError(f"No memory logs at {path}")
+
+    from data.run_archive import LOG, RunArchive
+    with RunArchive(path) as archive:
+        return {
+            instance if seed == -1 else f"{instance} (seed {seed})": archive.get_log(instance, seed, phase)
+            for instance, seed, phase, _ in archive.keys(LOG) if phase == "memory"
+        }
+
+def diff_memory_logs(base: dict[str, dict], other: dict[str, dict]) -> list[dict]:
+    """Compares the scopes of the instances present in both runs: the largest peak and the total net allocation of
+    every phase and function over the instances, and the largest max RSS."""
+    instances = sorted(base.keys() & other.keys())
+    rows = []
+    def aggregate(logs: dict, section: str, name: str) -> tuple[int, int] | None:
+        entries = [logs[i][section][name] for i in instances if name in logs[i][section]]
+        return (max(e["peak"] for e in entries), sum(e["net"] for e in entries)) if entries else None
+
+    for section in ("phases", "functions"):
+        names = {name for i in instances for logs in (base, other) for name in logs[i][section]}
+        for name in sorted(names):
+            a, b = aggregate(base, section, name), aggregate(other, section, name)
+            rows.append({"scope": f"{section[:-1]}:{name}", "base_peak": a and a[0], "other_peak": b and b[0],
+                         "base_net": a and a[1], "other_net": b and b[1]})
+    rss = [max((logs[i]["max_rss"] or 0 for i in instances), default=None) for logs in (base, other)]
+    rows.append({"scope": "max_rss", "base_peak": rss[0], "other_peak": rss[1], "base_net": None, "other_net": None})
+    return rows
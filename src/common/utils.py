@@ -9,6 +9,10 @@ def compute_route_distance(instance: EVRPTWInstance, route: list[int]) -> float:
         for i in range(len(route) - 1)
     )
 
+def served_customers(instance: EVRPTWInstance, routes: list[list[int]]) -> list[int]:
+    """Returns the sorted customer visits of the routes (a customer served twice appears twice)."""
+    return sorted(node for route in routes for node in route if instance.is_customer(node))
+
 def check_route_feasibility_constraints(instance: EVRPTWInstance, route: list[int]) -> tuple[bool, bool, bool]:
     """
     Checks whether the given route satisfies all key feasibility constraints.
@@ -72,7 +76,7 @@ def find_best_station_for_customer_insert(instance: EVRPTWInstance, route: list[
     best_route = None
     best_distance = float('inf')
 
-    for station_id in instance.station_ids:
+    for station_id in (instance.stations_before[customer] if before else instance.stations_after[customer]):
         if before:
             candidate = route[:insert_pos] + [station_id, customer] + route[insert_pos:]
         else:
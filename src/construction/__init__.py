@@ -1,3 +1,5 @@
 from .construction_heuristic import construct_greedy_solution
+from .customer_select import load_construction_config
+from .portfolio import construct_portfolio
 
-__all__ = ["construct_greedy_solution"]
\ No newline at end of file
+__all__ = ["construct_greedy_solution", "load_construction_config", "construct_portfolio"]
\ No newline at end of file
@@ -1,32 +1,56 @@
+from dataclasses import dataclass
 from typing import Optional
 import time
 import json
 
+import numpy as np
+
 from data.log_saver import save_log
 from model import EVRPTWInstance, Solution, RouteStatus
-from .customer_select import select_next_customer
-
-def construct_greedy_solution(instance: EVRPTWInstance, log_path: str = None) -> Solution:
+from .customer_select import select_next_customer, load_construction_config
+
+@dataclass
+class ConstructionArrays:
+    """Per node arrays used to filter the candidate customers of a route at once."""
+    demand: np.ndarray
+    ready: np.ndarray
+    due: np.ndarray
+    depot_reach_energy: np.ndarray # min energy needed to reach the depot (directly or via a station) from the node
+    station_ids: np.ndarray
+    station_distances: np.ndarray # station x node distance matrix
+
+def construct_greedy_solution(instance: EVRPTWInstance, log_path: str = None, wait_time_weight: float = None,
+                              rng: np.random.Generator = None, tie_tolerance: float = 0.0, should_stop=None) -> Solution:
     """Constructs a greedy solution for the EVRPTW problem.
     The heuristic run until all customers are served or no feasible solution can be found.
     Each iteration constructs a route. 
+    The wait time weight is read from config/construction_config.json unless given.
+    If an RNG is given, the next customer is chosen randomly among the near ties (see select_next_customer).
+    If should_stop is given, it is called before every route and the construction gives up (returns None) when it returns True.
     """
+    if wait_time_weight is None:
+        wait_time_weight = load_construction_config()["wait_time_weight"]
+
     routes = []
     unserved_customers = set(instance.customer_ids)
+    arrays = build_construction_arrays(instance)
 
     t_start = time.time()
     while unserved_customers:
+        if should_stop is not None and should_stop():
+            return None
         route_status = initialize_route(instance)
         initial_unserved_count = len(unserved_customers)
+        candidates = np.array(sorted(unserved_customers), dtype=np.int64)
 
         while True: # One route building iteration
-            feasible_map = get_feasible_customers(instance, route_status, unserved_customers)
+            feasible_map, candidates = get_feasible_customers(instance, route_status, candidates, arrays)
             if not feasible_map: # We cannot serve any customers directly, we have to try some recharging
                 if not handle_no_feasible_customers(instance, route_status):
                     break # We cannot continue this route, we have to finish it
                 continue # We can serve customers with recharging
 
-            next_customer = select_next_customer(instance, route_status, list(feasible_map.keys()))
+            next_customer = select_next_customer(instance, route_status, list(feasible_map.keys()), wait_time_weight, rng, tie_tolerance)
             if next_customer is None:
                 break # No more customers can be selected, finish the route
 
@@ -40,6 +64,7 @@ def construct_greedy_solution(instance: EVRPTWInstance, log_path: str = None) ->
 
             update_route_status(instance, route_status, next_customer, is_customer=True)
             unserved_customers.remove(next_customer)
+            candidates = candidates[candidates != next_customer]
 
         if len(unserved_customers) == initial_unserved_count: 
             print("No feasible solution could be found for remaining customers.")
@@ -105,35 +130,66 @@ def update_route_status(instance: EVRPTWInstance, route_status: RouteStatus, nex
         route_status.remaining_energy = instance.vehicle_energy_capacity
         route_status.last_service_end_time = end_recharge
 
-def get_feasible_customers(instance: EVRPTWInstance, route: RouteStatus, unserved_customers: set[int]) -> dict[int, Optional[int]]:
+def build_construction_arrays(instance: EVRPTWInstance) -> ConstructionArrays:
+    """Collects the customer data into arrays and precomputes the depot reachability of every node."""
+    demand = np.array([node.demand for node in instance.nodes])
+    ready = np.array([node.ready for node in instance.nodes])
+    due = np.array([node.due for node in instance.nodes])
+
+    consumption = instance.vehicle_energy_consumption
+    depot_reach_energy = np.asarray(instance.distance_row(instance.depot_id), dtype=float) * consumption
+    for sid in instance.station_ids:
+        if instance.energy_consumption(sid, instance.depot_id) <= instance.vehicle_energy_capacity: # We can reach depot from this station
+            energy_to_station = np.asarray(instance.distance_row(sid), dtype=float) * consumption
+            np.minimum(depot_reach_energy, energy_to_station, out=depot_reach_energy)
+
+    station_ids = np.array(instance.station_ids, dtype=np.int64)
+    station_distances = np.array([instance.distance_row(sid) for sid in instance.station_ids], dtype=float).reshape(len(station_ids), instance.num_nodes)
+
+    return ConstructionArrays(
+        demand=demand,
+        ready=ready,
+        due=due,
+        depot_reach_energy=depot_reach_energy,
+        station_ids=station_ids,
+        station_distances=station_distances
+    )
+
+def get_feasible_customers(instance: EVRPTWInstance, route: RouteStatus, candidates: np.ndarray, arrays: ConstructionArrays) -> tuple[dict[int, Optional[int]], np.ndarray]:
     """
     Returns the feasible customers that can be served next.
     The return value is a dictionary where:
     - customer_id - None: if directly reachable and depot can be reached after
     - customer_id - station_id: if customer is only reachable after visiting the given station
+    The capacity, time window and direct reachability checks are evaluated for all candidates at once,
+    the station search only runs for the remaining ones.
+    The candidates that fail the capacity or time window check can never be served later in this route
+    (the remaining capacity decreases and the time increases), so the filtered candidates are returned too.
     """
-    feasible_customers = {}
+    distances = np.asarray(instance.distance_row(route.current_location), dtype=float)[candidates]
+    arrival_times = route.last_service_end_time + distances
 
-    for cid in unserved_customers:
-        if route.remaining_capacity < instance.demand(cid):
-            continue # Cannot serve this customer due to capacity constraints
+    # Cannot serve these customers due to capacity or time window constraints
+    keep = (arrays.demand[candidates] <= route.remaining_capacity) & (arrival_times <= arrays.due[candidates])
+    candidates = candidates[keep]
+    energy_needed = distances[keep] * instance.vehicle_energy_consumption
 
-        arrival_time = route.last_service_end_time + instance.travel_time(route.current_location, cid)
-        if arrival_time > instance.due(cid):
-            continue # Cannot serve this customer due to time window constraints
+    # Directly reachable customers, from where the depot can be reached after serving them
+    direct = (energy_needed <= route.remaining_energy) & (arrays.depot_reach_energy[candidates] <= route.remaining_energy - energy_needed)
 
-        energy_needed = instance.energy_consumption(route.current_location, cid)
-        if energy_needed <= route.remaining_energy: # Directly reachable customer
-            remaining_after_serve = route.remaining_energy - energy_needed
-            if can_reach_depot(instance, cid, remaining_after_serve): # Can reach depot after serving this customer
-                feasible_customers[cid] = None # We do not need a station before this customer
-                continue
+    stations_before = iter(find_best_stations_before_customers(instance, route, candidates[~direct], arrays).tolist())
 
-        station_id = find_best_station_before_customer(instance, route, cid)
-        if station_id is not None: # If we need to visit a station and we can reach it
+    feasible_customers = {}
+    for cid, is_direct in zip(candidates.tolist(), direct.tolist()):
+        if is_direct:
+            feasible_customers[cid] = None # We do not need a station before this customer
+            continue
+
+        station_id = next(stations_before)
+        if station_id >= 0: # If we need to visit a station and we can reach it
             feasible_customers[cid] = station_id
 
-    return feasible_customers
+    return feasible_customers, candidates
 
 def handle_no_feasible_customers(instance: EVRPTWInstance, route_status: RouteStatus) -> bool:
     """
@@ -149,6 +205,8 @@ def handle_no_feasible_customers(instance: EVRPTWInstance, route_status: RouteSt
     nearest_station = find_nearest_station(instance, route_status.current_location, route_status.remaining_energy)
     if nearest_station is None: # No station is reachable with the remaining energy
         return False  
+    if nearest_station == route_status.current_location: # We are already recharged here, staying would loop forever
+        return False
 
     # If we found a station, we are going to there
     update_route_status(instance, route_status, nearest_station, is_customer=False)
@@ -159,7 +217,7 @@ def find_best_station_before_customer(instance: EVRPTWInstance, route_status: Ro
     best_station = None
     best_total_distance = float('inf')
 
-    for sid in instance.station_ids:
+    for sid in instance.stations_before[customer_node]:
         energy_to_station = instance.energy_consumption(route_status.current_location, sid)
         if energy_to_station > route_status.remaining_energy: 
             continue # Cannot reach this station
@@ -188,6 +246,39 @@ def find_best_station_before_customer(instance: EVRPTWInstance, route_status: Ro
 
     return best_station
 
+def find_best_stations_before_customers(instance: EVRPTWInstance, route_status: RouteStatus, customers: np.ndarray, arrays: ConstructionArrays) -> np.ndarray:
+    """Vectorized find_best_station_before_customer for several customers (station x customer matrices).
+    Returns the best station of every customer, or -1 if there is none.
+    """
+    if len(customers) == 0 or len(arrays.station_ids) == 0:
+        return np.full(len(customers), -1, dtype=np.int64)
+
+    consumption = instance.vehicle_energy_consumption
+    energy_capacity = instance.vehicle_energy_capacity
+
+    distance_to_station = np.asarray(instance.distance_row(route_status.current_location), dtype=float)[arrays.station_ids]
+    energy_to_station = distance_to_station * consumption
+    arrival_to_station = route_status.last_service_end_time + distance_to_station
+    recharge_amount = energy_capacity - (route_status.remaining_energy - energy_to_station)
+    departure_from_station = arrival_to_station + recharge_amount * instance.inverse_recharging_rate
+
+    station_to_customer = arrays.station_distances[:, customers]
+    energy_station_to_customer = station_to_customer * consumption
+    arrival_to_customer = departure_from_station[:, None] + station_to_customer
+
+    valid = (
+        (energy_to_station <= route_status.remaining_energy)[:, None] # We can reach the station
+        & (energy_station_to_customer <= energy_capacity) # We can reach the customer from the station
+        & (arrival_to_customer <= arrays.due[customers]) # We arrive in the time window of the customer
+        & (arrays.depot_reach_energy[customers] <= energy_capacity - energy_station_to_customer) # We can reach depot after serving the customer
+    )
+
+    # We would like to minimize the total distance traveled
+    total_distance = np.where(valid, distance_to_station[:, None] + station_to_customer, np.inf)
+    best = np.argmin(total_distance, axis=0)
+    has_station = valid[best, np.arange(len(customers))]
+    return np.where(has_station, arrays.station_ids[best], -1)
+
 def can_reach_depot(instance: EVRPTWInstance, from_node: int, remaining_energy: float) -> bool:
     """Checks if we can reach the depot from a given node with the remaining energy."""
     direct_energy = instance.energy_consumption(from_node, instance.depot_id)
@@ -1,25 +1,42 @@
 import json
 from pathlib import Path
 
-from model import EVRPTWInstance, RouteStatus
+import numpy as np
 
-def select_next_customer(instance: EVRPTWInstance, route_status: RouteStatus, feasible_customers: list[int]) -> int | None:
-    customer_costs = {
-        cid: customer_cost(instance, route_status, cid)
-        for cid in feasible_customers
-    }
-    return min(customer_costs, key=customer_costs.get, default=None)
+from model import EVRPTWInstance, RouteStatus
 
-def customer_cost(instance: EVRPTWInstance, route_status: RouteStatus, cid: int) -> float:
+def select_next_customer(instance: EVRPTWInstance, route_status: RouteStatus, feasible_customers: list[int], wait_time_weight: float = None,
+                         rng: np.random.Generator = None, tie_tolerance: float = 0.0) -> int | None:
+    """Returns the feasible customer with the lowest cost (see customer_cost), the first one on ties.
+    If an RNG is given, ties are broken randomly instead: a uniformly chosen customer among those whose cost is
+    within tie_tolerance (relative) of the lowest one."""
+    if not feasible_customers:
+        return None
+    if wait_time_weight is None:
+        wait_time_weight = load_construction_config()["wait_time_weight"]
+
+    customers = np.array(feasible_customers, dtype=np.int64)
+    distances = np.asarray(instance.distance_row(route_status.current_location), dtype=float)[customers]
+    arrival_times = route_status.last_service_end_time + distances
+    ready_times = np.array([instance.ready(cid) for cid in feasible_customers])
+    wait_times = np.maximum(0, ready_times - arrival_times)
+    costs = distances + wait_times * wait_time_weight
+    if rng is None:
+        return feasible_customers[int(np.argmin(costs))]
+    ties = np.flatnonzero(costs <= costs.min() * (1 + tie_tolerance) + 1e-9)
+    return feasible_customers[int(rng.choice(ties))]
+
+def customer_cost(instance: EVRPTWInstance, route_status: RouteStatus, cid: int, wait_time_weight: float = None) -> float:
     travel_time = instance.travel_time(route_status.current_location, cid)
     arrival_time = route_status.last_service_end_time + travel_time
     ready_time = instance.ready(cid)
     wait_time = max(0, ready_time - arrival_time)
     distance = instance.distance(route_status.current_location, cid)
 
-    construction_config = load_construction_config()
+    if wait_time_weight is None:
+        wait_time_weight = load_construction_config()["wait_time_weight"]
 
-    return distance + wait_time * construction_config["wait_time_weight"]
+    return distance + wait_time * wait_time_weight
 
 def load_construction_config():
     config_path = Path(__file__).parent.parent / "config" / "construction_config.json"
@@ -0,0 +1,80 @@
+from concurrent.futures import ProcessPoolExecutor, wait
+import time
+
+import numpy as np
+
+from data.shared_instance import publish_instance, init_worker, worker_instance
+from model import EVRPTWInstance, Solution
+from .construction_heuristic import construct_greedy_solution
+from .customer_select import load_construction_config
+
+DEFAULT_PORTFOLIO = {
+    "enabled": False,
+    "num_starts": 16,
+    "weights": [0.0, 0.25, 0.5, 0.75, 1.0, 1.5],
+    "tie_tolerance": 0.05,
+    "num_workers": 4,
+    "time_limit": 10.0, # wall clock seconds for the whole portfolio
+    "top_k": 1,
+    "seed": 1234,
+}
+
+def construct_portfolio(instance: EVRPTWInstance, config: dict = None, top_k: int = None) -> list[Solution]:
+    """Builds several initial solutions in parallel processes and returns the top_k best distinct ones, best first.
+    Start 0 is the plain construction with the configured wait time weight, the next ones cycle through the
+    portfolio weights: deterministic in the first pass, with randomized tie-breaking afterwards.
+    Starts not finished within time_limit seconds are abandoned (a construction stops before its next route).
+    The settings are read from the "portfolio" section of config/construction_config.json unless given.
+    """
+    if config is None:
+        config = load_construction_config()
+    cfg = {**DEFAULT_PORTFOLIO, **config.get("portfolio", {})}
+    top_k = cfg["top_k"] if top_k is None else top_k
+
+    starts = portfolio_starts(config["wait_time_weight"], cfg)
+    deadline = time.time() + cfg["time_limit"]
+    t_start = time.perf_counter()
+    solutions = []
+    with publish_instance(instance) as shared:
+        with ProcessPoolExecutor(max_workers=cfg["num_workers"], initializer=init_worker, initargs=(shared.handle,)) as executor:
+            futures = [executor.submit(construct_start, start, deadline) for start in starts]
+            done, pending = wait(futures, timeout=max(0.0, deadline - time.time()))
+            for future in pending:
+                future.cancel()
+            for future in done:
+                routes = future.result()
+                if routes is not None:
+                    solution = Solution(routes=routes)
+                    solution.compute_total_distance(instance)
+                    solutions.append(solution)
+
+    print(f"[INFO] Construction portfolio: {len(solutions)} of {len(starts)} starts finished in {time.perf_counter() - t_start:.2f} sec")
+    if not solutions: # not even one start finished in time
+        solution = construct_greedy_solution(instance, wait_time_weight=config["wait_time_weight"])
+        return [solution] if solution is not None else []
+
+    solutions.sort(key=lambda solution: solution.total_distance)
+    distinct, seen = [], set()
+    for solution in solutions:
+        key = tuple(sorted(tuple(route) for route in solution.routes))
+        if key not in seen:
+            seen.add(key)
+            distinct.append(solution)
+    return distinct[:top_k]
+
+def portfolio_starts(wait_time_weight: float, cfg: dict) -> list[tuple[float, int | None, float]]:
+    """Returns the (wait_time_weight, seed or None, tie_tolerance) of every start, see construct_portfolio."""
+    starts = [(wait_time_weight, None, 0.0)]
+    weights = cfg["weights"]
+    for i in range(cfg["num_starts"] - 1):
+        randomized = i >= len(weights)
+        starts.append((weights[i % len(weights)], cfg["seed"] + i if randomized else None, cfg["tie_tolerance"] if randomized else 0.0))
+    return starts
+
+def construct_start(start: tuple, deadline: float) -> list[list[int]] | None:
+    """Runs one start of the portfolio in a worker process. Returns the routes, or None if it failed or ran out of time."""
+    wait_time_weight, seed, tie_tolerance = start
+    rng = np.random.default_rng(seed) if seed is not None else None
+    solution = construct_greedy_solution(worker_instance(), wait_time_weight=wait_time_weight, rng=rng,
+                                         tie_tolerance=tie_tolerance, should_stop=lambda: time.time() > deadline)
+    return solution.routes if solution is not None else None
@@ -1,5 +1,34 @@
-from .instance_reader import read_evrptw_instance
-from .solution_save import save_solution_to_file
+from .instance_reader import read_evrptw_instance, parse_evrptw_instance
+from .instance_update import add_customers, remove_customers
+from .solution_save import save_solution_to_file, solution_to_text
+from .solution_reader import read_solution_from_file, solution_from_text, validate_solution, find_warm_start
 from .log_saver import save_log
+from .results_store import ResultsStore, config_label
+from .result_cache import ResultCache, job_key
+from .run_archive import RunArchive, ArchiveLog
+from .shared_instance import SharedInstance, SharedInstanceHandle, publish_instance, attach_instance, detach_instance
 
-__all__ = ["read_evrptw_instance", "save_solution_to_file", "save_log"]
\ No newline at end of file
+__all__ = [
+    "read_evrptw_instance",
+    "parse_evrptw_instance",
+    "add_customers",
+    "remove_customers",
+    "save_solution_to_file",
+    "solution_to_text",
+    "read_solution_from_file",
+    "solution_from_text",
+    "validate_solution",
+    "find_warm_start",
+    "save_log",
+    "ResultsStore",
+    "config_label",
+    "ResultCache",
+    "job_key",
+    "RunArchive",
+    "ArchiveLog",
+    "SharedInstance",
+    "SharedInstanceHandle",
+    "publish_instance",
+    "attach_instance",
+    "detach_instance",
+]
@@ -0,0 +1,61 @@
+from model.instance import EVRPTWInstance, Node, NodeKind
+from model.distances import TriangularDistances, EuclideanDistances
+from .instance_reader import euclidean_distance
+from .station_reduction import station_candidates
+
+def add_customers(instance: EVRPTWInstance, nodes: list[Node]) -> list[int]:
+    """Appends customer nodes to the instance in place and returns their node ids.
+    Only the distances from and to the new nodes are computed. The dense matrix is copied row by row into a larger one,
+    the triangular and on-demand backends are extended in place.
+    Node ids of the existing nodes do not change, so existing solutions stay valid.
+    """
+    known_ids = {node.string_id for node in instance.nodes}
+    for node in nodes:
+        if node.kind != NodeKind.Customer:
+            raise ValueError(f"Only customers can be added, {node.string_id} is a {node.kind.name}")
+        if node.string_id in known_ids:
+            raise ValueError(f"Duplicate node id: {node.string_id}")
+        known_ids.add(node.string_id)
+
+    n = instance.num_nodes
+    all_nodes = instance.nodes + list(nodes)
+    distances = instance.distances
+    if isinstance(distances, (TriangularDistances, EuclideanDistances)): # these backends grow in place
+        distances.extend([node.coordinates.x for node in all_nodes], [node.coordinates.y for node in all_nodes])
+    else:
+        new_rows = [[euclidean_distance(node, other) if node is not other else 0.0 for other in all_nodes] for node in nodes]
+        distances = []
+        for u in range(n):
+            distances.extend(instance.distances[u * n:(u + 1) * n])
+            distances.extend(row[u] for row in new_rows) # symmetric
+        for row in new_rows:
+            distances.extend(row)
+
+    new_ids = list(range(n, len(all_nodes)))
+    instance.nodes = all_nodes
+    instance.distances = distances
+    instance.num_nodes = len(all_nodes)
+    instance.num_customers += len(nodes)
+    instance.customer_ids.extend(new_ids)
+    for customer in new_ids:
+        before, after = station_candidates(instance, customer)
+        instance.stations_before.append(before)
+        instance.stations_after.append(after)
+    invalidate_caches(instance)
+    return new_ids
+
+def remove_customers(instance: EVRPTWInstance, customers: list[int]) -> None:
+    """Removes customers from the instance in place. Their nodes are kept (node ids do not change),
+    but they are no longer in customer_ids, so no solver serves them."""
+    for customer in customers:
+        if customer not in instance.customer_ids:
+            raise ValueError(f"Node {customer} is not a customer of the instance")
+        instance.customer_ids.remove(customer)
+        instance.num_customers -= 1
+    invalidate_caches(instance)
+
+def invalidate_caches(instance: EVRPTWInstance) -> None:
+    """Drops the derived structures cached on the instance, they are rebuilt on next use."""
+    for cache in ("_relatedness_index", "_lower_bound"):
+        if hasattr(instance, cache):
+            delattr(instance, cache)
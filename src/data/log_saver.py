@@ -1,13 +1,19 @@
-import numpy as np
 import json
+import sys
 from pathlib import Path
 
+from .run_archive import ArchiveLog
+
 def to_python_type(obj):
     """Recursively convert numpy types to python built-ins for JSON serialization."""
+    # Without NumPy loaded there are no NumPy values to convert, so it is not imported just for this
+    np = sys.modules.get("numpy")
     if isinstance(obj, dict):
         return {k: to_python_type(v) for k, v in obj.items()}
     elif isinstance(obj, list):
         return [to_python_type(v) for v in obj]
+    elif np is None:
+        return obj
     elif isinstance(obj, np.integer):
         return int(obj)
     elif isinstance(obj, np.floating):
@@ -18,8 +24,23 @@ def to_python_type(obj):
         return obj
 
 def save_log(log_path, log_data):
+    """Writes the log as JSON to log_path, or into a run archive if log_path is an ArchiveLog.
+    While memory profiling is active, the write is measured as the "logging" phase."""
+    # Memory profiling can only be active if its module is loaded, it is not imported just for this check
+    memory_profile = sys.modules.get("common.memory_profile")
+    if memory_profile is not None and memory_profile.active_profiler() is not None:
+        with memory_profile.memory_phase("logging"):
+            _save_log(log_path, log_data)
+    else:
+        _save_log(log_path, log_data)
+
+def _save_log(log_path, log_data):
+    py_data = to_python_type(log_data)
+    if isinstance(log_path, ArchiveLog):
+        log_path.archive.put_log(log_path.instance, log_path.seed, log_path.phase, py_data)
+        return
+
     log_path = Path(log_path)
     log_path.parent.mkdir(parents=True, exist_ok=True)
-    py_data = to_python_type(log_data)
     with open(log_path, "w") as f:
         json.dump(py_data, f, indent=2)
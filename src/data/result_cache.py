@@ -0,0 +1,65 @@
+from functools import lru_cache
+from pathlib import Path
+import hashlib
+import json
+import os
+
+# Packages whose source code determines the solver results
+SOLVER_PACKAGES = ["construction", "local_search", "alns_solve", "model", "common", "data"]
+# Modules of these packages that only write results, their changes do not invalidate the cache
+NON_SOLVER_FILES = {"data/log_saver.py", "data/results_store.py", "data/result_cache.py", "data/run_archive.py", "data/solution_save.py"}
+
+class ResultCache:
+    """Content-addressed cache of finished experiment jobs.
+    A job is identified by job_key(); its entry holds the solution routes and the summary stats as one JSON file.
+    """
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+
+    def _entry_path(self, key: str) -> Path:
+        return self.path / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> dict | None:
+        """Returns {"routes": ..., "summary": ...} of a finished job, or None."""
+        entry_path = self._entry_path(key)
+        if not entry_path.exists():
+            return None
+        with open(entry_path) as f:
+            return json.load(f)
+
+    def put(self, key: str, routes: list[list[int]], summary: dict) -> None:
+        entry_path = self._entry_path(key)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = entry_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"routes": [[int(node) for node in route] for route in routes], "summary": summary}, f)
+        os.replace(tmp_path, entry_path) # atomic, an interrupted write never leaves a broken entry
+
+def job_key(instance_file: Path, mode: str, seed: int, config: dict, extra=None) -> str:
+    """Hash of the instance file content, the mode, the seed, the effective config, the solver code and
+    optional extra inputs (e.g. the routes of a warm start)."""
+    with open(instance_file, "rb") as f:
+        instance_hash = hashlib.sha1(f.read()).hexdigest()
+
+    encoded = json.dumps({
+        "instance": instance_hash,
+        "mode": mode,
+        "seed": seed,
+        "config": config,
+        "solver": solver_version(),
+        "extra": extra,
+    }, sort_keys=True, default=str).encode()
+    return hashlib.sha1(encoded).hexdigest()
+
+@lru_cache(maxsize=None)
+def solver_version() -> str:
+    """Hash of the solver source files, so cached results are invalidated by code changes."""
+    src = Path(__file__).parent.parent
+    digest = hashlib.sha1()
+    for package in SOLVER_PACKAGES:
+        for source_file in sorted((src / package).rglob("*.py")):
+            if source_file.relative_to(src).as_posix() in NON_SOLVER_FILES:
+                continue
+            digest.update(str(source_file.relative_to(src)).encode())
+            digest.update(source_file.read_bytes())
+    return digest.hexdigest()
@@ -0,0 +1,152 @@
+from pathlib import Path
+import hashlib
+import json
+import time
+
+import numpy as np
+
+
+# One row per (instance, seed, config, phase)
+RESULT_COLUMNS = {
+    "instance": str,
+    "seed": int,
+    "config": str,
+    "phase": str,
+    "distance": float,
+    "time": float,
+    "num_vehicles": int,
+    "num_iterations": int,
+}
+
+class ResultsStore:
+    """Columnar store of experiment results.
+    Rows are buffered in memory and written as one part file per flush (Parquet if pyarrow
+    is installed, otherwise compressed .npz columns). Loading concatenates the part files.
+    """
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self._buffer = {name: [] for name in RESULT_COLUMNS}
+
+    def __enter__(self) -> 'ResultsStore':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.flush()
+
+    def append(self, instance: str, phase: str, distance: float, time: float, num_vehicles: int,
+               num_iterations: int = 0, seed: int = -1, config: str = "") -> None:
+        """Buffers a single result row. Call flush() (or use the store as a context manager) to persist it."""
+        row = {
+            "instance": instance,
+            "seed": seed,
+            "config": config,
+            "phase": phase,
+            "distance": distance,
+            "time": time,
+            "num_vehicles": num_vehicles,
+            "num_iterations": num_iterations,
+        }
+        for name, cast in RESULT_COLUMNS.items():
+            self._buffer[name].append(cast(row[name]))
+
+    def flush(self) -> None:
+        """Writes the buffered rows into a new part file."""
+        if not self._buffer["instance"]:
+            return
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        columns = self._buffer
+        self._buffer = {name: [] for name in RESULT_COLUMNS}
+        write_part(self.path / f"part-{time.time_ns()}", columns)
+
+    def load(self) -> dict[str, np.ndarray]:
+        """Loads all stored rows (including the not yet flushed ones) as a dict of column arrays."""
+        parts = [read_part(part) for part in sorted(self.path.glob("part-*"))] if self.path.exists() else []
+        parts.append(_to_arrays(self._buffer))
+        return {
+            name: np.concatenate([part[name] for part in parts])
+            for name in RESULT_COLUMNS
+        }
+
+    def compact(self) -> None:
+        """Merges all part files into a single one."""
+        old_parts = sorted(self.path.glob("part-*")) if self.path.exists() else []
+        if len(old_parts) <= 1 and not self._buffer["instance"]:
+            return
+
+        columns = self.load()
+        self._buffer = {name: [] for name in RESULT_COLUMNS}
+        self.path.mkdir(parents=True, exist_ok=True)
+        write_part(self.path / f"part-{time.time_ns()}", columns)
+        for part in old_parts:
+            part.unlink()
+
+    def summary(self, phase: str = None, config: str = None) -> dict[str, dict]:
+        """Returns best, mean and gap (mean vs. best, in %) of the distance per instance."""
+        columns = self.load()
+        mask = np.ones(len(columns["instance"]), dtype=bool)
+        if phase is not None:
+            mask &= columns["phase"] == phase
+        if config is not None:
+            mask &= columns["config"] == config
+
+        instances = columns["instance"][mask]
+        distances = columns["distance"][mask]
+
+        result = {}
+        for name in np.unique(instances):
+            values = distances[instances == name]
+            best = float(values.min())
+            mean = float(values.mean())
+            result[str(name)] = {
+                "runs": int(len(values)),
+                "best": best,
+                "mean": mean,
+                "gap": (mean - best) / best * 100 if best > 0 else 0.0,
+            }
+        return result
+
+def config_label(config: dict) -> str:
+    """Short, stable identifier of a config dict (the seed is not part of it, it has its own column)."""
+    without_seed = {k: v for k, v in config.items() if k != "seed"}
+    encoded = json.dumps(without_seed, sort_keys=True).encode()
+    return hashlib.sha1(encoded).hexdigest()[:10]
+
+def load_parquet():
+    """Returns (pyarrow, pyarrow.parquet), or (None, None) if pyarrow is not installed.
+    Imported on first use only, pyarrow is slow to import."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError: # Parquet is optional, we fall back to compressed NumPy columns
+        return None, None
+    return pa, pq
+
+def write_part(path: Path, columns: dict[str, list]) -> None:
+    arrays = _to_arrays(columns)
+    pa, pq = load_parquet()
+    if pq is not None:
+        table = pa.table({name: arrays[name] for name in RESULT_COLUMNS})
+        pq.write_table(table, path.with_suffix(".parquet"))
+    else:
+        np.savez_compressed(path.with_suffix(".npz"), **arrays)
+
+def read_part(path: Path) -> dict[str, np.ndarray]:
+    if path.suffix == ".parquet":
+        _, pq = load_parquet()
+        if pq is None:
+            raise RuntimeError(f"pyarrow is required to read {path}")
+        table = pq.read_table(path)
+        return _to_arrays({name: table.column(name).to_pylist() for name in RESULT_COLUMNS})
+
+    with np.load(path, allow_pickle=False) as data:
+        return {name: data[name] for name in RESULT_COLUMNS}
+
+def _to_arrays(columns: dict[str, list]) -> dict[str, np.ndarray]:
+    arrays = {}
+    for name, cast in RESULT_COLUMNS.items():
+        if cast is str:
+            arrays[name] = np.asarray(columns[name], dtype=np.str_)
+        else:
+            arrays[name] = np.asarray(columns[name], dtype=np.int64 if cast is int else np.float64)
+    return arrays
@@ -0,0 +1,178 @@
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+import json
+import queue
+import sqlite3
+import threading
+import zlib
+
+# Kinds of archived entries: the saved solution (the text of a .sol file) and the JSON logs of the phases
+SOLUTION = "solution"
+LOG = "log"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    instance TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    phase TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (instance, seed, phase, kind)
+)
+"""
+
+@dataclass(frozen=True)
+class ArchiveLog:
+    """Log target of one phase of one run inside an archive, accepted by save_log wherever a log path is."""
+    archive: 'RunArchive'
+    instance: str
+    seed: int
+    phase: str
+
+class RunArchive:
+    """Single file (SQLite) container of the solutions and logs of a sweep, instead of one file per instance and phase.
+    Entries are keyed by (instance, seed, phase); the data is zlib compressed, a rewritten entry replaces the old one.
+    Writes are queued and committed in batches by a background thread; the read methods see an entry once it is
+    written, flush() waits for that. Close the archive (or use it as a context manager) to write the rest.
+    """
+    def __init__(self, path: str, batch_size: int = 256) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._error = None
+        with closing(sqlite3.connect(self.path)) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(SCHEMA)
+        self._writer = threading.Thread(target=self._write_loop, name="run-archive-writer", daemon=True)
+        self._writer.start()
+
+    def __enter__(self) -> 'RunArchive':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def log(self, instance: str, seed: int, phase: str) -> ArchiveLog:
+        return ArchiveLog(self, instance, seed, phase)
+
+    def put_log(self, instance: str, seed: int, phase: str, log_data: dict) -> None:
+        """Queues a JSON log (with Python built-in values only, see to_python_type).
+        It is encoded by the writer thread, so it must not be modified afterwards."""
+        self._put(instance, seed, phase, LOG, log_data)
+
+    def put_solution(self, instance: str, seed: int, text: str, phase: str = "final") -> None:
+        """Queues a solution in the .sol format (see solution_to_text)."""
+        self._put(instance, seed, phase, SOLUTION, text)
+
+    def _put(self, instance: str, seed: int, phase: str, kind: str, data) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"Run archive writer failed: {self._error}")
+        self._queue.put((instance, int(seed), phase, kind, data))
+
+    def flush(self) -> None:
+        """Waits until every queued entry is written."""
+        self._queue.join()
+        if self._error is not None:
+            raise RuntimeError(f"Run archive writer failed: {self._error}")
+
+    def close(self) -> None:
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        if self._error is not None:
+            raise RuntimeError(f"Run archive writer failed: {self._error}")
+
+    def _write_loop(self) -> None:
+        connection = sqlite3.connect(self.path)
+        try:
+            while True:
+                batch = [self._queue.get()]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                rows = [row for row in batch if row is not None]
+                try:
+                    if rows and self._error is None:
+                        rows = [(*key, kind, zlib.compress((data if kind == SOLUTION else json.dumps(data)).encode()))
+                                for *key, kind, data in rows]
+                        with connection:
+                            connection.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)", rows)
+                except (sqlite3.Error, TypeError, ValueError) as e:
+                    self._error = e
+                    print(f"[WARNING] Run archive {self.path}: {len(rows)} entries not written: {e}")
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                if len(rows) < len(batch): # the close() sentinel
+                    return
+        finally:
+            connection.close()
+
+    # Reader API
+    def get_log(self, instance: str, seed: int, phase: str) -> dict | None:
+        data = self._get(instance, seed, phase, LOG)
+        return json.loads(data) if data is not None else None
+
+    def get_solution_text(self, instance: str, seed: int, phase: str = "final") -> str | None:
+        return self._get(instance, seed, phase, SOLUTION)
+
+    def get_solution(self, instance_name: str, seed: int, instance, phase: str = "final"):
+        """Returns the validated Solution of the instance (an EVRPTWInstance), or None if it is not archived."""
+        from .solution_reader import solution_from_text
+        text = self.get_solution_text(instance_name, seed, phase)
+        return solution_from_text(text, instance, source=f"{self.path}:{instance_name}:{seed}") if text is not None else None
+
+    def best_solution(self, instance_name: str, instance, phase: str = "final"):
+        """Returns the shortest valid archived solution of the instance over all seeds, or None (see find_warm_start)."""
+        from .solution_reader import solution_from_text
+        best_solution = None
+        with closing(sqlite3.connect(self.path)) as connection:
+            rows = connection.execute("SELECT seed, data FROM entries WHERE instance = ? AND phase = ? AND kind = ?",
+                                      (instance_name, phase, SOLUTION)).fetchall()
+        for seed, data in rows:
+            try:
+                solution = solution_from_text(zlib.decompress(data).decode(), instance, source=f"{self.path}:{instance_name}:{seed}")
+            except ValueError as e:
+                print(f"[WARNING] Skipping archived solution: {e}")
+                continue
+            if best_solution is None or solution.total_distance < best_solution.total_distance:
+                best_solution = solution
+        return best_solution
+
+    def _get(self, instance: str, seed: int, phase: str, kind: str) -> str | None:
+        with closing(sqlite3.connect(self.path)) as connection:
+            row = connection.execute("SELECT data FROM entries WHERE instance = ? AND seed = ? AND phase = ? AND kind = ?",
+                                     (instance, int(seed), phase, kind)).fetchone()
+        return zlib.decompress(row[0]).decode() if row is not None else None
+
+    def keys(self, kind: str = None) -> list[tuple[str, int, str, str]]:
+        """Returns the (instance, seed, phase, kind) of the written entries, optionally of one kind only."""
+        query = "SELECT instance, seed, phase, kind FROM entries"
+        with closing(sqlite3.connect(self.path)) as connection:
+            if kind is None:
+                return connection.execute(query + " ORDER BY 1, 2, 3, 4").fetchall()
+            return connection.execute(query + " WHERE kind = ? ORDER BY 1, 2, 3", (kind,)).fetchall()
+
+    def export(self, solution_folder: str, log_folder: str = None) -> int:
+        """Writes the entries in the per file layout: <solution_folder>_seedN/<instance>.sol and
+        <log_folder>_seedN/<phase>/<instance>_log.json (without the _seedN suffix for seed -1). Returns the entry count."""
+        count = 0
+        with closing(sqlite3.connect(self.path)) as connection:
+            for instance, seed, phase, kind, data in connection.execute("SELECT * FROM entries"):
+                if kind == SOLUTION:
+                    base = Path(solution_folder)
+                elif log_folder is not None:
+                    base = Path(log_folder)
+                else:
+                    continue
+                folder = base.parent / f"{base.name}_seed{seed}" if seed != -1 else base
+                path = folder / f"{instance}.sol" if kind == SOLUTION else folder / phase / f"{instance}_log.json"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                text = zlib.decompress(data).decode()
+                path.write_text(text if kind == SOLUTION else json.dumps(json.loads(text), indent=2))
+                count += 1
+        return count
@@ -0,0 +1,180 @@
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+import atexit
+
+import numpy as np
+
+from model.instance import EVRPTWInstance, Node, NodeKind, Coordinate
+from model.distances import TriangularDistances, EuclideanDistances
+
+# Per-node float columns stored after the distance matrix, in this order
+NODE_COLUMNS = ["x", "y", "demand", "ready", "due", "service_time"]
+KIND_CODES = {NodeKind.Depot: 0, NodeKind.Station: 1, NodeKind.Customer: 2}
+CODE_KINDS = {code: kind for kind, code in KIND_CODES.items()}
+
+@dataclass(frozen=True)
+class SharedInstanceHandle:
+    """Small, picklable description of a published instance. Send this to the workers instead of the instance."""
+    shm_name: str
+    num_nodes: int
+    string_ids: tuple[str, ...]
+    station_ids: tuple[int, ...] # after station reduction
+    stations_before: tuple[tuple[int, ...], ...] # per-node candidate stations, computed once in the parent
+    stations_after: tuple[tuple[int, ...], ...]
+    distance_backend: str # "dense", "triangular" or "on_demand" (only the coordinates are shared)
+    vehicle_load_capacity: float
+    vehicle_energy_capacity: float
+    vehicle_energy_consumption: float
+    inverse_recharging_rate: float
+
+class SharedInstance:
+    """Owner of a shared memory block holding the stored distances and the node arrays of an instance.
+    The block lives until close() is called (or the context manager exits); attached workers have to detach before.
+    """
+    def __init__(self, instance: EVRPTWInstance) -> None:
+        n = instance.num_nodes
+        backend = distance_backend_name(instance.distances)
+        self._shm = shared_memory.SharedMemory(create=True, size=_block_size(n, backend))
+        self.handle = SharedInstanceHandle(
+            shm_name=self._shm.name,
+            num_nodes=n,
+            string_ids=tuple(node.string_id for node in instance.nodes),
+            station_ids=tuple(instance.station_ids),
+            stations_before=tuple(tuple(stations) for stations in instance.stations_before),
+            stations_after=tuple(tuple(stations) for stations in instance.stations_after),
+            distance_backend=backend,
+            vehicle_load_capacity=instance.vehicle_load_capacity,
+            vehicle_energy_capacity=instance.vehicle_energy_capacity,
+            vehicle_energy_consumption=instance.vehicle_energy_consumption,
+            inverse_recharging_rate=instance.inverse_recharging_rate,
+        )
+
+        distances, columns, kinds = _views(self._shm, n, backend)
+        if backend == "dense":
+            distances[:] = instance.distances
+        elif backend == "triangular":
+            distances[:] = np.frombuffer(instance.distances.values, dtype=np.float64)
+        values = {
+            "x": [node.coordinates.x for node in instance.nodes],
+            "y": [node.coordinates.y for node in instance.nodes],
+            "demand": [node.demand for node in instance.nodes],
+            "ready": [node.ready for node in instance.nodes],
+            "due": [node.due for node in instance.nodes],
+            "service_time": [node.service_time for node in instance.nodes],
+        }
+        for i, name in enumerate(NODE_COLUMNS):
+            columns[i, :] = values[name]
+        kinds[:] = [KIND_CODES[node.kind] for node in instance.nodes]
+        del distances, columns, kinds # release the exported buffers, otherwise the block cannot be closed
+
+    def __enter__(self) -> 'SharedInstance':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Closes and unlinks the shared memory block. Safe to call more than once."""
+        if self._shm is None:
+            return
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+def publish_instance(instance: EVRPTWInstance) -> SharedInstance:
+    """Copies the instance into a new shared memory block. Use the returned object as a context manager."""
+    return SharedInstance(instance)
+
+def attach_instance(handle: SharedInstanceHandle) -> EVRPTWInstance:
+    """Attaches to a published instance. The stored distances are not copied, they are read from shared memory."""
+    shm = shared_memory.SharedMemory(name=handle.shm_name)
+    n = handle.num_nodes
+    backend = handle.distance_backend
+
+    distance_view, columns, kinds = _views(shm, n, backend)
+    x, y, demand, ready, due, service_time = (columns[i].tolist() for i in range(len(NODE_COLUMNS)))
+    nodes = [
+        Node(
+            kind=CODE_KINDS[code],
+            string_id=handle.string_ids[i],
+            coordinates=Coordinate(x=x[i], y=y[i]),
+            demand=demand[i],
+            ready=ready[i],
+            due=due[i],
+            service_time=service_time[i]
+        )
+        for i, code in enumerate(kinds.tolist())
+    ]
+    del distance_view, columns, kinds
+
+    # A memoryview cast to doubles is indexed like the original list and returns plain floats
+    num_values = _num_distance_values(n, backend)
+    if backend == "dense":
+        distances = shm.buf[:num_values * 8].cast("d")
+    elif backend == "triangular":
+        distances = TriangularDistances.from_values(shm.buf[:num_values * 8].cast("d"), n)
+    else:
+        distances = EuclideanDistances(x, y)
+
+    instance = EVRPTWInstance(
+        num_stations=sum(1 for node in nodes if node.kind == NodeKind.Station),
+        num_customers=sum(1 for node in nodes if node.kind == NodeKind.Customer),
+        num_nodes=n,
+        nodes=nodes,
+        vehicle_load_capacity=handle.vehicle_load_capacity,
+        vehicle_energy_capacity=handle.vehicle_energy_capacity,
+        vehicle_energy_consumption=handle.vehicle_energy_consumption,
+        inverse_recharging_rate=handle.inverse_recharging_rate,
+        distances=distances
+    )
+    instance.station_ids = list(handle.station_ids)
+    instance.stations_before = [list(stations) for stations in handle.stations_before]
+    instance.stations_after = [list(stations) for stations in handle.stations_after]
+    instance._shared_memory = shm
+    return instance
+
+def detach_instance(instance: EVRPTWInstance) -> None:
+    """Releases the shared distance matrix of an attached instance. The instance cannot be used afterwards."""
+    shm = getattr(instance, "_shared_memory", None)
+    if shm is None:
+        return
+    view = instance.distances.values if isinstance(instance.distances, TriangularDistances) else instance.distances
+    if isinstance(view, memoryview):
+        view.release()
+    instance.distances = None
+    instance._shared_memory = None
+    shm.close()
+
+# Process pool helpers: pass init_worker as initializer and the handle as initargs,
+# then the tasks can call worker_instance() instead of receiving the instance.
+_worker_instance: EVRPTWInstance = None
+
+def init_worker(handle: SharedInstanceHandle) -> None:
+    global _worker_instance
+    _worker_instance = attach_instance(handle)
+    atexit.register(detach_instance, _worker_instance)
+
+def worker_instance() -> EVRPTWInstance:
+    if _worker_instance is None:
+        raise RuntimeError("No shared instance attached in this process, use init_worker as pool initializer.")
+    return _worker_instance
+
+def distance_backend_name(distances) -> str:
+    if isinstance(distances, TriangularDistances):
+        return "triangular"
+    if isinstance(distances, EuclideanDistances):
+        return "on_demand"
+    return "dense"
+
+def _num_distance_values(n: int, backend: str) -> int:
+    return {"dense": n * n, "triangular": n * (n - 1) // 2, "on_demand": 0}[backend]
+
+def _block_size(n: int, backend: str) -> int:
+    return (_num_distance_values(n, backend) + len(NODE_COLUMNS) * n) * 8 + n
+
+def _views(shm: shared_memory.SharedMemory, n: int, backend: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    num_values = _num_distance_values(n, backend)
+    distances = np.ndarray((num_values,), dtype=np.float64, buffer=shm.buf, offset=0)
+    columns = np.ndarray((len(NODE_COLUMNS), n), dtype=np.float64, buffer=shm.buf, offset=num_values * 8)
+    kinds = np.ndarray((n,), dtype=np.int8, buffer=shm.buf, offset=(num_values + len(NODE_COLUMNS) * n) * 8)
+    return distances, columns, kinds
@@ -0,0 +1,94 @@
+from pathlib import Path
+
+from model.instance import EVRPTWInstance
+from model.solution import Solution
+from common.utils import check_route_feasibility_constraints
+from .run_archive import RunArchive
+
+def read_solution_from_file(filepath: Path, instance: EVRPTWInstance) -> Solution:
+    """Reads a solution written by save_solution_to_file and validates it against the instance.
+    Raises ValueError if a node is unknown, a route does not start and end at the depot,
+    a customer is missing or visited twice, or a route violates a time, capacity or energy constraint.
+    """
+    with open(filepath, "r") as f:
+        return solution_from_text(f.read(), instance, source=filepath)
+
+def solution_from_text(text: str, instance: EVRPTWInstance, source="solution") -> Solution:
+    """Parses and validates a solution in the .sol format (see read_solution_from_file), e.g. one read from a run archive."""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+
+    if not lines:
+        raise ValueError(f"Empty solution: {source}")
+
+    node_index = {node.string_id: i for i, node in enumerate(instance.nodes)}
+    routes = []
+    for line in lines[1:]:
+        route = []
+        for string_id in line.split(","):
+            string_id = string_id.strip()
+            if string_id not in node_index:
+                raise ValueError(f"Unknown node {string_id} in {source}")
+            route.append(node_index[string_id])
+        routes.append(route)
+
+    solution = Solution(routes=routes)
+    validate_solution(instance, solution)
+    solution.compute_total_distance(instance)
+
+    saved_distance = float(lines[0])
+    if abs(saved_distance - solution.total_distance) > 1e-6:
+        print(f"[WARNING] Saved distance {saved_distance} differs from the computed {solution.total_distance} in {source}")
+
+    return solution
+
+def validate_solution(instance: EVRPTWInstance, solution: Solution) -> None:
+    """Raises ValueError if the solution is not a feasible solution of the instance."""
+    depot = instance.depot_id
+    visits = [0] * instance.num_nodes
+
+    for route_idx, route in enumerate(solution.routes):
+        if len(route) < 2 or route[0] != depot or route[-1] != depot:
+            raise ValueError(f"Route {route_idx} does not start and end at the depot")
+
+        for node in route:
+            if instance.is_customer(node):
+                visits[node] += 1
+
+        time_ok, cap_ok, energy_ok = check_route_feasibility_constraints(instance, route)
+        if not (time_ok and cap_ok and energy_ok):
+            raise ValueError(f"Route {route_idx} is infeasible (time: {time_ok}, capacity: {cap_ok}, energy: {energy_ok})")
+
+    for customer in instance.customer_ids:
+        if visits[customer] != 1:
+            raise ValueError(f"Customer {instance.nodes[customer].string_id} is visited {visits[customer]} times")
+
+def find_warm_start(instance_name: str, instance: EVRPTWInstance, folders) -> Solution | None:
+    """Returns the shortest valid saved solution of the instance from the given folder(s), or None.
+    A RunArchive can stand in for a folder: every seed's solution in it is a candidate.
+    Invalid solution files are skipped with a warning.
+    """
+    if isinstance(folders, (str, Path, RunArchive)):
+        folders = [folders]
+
+    best_solution = None
+    for folder in folders:
+        if isinstance(folder, RunArchive):
+            solution = folder.best_solution(instance_name, instance)
+            if solution is not None and (best_solution is None or solution.total_distance < best_solution.total_distance):
+                best_solution = solution
+            continue
+
+        filepath = Path(folder) / f"{instance_name}.sol"
+        if not filepath.exists():
+            continue
+
+        try:
+            solution = read_solution_from_file(filepath, instance)
+        except ValueError as e:
+            print(f"[WARNING] Skipping warm start {filepath}: {e}")
+            continue
+
+        if best_solution is None or solution.total_distance < best_solution.total_distance:
+            best_solution = solution
+
+    return best_solution
@@ -0,0 +1,70 @@
+from model.instance import EVRPTWInstance
+
+def reduce_stations(instance: EVRPTWInstance) -> None:
+    """Preprocessing at load: drops duplicate and dominated stations from instance.station_ids and builds the
+    per-customer candidate station lists. Node ids are not changed, the dropped stations stay in instance.nodes.
+    """
+    instance.station_ids = non_dominated_stations(instance)
+    build_station_candidates(instance)
+
+def non_dominated_stations(instance: EVRPTWInstance) -> list[int]:
+    """Station t dominates station s if it is at least as close to every other node. With full recharges and
+    travel time equal to distance, replacing s by t never makes a route longer, later or short of energy.
+    Of identical stations the first one is kept. A station on the depot is kept: the depot cannot be visited
+    in the middle of a route, so it does not replace the station.
+    """
+    stations = instance.station_ids
+    kept = []
+    for s in stations:
+        row_s = instance.distance_row(s)
+        dominated = False
+        for t in stations:
+            if t == s:
+                continue
+            row_t = instance.distance_row(t)
+            if all(row_t[u] <= row_s[u] for u in range(instance.num_nodes) if u != s and u != t):
+                # Identical stations dominate each other, the first one survives
+                if not all(row_s[u] <= row_t[u] for u in range(instance.num_nodes) if u != s and u != t) or t < s:
+                    dominated = True
+                    break
+        if not dominated:
+            kept.append(s)
+    return kept
+
+def build_station_candidates(instance: EVRPTWInstance) -> None:
+    """Sets instance.stations_before[c] / stations_after[c]: the stations that can be visited directly before /
+    after customer c in a feasible route, in station_ids order. The bounds only use necessary conditions
+    (triangle inequality, vehicles leave the depot at time 0 fully charged), so no feasible route is lost.
+    """
+    instance.stations_before = [[] for _ in range(instance.num_nodes)]
+    instance.stations_after = [[] for _ in range(instance.num_nodes)]
+    for customer in instance.customer_ids:
+        before, after = station_candidates(instance, customer)
+        instance.stations_before[customer] = before
+        instance.stations_after[customer] = after
+
+def station_candidates(instance: EVRPTWInstance, customer: int) -> tuple[list[int], list[int]]:
+    """Returns the (before, after) candidate stations of a customer, see build_station_candidates."""
+    depot = instance.depot_id
+    capacity = instance.vehicle_energy_capacity
+    consumption = instance.vehicle_energy_consumption
+    charge_points = [depot] + instance.station_ids
+
+    # Energy needed from the last full charge to the customer, and from the customer to the next charge
+    reach_in = min(instance.distance(x, customer) for x in charge_points) * consumption
+    reach_out = min(instance.distance(customer, x) for x in charge_points) * consumption
+    earliest_end = max(instance.ready(customer), instance.distance(depot, customer)) + instance.service_time(customer)
+
+    before, after = [], []
+    for s in instance.station_ids:
+        energy = instance.distance(s, customer) * consumption
+        # [..., s, customer, ...]: charged to full at s, the customer is reached in time and left with enough energy
+        if energy + reach_out <= capacity and instance.distance(depot, s) + instance.distance(s, customer) <= instance.due(customer):
+            before.append(s)
+
+        # [..., customer, s, ...]: s is reached with the energy left at the customer, and the depot in time afterwards
+        recharge = instance.time_for_recharging_energy(reach_in + energy)
+        if reach_in + energy <= capacity and earliest_end + instance.distance(customer, s) + recharge + instance.distance(s, depot) <= instance.due(depot):
+            after.append(s)
+
+    return before, after
@@ -6,8 +6,12 @@ from data.log_saver import save_log
 from model import EVRPTWInstance, Solution
 from .relocate_descent import relocate_descent
 
-def local_search(instance: EVRPTWInstance, initial_solution: Solution, log_path: str = None) -> Solution:
-    """Runs a local search starting from the initial solution using Relocate descent."""
+def local_search(instance: EVRPTWInstance, initial_solution: Solution, log_path: str = None, stats: dict = None,
+                 should_stop=None) -> Solution:
+    """Runs a local search starting from the initial solution using Relocate descent.
+    If a stats dict is given, the iteration count and the runtime are written into it.
+    If should_stop is given, it is called before every descent step and the search ends when it returns True.
+    """
     #print("\n[DEBUG] Starting local search with Relocate descent")
     current_solution = initial_solution.copy()
     improved = True
@@ -16,7 +20,7 @@ def local_search(instance: EVRPTWInstance, initial_solution: Solution, log_path:
     steps_log = []
     t0 = time.time()
 
-    while improved:
+    while improved and not (should_stop is not None and should_stop()):
         iteration += 1
         step_start = time.time()
         prev_distance = current_solution.total_distance
@@ -39,6 +43,10 @@ def local_search(instance: EVRPTWInstance, initial_solution: Solution, log_path:
     total_time = time.time() - t0
     #print(f"\n[DEBUG] Local search finished after {iteration} iteration(s)")
 
+    if stats is not None:
+        stats["total_iterations"] = iteration
+        stats["total_time"] = total_time
+
     if log_path:
         log_data = {
             "steps": steps_log,
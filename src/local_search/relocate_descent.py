@@ -1,100 +1,92 @@
 from model import EVRPTWInstance, Solution
-from common.utils import check_route_feasibility_constraints, find_best_station_for_customer_insert
+from model.array_solution import ArraySolution
 
 def relocate_descent_without_station_change(instance: EVRPTWInstance, solution: Solution) -> tuple[bool, Solution]:
     """Tries to improve the solution using relocate moves, without adding stations."""
-    best_solution = solution.copy()
-    best_solution.compute_total_distance(instance)
-    improved = False
+    arrays = ArraySolution.from_solution(instance, solution)
+    base_distance = solution.compute_total_distance(instance)
+    best_distance = base_distance
+    best_move = None
 
-    for i, route_i in enumerate(solution.routes):
-        for j in range(len(route_i)):
-            customer = route_i[j]
+    for i in range(arrays.num_routes):
+        for customer in arrays.route_nodes(i):
             if not instance.is_customer(customer):
                 continue # Skip if the node is depot or station
 
-            for k, route_k in enumerate(solution.routes):
+            removal_gain = arrays.removal_delta(customer)
+            for k in range(arrays.num_routes):
                 if k == i:
-                    continue 
-
-                for pos in range(1, len(route_k)):
-                    new_route_i = route_i[:j] + route_i[j+1:]
-                    new_route_k = route_k[:pos] + [customer] + route_k[pos:]
+                    continue
 
-                    time_ok, cap_ok, energy_ok = check_route_feasibility_constraints(instance, new_route_k)
+                for after_slot in arrays.candidate_slots(k, customer):
+                    time_ok, cap_ok, energy_ok, delta = arrays.evaluate_insertion(after_slot, (customer,))
                     if not (time_ok and cap_ok and energy_ok):
                         continue
 
-                    temp_solution = solution.copy()
-                    temp_solution.routes[i] = new_route_i
-                    temp_solution.routes[k] = new_route_k
-                    temp_solution.compute_total_distance(instance)
-
-                    if temp_solution.total_distance < best_solution.total_distance:
-                        improved = True
-                        best_solution = temp_solution
+                    distance = base_distance - removal_gain + delta
+                    if distance < best_distance:
+                        best_distance = distance
+                        best_move = (customer, after_slot, (customer,))
 
-    return improved, best_solution
+    return apply_relocate_move(arrays, solution, best_move)
 
 def relocate_descent(instance: EVRPTWInstance, solution: Solution) -> tuple[bool, Solution]:
-    """Tries to improve the solution using relocate moves."""
-    best_solution = solution.copy()
-    best_solution.compute_total_distance(instance)
-    improved = False
-
-    for i, route_i in enumerate(solution.routes):
-        for j in range(len(route_i)):
-            customer = route_i[j]
+    """Tries to improve the solution using relocate moves.
+    The moves are evaluated on the array representation, only the best one is applied.
+    """
+    arrays = ArraySolution.from_solution(instance, solution)
+    base_distance = solution.compute_total_distance(instance)
+    best_distance = base_distance
+    best_move = None
+
+    for i in range(arrays.num_routes):
+        for customer in arrays.route_nodes(i):
             if not instance.is_customer(customer):
                 continue
 
-            for k, route_k in enumerate(solution.routes):
+            removal_gain = arrays.removal_delta(customer)
+            for k in range(arrays.num_routes):
                 if k == i:
                     continue
 
-                for pos in range(1, len(route_k)):
-                    new_route_i = route_i[:j] + route_i[j+1:]
-                    new_route_k = route_k[:pos] + [customer] + route_k[pos:]
-
-                    time_ok, cap_ok, energy_ok = check_route_feasibility_constraints(instance, new_route_k)
+                for after_slot in arrays.candidate_slots(k, customer):
+                    time_ok, cap_ok, energy_ok, delta = arrays.evaluate_insertion(after_slot, (customer,))
                     if not (time_ok and cap_ok):
                         continue
 
                     # CASE 1: Feasible without station
                     if energy_ok:
-                        temp_solution = solution.copy()
-                        temp_solution.routes[i] = new_route_i
-                        temp_solution.routes[k] = new_route_k
-                        temp_solution.compute_total_distance(instance)
-
-                        if temp_solution.total_distance < best_solution.total_distance:
-                            improved = True
-                            best_solution = temp_solution
+                        distance = base_distance - removal_gain + delta
+                        if distance < best_distance:
+                            best_distance = distance
+                            best_move = (customer, after_slot, (customer,))
                         continue
 
                     # CASE 2: Try inserting station BEFORE customer
-                    updated_route_k = find_best_station_for_customer_insert(instance, route_k, customer, pos, before=True)
-                    if updated_route_k:
-                        temp_solution = solution.copy()
-                        temp_solution.routes[i] = new_route_i
-                        temp_solution.routes[k] = updated_route_k
-                        temp_solution.compute_total_distance(instance)
-
-                        if temp_solution.total_distance < best_solution.total_distance:
-                            improved = True
-                            best_solution = temp_solution
-
                     # CASE 3: Try inserting station AFTER customer
-                    updated_route_k = find_best_station_for_customer_insert(instance, route_k, customer, pos, before=False)
-                    if updated_route_k:
-                        temp_solution = solution.copy()
-                        temp_solution.routes[i] = new_route_i
-                        temp_solution.routes[k] = updated_route_k
-                        temp_solution.compute_total_distance(instance)
-
-                        if temp_solution.total_distance < best_solution.total_distance:
-                            improved = True
-                            best_solution = temp_solution
-
-    return improved, best_solution
-
+                    for before in (True, False):
+                        station_insert = arrays.best_station_insertion(after_slot, customer, before=before)
+                        if station_insert:
+                            delta, nodes = station_insert
+                            distance = base_distance - removal_gain + delta
+                            if distance < best_distance:
+                                best_distance = distance
+                                best_move = (customer, after_slot, nodes)
+
+    return apply_relocate_move(arrays, solution, best_move)
+
+def apply_relocate_move(arrays: ArraySolution, solution: Solution, move: tuple) -> tuple[bool, Solution]:
+    """Applies the (customer, after_slot, inserted_nodes) move and returns (improved, solution).
+    The move only counts as an improvement if the recomputed total distance is lower.
+    """
+    if move is None:
+        return False, solution.copy()
+
+    customer, after_slot, nodes = move
+    arrays.remove(customer)
+    arrays.insert_after(after_slot, nodes)
+    new_solution = arrays.to_solution()
+
+    if new_solution.total_distance < solution.total_distance:
+        return True, new_solution
+    return False, solution.copy()
@@ -1,3 +1,4 @@
+import argparse
 from pathlib import Path
 from test import (
     run_verifier_all_solutions_in_directories,
@@ -8,6 +9,10 @@ from test import (
 )
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--force", action="store_true", help="re-run jobs that are already in the result cache")
+    args = parser.parse_args()
+
     verifier_path = Path("../pyEVRPVerifier/src/main.py")
     instance_folder = Path("../instances/instances")
     solution_folder = Path("../solutions/local_search")
@@ -31,7 +36,10 @@ if __name__ == "__main__":
         base_log_folder="../logs/alns",
         base_config_path="./config/alns_config.json",
         seed_values=seed_values,
-        mode=HeuristicMode.CONSTRUCT_ALNS
+        mode=HeuristicMode.CONSTRUCT_ALNS,
+        results_path="../results/alns",
+        cache_path="../results/cache",
+        force=args.force
     )
 
     #run_verifier_all_solutions_in_directories(verifier_path, instance_folder, solution_folder)
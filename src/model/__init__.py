@@ -1,5 +1,6 @@
 from .instance import EVRPTWInstance, Node, NodeKind, Coordinate
 from .solution import Solution
 from .routeStatus import RouteStatus
+from .array_solution import ArraySolution
 
-__all__ = ["EVRPTWInstance", "Node", "NodeKind", "Coordinate", "Solution", "RouteStatus"]
\ No newline at end of file
+__all__ = ["EVRPTWInstance", "Node", "NodeKind", "Coordinate", "Solution", "RouteStatus", "ArraySolution"]
\ No newline at end of file
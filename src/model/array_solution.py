@@ -0,0 +1,389 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Optional
+
+from .instance import EVRPTWInstance, NodeKind
+from .solution import Solution
+
+# Violation bits, stored per slot
+TIME_VIOLATION = 1
+ENERGY_VIOLATION = 2
+CAPACITY_VIOLATION = 4
+
+class ArraySolution:
+    """Array-backed solution representation for move evaluation without building candidate routes.
+    Every visit is a slot: customer c always uses slot c, the depot and station visits get slots above num_nodes.
+    The next/prev/route_of arrays link the slots into routes, so inserting and removing visits is O(1).
+    Every slot caches the schedule after leaving it (departure time, state of charge, remaining capacity),
+    the violations up to it and the violations after it. The caches of a route are refreshed lazily after it changes.
+    Every route also caches its slots with their departure times and latest arrival times in route order (both are
+    non-decreasing), so candidate_slots can bisect the insertion positions that fit a time window.
+    The schedule and the feasibility flags follow check_route_feasibility_constraints exactly.
+    """
+    def __init__(self, instance: EVRPTWInstance) -> None:
+        self.instance = instance
+        n = instance.num_nodes
+        self.num_nodes = n
+
+        # Node data as plain lists for fast access
+        self._is_customer = [node.kind == NodeKind.Customer for node in instance.nodes]
+        self._is_station = [node.kind == NodeKind.Station for node in instance.nodes]
+        self._demand = [node.demand for node in instance.nodes]
+        self._ready = [node.ready for node in instance.nodes]
+        self._due = [node.due for node in instance.nodes]
+        self._service_time = [node.service_time for node in instance.nodes]
+        self._distances = instance.distances
+
+        size = 2 * n
+        self.node_of = array("i", range(n)) + array("i", [-1] * (size - n))
+        self.next = array("i", [-1] * size)
+        self.prev = array("i", [-1] * size)
+        self.route_of = array("i", [-1] * size)
+        self.departure = array("d", [0.0] * size)
+        self.soc = array("d", [0.0] * size)
+        self.capacity = array("d", [0.0] * size)
+        self.distance_to = array("d", [0.0] * size) # route distance from the depot start up to the slot
+        self.flags = array("b", [0] * size) # violations up to and including the slot
+        self.flags_after = array("b", [0] * size) # violations strictly after the slot
+        self.latest = array("d", [0.0] * size) # latest arrival that keeps the rest of the route in time (recharging ignored)
+        self._free_slots = list(range(size - 1, n - 1, -1))
+
+        self.heads: list[int] = []
+        self.tails: list[int] = []
+        self.route_distance: list[float] = []
+        self._schedules: list[tuple[list[int], list[float], list[float]]] = [] # (slots, departures, latest arrivals)
+        self._dirty: set[int] = set()
+
+    @classmethod
+    def from_routes(cls, instance: EVRPTWInstance, routes: list[list[int]]) -> 'ArraySolution':
+        """Builds the representation of the given routes (each starting and ending at the depot)."""
+        arrays = cls(instance)
+        for route in routes:
+            arrays.add_route(route[1:-1])
+        return arrays
+
+    @classmethod
+    def from_solution(cls, instance: EVRPTWInstance, solution: Solution) -> 'ArraySolution':
+        return cls.from_routes(instance, solution.routes)
+
+    def to_routes(self) -> list[list[int]]:
+        return [self.route_nodes(r) for r in range(self.num_routes)]
+
+    def to_solution(self) -> Solution:
+        solution = Solution(routes=self.to_routes())
+        solution.compute_total_distance(self.instance)
+        return solution
+
+    @property
+    def num_routes(self) -> int:
+        return len(self.heads)
+
+    def route_slots(self, r: int) -> list[int]:
+        slots = []
+        slot = self.heads[r]
+        while slot != -1:
+            slots.append(slot)
+            slot = self.next[slot]
+        return slots
+
+    def route_nodes(self, r: int) -> list[int]:
+        return [self.node_of[slot] for slot in self.route_slots(r)]
+
+    def add_route(self, nodes=()) -> int:
+        """Appends a new route [depot, *nodes, depot] and returns its index."""
+        r = len(self.heads)
+        head = self._allocate(self.instance.depot_id)
+        tail = self._allocate(self.instance.depot_id)
+        self.next[head] = tail
+        self.prev[tail] = head
+        self.route_of[head] = r
+        self.route_of[tail] = r
+        self.heads.append(head)
+        self.tails.append(tail)
+        self.route_distance.append(0.0)
+        self._schedules.append(([], [], []))
+        self._dirty.add(r)
+        if nodes:
+            self.insert_after(head, nodes)
+        return r
+
+    def insert_after(self, slot: int, nodes) -> list[int]:
+        """Inserts the nodes after the given slot and returns their slots."""
+        r = self.route_of[slot]
+        new_slots = []
+        for node in nodes:
+            new_slot = self._allocate(node)
+            following = self.next[slot]
+            self.next[slot] = new_slot
+            self.prev[new_slot] = slot
+            self.next[new_slot] = following
+            self.prev[following] = new_slot
+            self.route_of[new_slot] = r
+            new_slots.append(new_slot)
+            slot = new_slot
+        self._dirty.add(r)
+        return new_slots
+
+    def remove(self, slot: int) -> None:
+        """Removes a visit (not the depot start or end) from its route."""
+        r = self.route_of[slot]
+        before, after = self.prev[slot], self.next[slot]
+        self.next[before] = after
+        self.prev[after] = before
+        self.next[slot] = self.prev[slot] = self.route_of[slot] = -1
+        if slot >= self.num_nodes:
+            self.node_of[slot] = -1
+            self._free_slots.append(slot)
+        self._dirty.add(r)
+
+    def candidate_slots(self, r: int, customer: int) -> list[int]:
+        """Slots of route r after which the customer may be inserted, without the depot end. The others cannot be
+        time feasible: the route already leaves the slot after the customer's due time, or the next visit's latest
+        arrival is earlier than the customer's ready time plus service time. Both bounds are found by bisection."""
+        if r in self._dirty:
+            self._refresh(r)
+        slots, departures, latest = self._schedules[r]
+        earliest_next = self._ready[customer] + self._service_time[customer] - 1e-9
+        # Inserting after slots[i] puts the customer before slots[i + 1]
+        start = bisect_left(latest, earliest_next, 1, len(slots)) - 1
+        end = bisect_right(departures, self._due[customer] + 1e-9, 0, len(slots) - 1)
+        return slots[start:end]
+
+    def removal_delta(self, slot: int) -> float:
+        """Distance saved by removing the visit of the slot."""
+        distance = self.instance.distance
+        before, node, after = self.node_of[self.prev[slot]], self.node_of[slot], self.node_of[self.next[slot]]
+        return distance(before, node) + distance(node, after) - distance(before, after)
+
+    def insertion_delta(self, slot: int, nodes) -> float:
+        """Additional distance of inserting the nodes after the slot."""
+        distances, n = self._distances, self.num_nodes
+        last = self.node_of[slot]
+        after = self.node_of[self.next[slot]]
+        delta = -distances[last * n + after]
+        for node in nodes:
+            delta += distances[last * n + node]
+            last = node
+        return delta + distances[last * n + after]
+
+    def inserted_route_distance(self, slot: int, nodes) -> float:
+        """Distance of the route after inserting the nodes after the slot, summed edge by edge along the route like
+        compute_route_distance (so it is equal to it to the last bit, unlike the route distance plus the delta)."""
+        r = self.route_of[slot]
+        if r in self._dirty:
+            self._refresh(r)
+        distances, n = self._distances, self.num_nodes
+        distance = self.distance_to[slot]
+        last = self.node_of[slot]
+        for node in nodes:
+            distance += distances[last * n + node]
+            last = node
+        slot = self.next[slot]
+        while slot != -1:
+            node = self.node_of[slot]
+            distance += distances[last * n + node]
+            last = node
+            slot = self.next[slot]
+        return distance
+
+    def evaluate_insertion(self, slot: int, nodes) -> tuple[bool, bool, bool, float]:
+        """Evaluates inserting the nodes after the slot without changing the route.
+        Returns (time_feasible, capacity_feasible, energy_feasible, distance_delta) of the resulting route.
+        The schedule is continued from the cached state of the slot and stops as soon as it joins the cached schedule
+        again. Once a time window is violated the rest is not evaluated, so the energy flag is only meaningful if
+        the route is time feasible.
+        """
+        r = self.route_of[slot]
+        if r in self._dirty:
+            self._refresh(r)
+
+        inserted_demand = sum(self._demand[node] for node in nodes if self._is_customer[node])
+        tail = self.tails[r]
+        capacity_feasible = not (self.flags[tail] & CAPACITY_VIOLATION) and self.capacity[tail] - inserted_demand >= 0
+
+        flags = self.flags[slot] & ~CAPACITY_VIOLATION
+        if not flags & TIME_VIOLATION:
+            flags = TIME_VIOLATION if self._late(slot, nodes) else self._continue_schedule(slot, nodes, flags)
+
+        return (
+            not flags & TIME_VIOLATION,
+            capacity_feasible,
+            not flags & ENERGY_VIOLATION,
+            self.insertion_delta(slot, nodes),
+        )
+
+    def evaluate_new_route(self, nodes) -> tuple[bool, bool, bool, float]:
+        """Evaluates the route [depot, *nodes, depot] like evaluate_insertion, without adding it."""
+        depot = self.instance.depot_id
+        time, soc, capacity, flags = 0.0, self.instance.vehicle_energy_capacity, self.instance.vehicle_load_capacity, 0
+        distance = 0.0
+        last = depot
+        for node in (*nodes, depot):
+            time, soc, capacity, node_flags = self._step(last, node, time, soc, capacity)
+            flags |= node_flags
+            distance += self.instance.distance(last, node)
+            last = node
+        return (
+            not flags & TIME_VIOLATION,
+            not flags & CAPACITY_VIOLATION,
+            not flags & ENERGY_VIOLATION,
+            distance,
+        )
+
+    def best_station_insertion(self, slot: int, customer: int, before: bool) -> Optional[tuple[float, tuple[int, int]]]:
+        """Array version of find_best_station_for_customer_insert: inserts the customer after the slot with a station
+        before or after it. Returns (distance_delta, inserted_nodes) of the shortest feasible option, or None."""
+        best = None
+        best_delta = float("inf")
+
+        stations = self.instance.stations_before[customer] if before else self.instance.stations_after[customer]
+        for station_id in stations:
+            nodes = (station_id, customer) if before else (customer, station_id)
+            time_ok, cap_ok, energy_ok, delta = self.evaluate_insertion(slot, nodes)
+            if not (time_ok and cap_ok and energy_ok):
+                continue
+
+            if delta < best_delta:
+                best_delta = delta
+                best = (delta, nodes)
+
+        return best
+
+    def _late(self, slot: int, nodes) -> bool:
+        """O(len(nodes)) time window pre-check of inserting the nodes after the slot, before any simulation: True if the
+        nodes or, by its latest arrival, the rest of the route cannot be served in time even without recharging time."""
+        distances, n = self._distances, self.num_nodes
+        time = self.departure[slot]
+        last = self.node_of[slot]
+        for node in nodes:
+            time += distances[last * n + node]
+            if self._is_customer[node]:
+                if time > self._due[node] + 1e-9:
+                    return True
+                time = max(time, self._ready[node]) + self._service_time[node]
+            last = node
+        following = self.next[slot]
+        return time + distances[last * n + self.node_of[following]] > self.latest[following] + 1e-9
+
+    def _continue_schedule(self, slot: int, nodes, flags: int) -> int:
+        """Continues the cached schedule of the slot with the given nodes and then the rest of the route.
+        Returns the time and energy violation flags of the resulting route."""
+        time, soc = self.departure[slot], self.soc[slot]
+        capacity = float("inf") # capacity is checked separately
+        last = self.node_of[slot]
+
+        for node in nodes:
+            time, soc, capacity, node_flags = self._step(last, node, time, soc, capacity)
+            flags |= node_flags & ~CAPACITY_VIOLATION
+            if flags & TIME_VIOLATION:
+                return flags
+            last = node
+
+        following = self.next[slot]
+        while following != -1:
+            node = self.node_of[following]
+            time, soc, capacity, node_flags = self._step(last, node, time, soc, capacity)
+            flags |= node_flags & ~CAPACITY_VIOLATION
+            if flags & TIME_VIOLATION:
+                return flags
+            if time == self.departure[following] and soc == self.soc[following]: # joined the cached schedule
+                return flags | (self.flags_after[following] & ~CAPACITY_VIOLATION)
+            last = node
+            following = self.next[following]
+
+        return flags
+
+    def _step(self, last: int, node: int, time: float, soc: float, capacity: float) -> tuple[float, float, float, int]:
+        """Travels from last to node and serves it (same rules as check_route_feasibility_constraints)."""
+        instance = self.instance
+        travel_time = self._distances[last * self.num_nodes + node]
+        energy_used = travel_time * instance.vehicle_energy_consumption
+        arrival_time = time + travel_time
+        flags = 0
+
+        if soc - energy_used < 0:
+            flags |= ENERGY_VIOLATION
+
+        if self._is_customer[node]:
+            start_service = max(arrival_time, self._ready[node])
+            if start_service > self._due[node]:
+                flags |= TIME_VIOLATION
+            demand = self._demand[node]
+            if demand > capacity:
+                flags |= CAPACITY_VIOLATION
+            return start_service + self._service_time[node], soc - energy_used, capacity - demand, flags
+
+        if self._is_station[node]:
+            recharge_amount = instance.vehicle_energy_capacity - max(0.0, soc - energy_used)
+            return arrival_time + instance.time_for_recharging_energy(recharge_amount), instance.vehicle_energy_capacity, capacity, flags
+
+        # depot
+        if arrival_time > self._due[node]:
+            flags |= TIME_VIOLATION
+        return arrival_time, soc - energy_used, capacity, flags
+
+    def _refresh(self, r: int) -> None:
+        """Recomputes the cached schedule and violation flags of a route."""
+        instance = self.instance
+        slot = self.heads[r]
+        time, soc, capacity, flags = 0.0, instance.vehicle_energy_capacity, instance.vehicle_load_capacity, 0
+        self.departure[slot], self.soc[slot], self.capacity[slot], self.flags[slot] = time, soc, capacity, flags
+        self.distance_to[slot] = 0.0
+
+        slots = [slot]
+        own_flags = [0]
+        distance = 0.0
+        last = self.node_of[slot]
+        slot = self.next[slot]
+        while slot != -1:
+            node = self.node_of[slot]
+            time, soc, capacity, node_flags = self._step(last, node, time, soc, capacity)
+            flags |= node_flags
+            distance += instance.distance(last, node)
+            self.distance_to[slot] = distance
+            self.departure[slot], self.soc[slot], self.capacity[slot], self.flags[slot] = time, soc, capacity, flags
+            slots.append(slot)
+            own_flags.append(node_flags)
+            last = node
+            slot = self.next[slot]
+
+        after = 0
+        latest = float("inf")
+        following = -1
+        for slot, node_flags in zip(reversed(slots), reversed(own_flags)):
+            self.flags_after[slot] = after
+            after |= node_flags
+            node = self.node_of[slot]
+            if following != -1:
+                latest -= self._distances[node * self.num_nodes + self.node_of[following]]
+                if self._is_customer[node]:
+                    latest -= self._service_time[node]
+            if not self._is_station[node]:
+                latest = min(latest, self._due[node])
+            self.latest[slot] = latest
+            following = slot
+
+        self._schedules[r] = (slots, [self.departure[slot] for slot in slots], [self.latest[slot] for slot in slots])
+        self.route_distance[r] = distance
+        self._dirty.discard(r)
+
+    def _allocate(self, node: int) -> int:
+        if self._is_customer[node]:
+            return node
+        if not self._free_slots:
+            self._grow()
+        slot = self._free_slots.pop()
+        self.node_of[slot] = node
+        return slot
+
+    def _grow(self) -> None:
+        size = len(self.next)
+        extra = size
+        self.node_of.extend([-1] * extra)
+        for values in (self.next, self.prev, self.route_of):
+            values.extend([-1] * extra)
+        for values in (self.departure, self.soc, self.capacity, self.distance_to, self.latest):
+            values.extend([0.0] * extra)
+        for values in (self.flags, self.flags_after):
+            values.extend([0] * extra)
+        self._free_slots.extend(range(size + extra - 1, size - 1, -1))
@@ -0,0 +1,134 @@
+from array import array
+from collections import OrderedDict
+import math
+
+import numpy as np
+
+# Backend selection by number of nodes when the backend is "auto"
+DENSE_MAX_NODES = 2000 # n² Python floats: ~128 MB at 2000 nodes
+TRIANGULAR_MAX_NODES = 6000 # n²/2 doubles: ~144 MB at 6000 nodes, above that distances are computed on demand
+ROW_CACHE_SIZE = 256
+
+# Distance backends. EVRPTWInstance.distances is one of them; all are indexed like the flat dense list,
+# distances[u * n + v], and return the same (Euclidean) values. The dense backend is that plain list itself.
+# row(u) returns the distances from u to every node, indexable by node.
+
+def dense_distances(x: list[float], y: list[float]) -> list[float]:
+    """Dense backend: the full n x n matrix as a flat list (fastest, O(n²) memory)."""
+    n = len(x)
+    distances = [0.0] * (n * n)
+    for u in range(n):
+        for v in range(n):
+            if u != v:
+                distances[u * n + v] = euclidean(x[u], y[u], x[v], y[v])
+    return distances
+
+def euclidean(x1: float, y1: float, x2: float, y2: float) -> float:
+    return math.sqrt((x1 - x2)**2 + (y1 - y2)**2)
+
+class TriangularDistances:
+    """Symmetric backend: stores the strictly lower triangle (u > v) row by row, half the memory of the dense matrix.
+    Appending nodes only appends rows, the stored entries do not move."""
+    def __init__(self, x: list[float], y: list[float]) -> None:
+        self.num_nodes = 0
+        self.values = array("d")
+        self.extend(x, y)
+
+    @classmethod
+    def from_values(cls, values, num_nodes: int) -> 'TriangularDistances':
+        """Wraps stored lower triangle values (e.g. a memoryview of shared memory) without copying them."""
+        distances = cls.__new__(cls)
+        distances.num_nodes = num_nodes
+        distances.values = values
+        return distances
+
+    def extend(self, x: list[float], y: list[float]) -> None:
+        """Adds the nodes with the given coordinates (x, y are the coordinates of all nodes, old ones first)."""
+        xs, ys = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        for u in range(self.num_nodes, len(xs)):
+            self.values.frombytes(np.sqrt((xs[u] - xs[:u])**2 + (ys[u] - ys[:u])**2).tobytes())
+        self.num_nodes = len(xs)
+
+    def __len__(self) -> int:
+        return self.num_nodes * self.num_nodes
+
+    def __getitem__(self, index: int) -> float:
+        u, v = divmod(index, self.num_nodes)
+        if u > v:
+            return self.values[u * (u - 1) // 2 + v]
+        if u < v:
+            return self.values[v * (v - 1) // 2 + u]
+        return 0.0
+
+    def row(self, u: int) -> np.ndarray:
+        n = self.num_nodes
+        values = np.frombuffer(self.values, dtype=np.float64)
+        result = np.empty(n)
+        result[:u] = values[u * (u - 1) // 2:u * (u - 1) // 2 + u]
+        result[u] = 0.0
+        v = np.arange(u + 1, n)
+        result[u + 1:] = values[v * (v - 1) // 2 + u]
+        return result
+
+class EuclideanDistances:
+    """On-demand backend: distances are computed from the coordinates when needed, O(n) memory.
+    The most recently used rows are cached (LRU), single distances are computed directly if their row is not cached."""
+    def __init__(self, x: list[float], y: list[float], cache_size: int = ROW_CACHE_SIZE) -> None:
+        self.x = array("d", x)
+        self.y = array("d", y)
+        self.num_nodes = len(self.x)
+        self.cache_size = cache_size
+        self._rows: OrderedDict[int, np.ndarray] = OrderedDict()
+
+    def extend(self, x: list[float], y: list[float]) -> None:
+        self.x.extend(x[self.num_nodes:])
+        self.y.extend(y[self.num_nodes:])
+        self.num_nodes = len(self.x)
+        self._rows.clear()
+
+    def __len__(self) -> int:
+        return self.num_nodes * self.num_nodes
+
+    def __getitem__(self, index: int) -> float:
+        u, v = divmod(index, self.num_nodes)
+        row = self._rows.get(u)
+        if row is not None:
+            return float(row[v])
+        x, y = self.x, self.y
+        return math.sqrt((x[u] - x[v])**2 + (y[u] - y[v])**2)
+
+    def row(self, u: int) -> np.ndarray:
+        row = self._rows.get(u)
+        if row is not None:
+            self._rows.move_to_end(u)
+            return row
+        xs = np.frombuffer(self.x, dtype=np.float64)
+        ys = np.frombuffer(self.y, dtype=np.float64)
+        row = np.sqrt((xs - self.x[u])**2 + (ys - self.y[u])**2)
+        row.flags.writeable = False
+        self._rows[u] = row
+        if len(self._rows) > self.cache_size:
+            self._rows.popitem(last=False)
+        return row
+
+BACKENDS = ["auto", "dense", "triangular", "on_demand"]
+
+def select_backend(num_nodes: int, backend: str = "auto") -> str:
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown distance backend: {backend} (expected one of {BACKENDS})")
+    if backend != "auto":
+        return backend
+    if num_nodes <= DENSE_MAX_NODES:
+        return "dense"
+    if num_nodes <= TRIANGULAR_MAX_NODES:
+        return "triangular"
+    return "on_demand"
+
+def build_distances(x: list[float], y: list[float], backend: str = "auto"):
+    """Creates the distance backend for nodes with the given coordinates."""
+    backend = select_backend(len(x), backend)
+    if backend == "dense":
+        return dense_distances(x, y)
+    if backend == "triangular":
+        return TriangularDistances(x, y)
+    return EuclideanDistances(x, y)
@@ -31,12 +31,15 @@ class EVRPTWInstance:
     vehicle_energy_capacity: float # max energy
     vehicle_energy_consumption: float # distance -> energy
     inverse_recharging_rate: float # time -> energy
-    distances: list[float]
+    distances: list[float] # flat n x n list, or a backend of model/distances.py indexed the same way
 
     # For quick access
     customer_ids: list[int] = None
     station_ids: list[int] = None
     depot_id: int = None
+    # Per node: the stations worth trying directly before / after the customer (see data/station_reduction.py)
+    stations_before: list[list[int]] = None
+    stations_after: list[list[int]] = None
 
     def __post_init__(self):
         self.customer_ids = []
@@ -50,9 +53,20 @@ class EVRPTWInstance:
             elif node.kind == NodeKind.Depot:
                 self.depot_id = i
 
+        # Without preprocessing every station is a candidate
+        self.stations_before = [self.station_ids] * self.num_nodes
+        self.stations_after = [self.station_ids] * self.num_nodes
+
     def distance(self, u: int, v: int) -> float:
         return self.distances[u * self.num_nodes + v]
 
+    def distance_row(self, u: int):
+        """Returns the distances from u to every node (a slice of the dense storage, or the row of the backend)."""
+        row = getattr(self.distances, "row", None)
+        if row is not None:
+            return row(u)
+        return self.distances[u * self.num_nodes:(u + 1) * self.num_nodes]
+
     def travel_time(self, u: int, v: int) -> float:
         return self.distances[u * self.num_nodes + v]
 
@@ -16,7 +16,9 @@ class Solution:
         return self.total_distance
 
     def copy(self) -> 'Solution':
-        return Solution(routes=[list(route) for route in self.routes])
+        copied = Solution(routes=[list(route) for route in self.routes])
+        copied.total_distance = self.total_distance
+        return copied
     
     def __str__(self) -> str:
         return f"Solution:\nRoutes={self.routes}\nTotal distance={self.total_distance}"
@@ -0,0 +1,4 @@
+from .server import SolveService, serve
+from .client import SolveClient
+
+__all__ = ["SolveService", "serve", "SolveClient"]
@@ -0,0 +1,52 @@
+import json
+import time
+from urllib import request
+from urllib.error import HTTPError
+
+class SolveClient:
+    """Minimal client of the solve service (standard library only)."""
+    def __init__(self, url: str = "http://127.0.0.1:8765", timeout: float = 600.0) -> None:
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, payload: dict = None, timeout: float = None) -> dict:
+        data = json.dumps(payload).encode() if payload is not None else None
+        req = request.Request(self.url + path, data=data, method=method, headers={"Content-Type": "application/json"})
+        try:
+            with request.urlopen(req, timeout=timeout or self.timeout) as response:
+                return json.loads(response.read())
+        except HTTPError as e:
+            raise RuntimeError(f"{method} {path} failed ({e.code}): {json.loads(e.read()).get('error')}") from None
+
+    def health(self) -> dict:
+        return self._request("GET", "/health")
+
+    def submit(self, instance: str = None, instance_path: str = None, mode: str = "alns", time_limit: float = None, config: dict = None) -> str:
+        """Submits a job with the instance text or path and returns its id."""
+        payload = {"mode": mode, "time_limit": time_limit, "config": config or {}}
+        if instance is not None:
+            payload["instance"] = instance
+        else:
+            payload["instance_path"] = str(instance_path)
+        return self._request("POST", "/jobs", payload)["job_id"]
+
+    def status(self, job_id: str) -> dict:
+        return self._request("GET", f"/jobs/{job_id}")
+
+    def cancel(self, job_id: str) -> dict:
+        return self._request("DELETE", f"/jobs/{job_id}")
+
+    def wait(self, job_id: str, poll: float = 5.0, timeout: float = None) -> dict:
+        """Long-polls until the job is finished and returns its final status."""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            status = self._request("GET", f"/jobs/{job_id}?wait={poll}", timeout=poll + 30)
+            if status["status"] not in ("queued", "running"):
+                return status
+            if deadline is not None and time.time() > deadline:
+                return status
+
+    def solve(self, instance: str = None, instance_path: str = None, mode: str = "alns", time_limit: float = None, config: dict = None) -> dict:
+        """Submits a job and waits for its result."""
+        job_id = self.submit(instance, instance_path, mode, time_limit, config)
+        return self.wait(job_id)
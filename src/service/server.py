@@ -0,0 +1,296 @@
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+import json
+import multiprocessing
+import signal
+import time
+import uuid
+from urllib.parse import urlsplit, parse_qs
+
+from .worker import MODES, warm_up, solve_job
+
+MAX_BODY_SIZE = 64 * 1024 * 1024
+FINISHED_JOB_TTL = 3600.0 # seconds a finished job stays queryable
+MAX_FINISHED_JOBS = 1000
+
+@dataclass
+class Job:
+    job_id: str
+    instance_text: str | None # dropped once the job is dispatched or cancelled
+    mode: str
+    time_limit: float | None
+    config: dict
+    status: str = "queued" # queued, running, done, failed, cancelled
+    result: dict | None = None
+    error: str | None = None
+    best_distance: float | None = None # final best distance, while running it is read from the shared progress
+    submitted: float = field(default_factory=time.time)
+    finished: float | None = None
+    done_event: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def finish(self, status: str) -> None:
+        self.status = status
+        self.instance_text = None
+        self.finished = time.time()
+        self.done_event.set()
+
+    def to_dict(self, best_distance: float = None) -> dict:
+        return {
+            "job_id": self.job_id,
+            "mode": self.mode,
+            "status": self.status,
+            "best_distance": best_distance,
+            "result": self.result,
+            "error": self.error,
+        }
+
+class SolveService:
+    """Job queue in front of a warm process pool.
+    At most max_concurrent jobs run at a time, at most max_queue jobs wait. Queued jobs are cancelled
+    immediately, running ones through a shared cancel flag that the worker checks while it searches.
+    Finished jobs are kept for finished_ttl seconds, and at most max_finished of them (the oldest are dropped first).
+    """
+    def __init__(self, max_concurrent: int = 2, max_queue: int = 100, finished_ttl: float = FINISHED_JOB_TTL,
+                 max_finished: int = MAX_FINISHED_JOBS) -> None:
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.finished_ttl = finished_ttl
+        self.max_finished = max_finished
+        self.jobs: dict[str, Job] = {}
+        self._queue: asyncio.Queue | None = None
+        self._executor: ProcessPoolExecutor | None = None
+        self._manager = None
+        self._consumers: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._manager = multiprocessing.Manager()
+        self.cancel_flags = self._manager.dict()
+        self.progress = self._manager.dict()
+        self._executor = ProcessPoolExecutor(max_workers=self.max_concurrent, initializer=warm_up)
+        # Start the workers now, so the first job does not pay for the imports
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self._executor, warm_up) for _ in range(self.max_concurrent)])
+        self._consumers = [asyncio.create_task(self._consume()) for _ in range(self.max_concurrent)]
+
+    async def stop(self) -> None:
+        for job in self.jobs.values():
+            if job.status in ("queued", "running"):
+                self.cancel(job.job_id)
+        # Running jobs see their cancel flag and return, the manager must live until they did
+        await asyncio.get_running_loop().run_in_executor(None, partial(self._executor.shutdown, wait=True, cancel_futures=True))
+        for consumer in self._consumers:
+            consumer.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self._manager.shutdown()
+
+    def submit(self, instance_text: str, mode: str, time_limit: float = None, config: dict = None) -> Job:
+        """Queues a job. Raises ValueError for an unknown mode and asyncio.QueueFull if the queue is full."""
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode: {mode} (expected one of {MODES})")
+
+        self.evict_finished()
+        job = Job(uuid.uuid4().hex, instance_text, mode, time_limit, config or {})
+        self._queue.put_nowait(job)
+        self.jobs[job.job_id] = job
+        return job
+
+    def cancel(self, job_id: str) -> Job:
+        job = self.jobs[job_id]
+        if job.status == "queued":
+            job.finish("cancelled")
+        elif job.status == "running":
+            self.cancel_flags[job_id] = True
+        return job
+
+    @property
+    def queue_size(self) -> int:
+        return self._queue.qsize()
+
+    def status(self, job_id: str) -> dict:
+        job = self.jobs[job_id]
+        return job.to_dict(self.progress.get(job_id) if job.status == "running" else job.best_distance)
+
+    def evict_finished(self) -> None:
+        """Drops the finished jobs older than finished_ttl, then the oldest ones above max_finished."""
+        finished = sorted((job for job in self.jobs.values() if job.finished is not None), key=lambda job: job.finished)
+        expired = time.time() - self.finished_ttl
+        for i, job in enumerate(finished):
+            if job.finished < expired or len(finished) - i > self.max_finished:
+                del self.jobs[job.job_id]
+
+    async def wait(self, job_id: str, timeout: float = None) -> dict:
+        """Waits until the job is finished (or the timeout expires) and returns its status."""
+        job = self.jobs[job_id]
+        try:
+            await asyncio.wait_for(job.done_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.status(job_id)
+
+    async def _consume(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            if job.status == "cancelled":
+                continue
+
+            job.status = "running"
+            status = "failed"
+            try:
+                future = loop.run_in_executor(
+                    self._executor, solve_job,
+                    job.job_id, job.instance_text, job.mode, job.time_limit, job.config, self.cancel_flags, self.progress
+                )
+                job.instance_text = None # the worker has its own copy
+                job.result = await future
+                if job.result.get("error") is not None:
+                    job.error = job.result.pop("error")
+                else:
+                    status = "cancelled" if job.result["cancelled"] else "done"
+                    job.best_distance = job.result["total_distance"]
+            except Exception as e:
+                job.error = f"{type(e).__name__}: {e}"
+            finally:
+                self.cancel_flags.pop(job.job_id, None)
+                self.progress.pop(job.job_id, None)
+                job.finish(status)
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+async def handle_connection(service: SolveService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Serves one HTTP/1.1 request (JSON in, JSON out, one request per connection).
+    POST   /jobs                 {"instance": text | "instance_path": path, "mode": ..., "time_limit": s, "config": {...}}
+    GET    /jobs                 list of all jobs
+    GET    /jobs/<id>?wait=<s>   status, waits up to s seconds for the job to finish
+    DELETE /jobs/<id>            cancels the job
+    GET    /health
+    """
+    try:
+        try:
+            method, path, query, body = await read_request(reader)
+            status, payload = await route_request(service, method, path, query, body)
+        except HttpError as e:
+            status, payload = e.status, {"error": str(e)}
+        except (ValueError, json.JSONDecodeError) as e:
+            status, payload = 400, {"error": str(e)}
+        except Exception as e:
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+
+        data = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode() + data
+        )
+        await writer.drain()
+    finally:
+        writer.close()
+
+HTTP_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+async def read_request(reader: asyncio.StreamReader) -> tuple[str, str, dict, dict]:
+    request_line = (await reader.readline()).decode().strip()
+    if not request_line:
+        raise HttpError(400, "Empty request")
+    method, target, _ = request_line.split(" ", 2)
+
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode().strip()
+        if not line:
+            break
+        name, value = line.split(":", 1)
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY_SIZE:
+        raise HttpError(413, "Request body too large")
+    body = json.loads(await reader.readexactly(length)) if length else {}
+    if not isinstance(body, dict):
+        raise HttpError(400, "Request body must be a JSON object")
+
+    url = urlsplit(target)
+    query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+    return method, url.path.rstrip("/"), query, body
+
+async def route_request(service: SolveService, method: str, path: str, query: dict, body: dict) -> tuple[int, dict]:
+    parts = [part for part in path.split("/") if part]
+
+    if parts == ["health"]:
+        return 200, {"status": "ok", "queued": service.queue_size, "max_concurrent": service.max_concurrent}
+
+    if parts == ["jobs"]:
+        if method == "GET":
+            service.evict_finished()
+            return 200, {"jobs": [service.status(job_id) for job_id in service.jobs]}
+        if method != "POST":
+            raise HttpError(405, f"{method} not allowed")
+        if "instance" in body:
+            instance_text = body["instance"]
+        elif "instance_path" in body:
+            try:
+                with open(body["instance_path"]) as f:
+                    instance_text = f.read()
+            except FileNotFoundError:
+                raise HttpError(404, f"Instance file not found: {body['instance_path']}")
+            except (OSError, TypeError) as e:
+                raise HttpError(400, f"Cannot read instance_path: {e}")
+        else:
+            raise HttpError(400, "Either instance or instance_path is required")
+        try:
+            job = service.submit(instance_text, body.get("mode", "alns"), body.get("time_limit"), body.get("config"))
+        except asyncio.QueueFull:
+            raise HttpError(503, "Job queue is full")
+        return 202, service.status(job.job_id)
+
+    if len(parts) == 2 and parts[0] == "jobs":
+        job_id = parts[1]
+        if job_id not in service.jobs:
+            raise HttpError(404, f"Unknown job {job_id}")
+        if method == "GET":
+            if "wait" in query:
+                return 200, await service.wait(job_id, float(query["wait"]))
+            return 200, service.status(job_id)
+        if method == "DELETE":
+            service.cancel(job_id)
+            return 200, service.status(job_id)
+        raise HttpError(405, f"{method} not allowed")
+
+    raise HttpError(404, f"Unknown path {path}")
+
+async def serve(host: str = "127.0.0.1", port: int = 8765, max_concurrent: int = 2, max_queue: int = 100,
+                finished_ttl: float = FINISHED_JOB_TTL, max_finished: int = MAX_FINISHED_JOBS) -> None:
+    service = SolveService(max_concurrent=max_concurrent, max_queue=max_queue, finished_ttl=finished_ttl, max_finished=max_finished)
+    await service.start()
+    server = await asyncio.start_server(lambda r, w: handle_connection(service, r, w), host, port)
+    print(f"[INFO] Solve service listening on http://{host}:{port} ({max_concurrent} workers)")
+
+    # SIGINT/SIGTERM shut the service down cleanly, including the worker and manager processes
+    shutdown = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, shutdown.set)
+
+    try:
+        async with server:
+            await shutdown.wait()
+    finally:
+        await service.stop()
+
+def main() -> None:
+    """Entry point: python -m service [--host ...] [--port ...] [--workers ...] (run from src/)."""
+    parser = argparse.ArgumentParser(description="Local E-VRPTW solve service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2, help="maximum number of concurrently running jobs")
+    parser.add_argument("--max-queue", type=int, default=100)
+    parser.add_argument("--job-ttl", type=float, default=FINISHED_JOB_TTL, help="seconds a finished job stays queryable")
+    parser.add_argument("--max-finished", type=int, default=MAX_FINISHED_JOBS, help="maximum number of finished jobs kept")
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, args.workers, args.max_queue, args.job_ttl, args.max_finished))
@@ -0,0 +1,118 @@
+from collections import OrderedDict
+import hashlib
+import time
+
+from alns.stop import MaxIterations, MaxRuntime
+
+from data import parse_evrptw_instance
+from model.instance import EVRPTWInstance
+from construction import construct_greedy_solution
+from local_search import local_search
+from alns_solve import run_alns, load_alns_config
+
+MODES = ["construct", "local_search", "alns"]
+# Config sections whose work runs outside the ALNS stopping criterion: off in jobs, and forced off with a time limit
+JOB_DISABLED = {"lower_bound": {"enabled": False, "stop_gap": None}, "route_pool": {"enabled": False}}
+INSTANCE_CACHE_SIZE = 16
+
+# Parsed instances of this worker process, by the hash of the instance text
+_instance_cache: OrderedDict[str, EVRPTWInstance] = OrderedDict()
+
+def warm_up() -> None:
+    """Pool initializer: the imports above are done once per worker, this also loads the ALNS config."""
+    load_alns_config()
+
+def instance_key(instance_text: str) -> str:
+    return hashlib.sha1(instance_text.encode()).hexdigest()
+
+def cached_instance(instance_text: str) -> EVRPTWInstance:
+    """Returns the parsed instance, parsing it only if it is not in the cache of this worker."""
+    key = instance_key(instance_text)
+    instance = _instance_cache.get(key)
+    if instance is None:
+        instance = parse_evrptw_instance(instance_text)
+        _instance_cache[key] = instance
+        if len(_instance_cache) > INSTANCE_CACHE_SIZE:
+            _instance_cache.popitem(last=False)
+    else:
+        _instance_cache.move_to_end(key)
+    return instance
+
+class JobStop:
+    """ALNS stopping criterion of a job: time budget, iteration limit or cancellation, whichever comes first.
+    The shared cancel flags are only read every check_every calls, because every read is a round trip to the manager.
+    """
+    def __init__(self, job_id: str, cancel_flags, time_limit: float = None, max_iterations: int = None, check_every: int = 10) -> None:
+        self.job_id = job_id
+        self.cancel_flags = cancel_flags
+        self.criteria = []
+        if time_limit is not None:
+            self.criteria.append(MaxRuntime(time_limit))
+        if max_iterations is not None:
+            self.criteria.append(MaxIterations(max_iterations))
+        self.check_every = check_every
+        self._calls = 0
+        self.cancelled = False
+
+    def __call__(self, rng, best, current) -> bool:
+        # Every criterion is called, so all of them keep their own state up to date
+        stopped = [criterion(rng, best, current) for criterion in self.criteria]
+        self._calls += 1
+        if self._calls % self.check_every == 0 and self.cancel_flags.get(self.job_id, False):
+            self.cancelled = True
+        return self.cancelled or any(stopped)
+
+def solve_job(job_id: str, instance_text: str, mode: str, time_limit: float, config_overrides: dict, cancel_flags, progress) -> dict:
+    """Worker task: solves one job and returns its result.
+    The best distance found so far is published in progress[job_id] while the job runs.
+    If the construction finds no feasible solution, the result only has the error (the job fails).
+    """
+    t_start = time.perf_counter()
+    instance = cached_instance(instance_text)
+
+    solution = construct_greedy_solution(instance)
+    if solution is None:
+        return {"error": "No feasible initial solution found", "cancelled": False, "runtime": time.perf_counter() - t_start}
+    progress[job_id] = solution.total_distance
+    stats = {"total_iterations": 0}
+    cancelled = False
+
+    if mode == "local_search":
+        def should_stop() -> bool:
+            nonlocal cancelled
+            cancelled = cancelled or cancel_flags.get(job_id, False)
+            return cancelled or (time_limit is not None and time.perf_counter() - t_start > time_limit)
+
+        solution = local_search(instance, solution, stats=stats, should_stop=should_stop)
+    elif mode == "alns":
+        config = load_alns_config()
+        overrides = [JOB_DISABLED, config_overrides or {}]
+        if time_limit is not None:
+            overrides.append(JOB_DISABLED)
+        for section in overrides:
+            for key, value in section.items():
+                if isinstance(value, dict):
+                    config.setdefault(key, {}).update(value)
+                else:
+                    config[key] = value
+
+        remaining = None if time_limit is None else max(0.0, time_limit - (time.perf_counter() - t_start))
+        stop = JobStop(job_id, cancel_flags, time_limit=remaining, max_iterations=config["num_iterations"])
+
+        def on_best(state, rng, **kwargs) -> None:
+            progress[job_id] = state.objective()
+
+        solution = run_alns(instance, solution, stats=stats, config=config, stop=stop, on_best=on_best)
+        cancelled = stop.cancelled
+    elif mode != "construct":
+        raise ValueError(f"Unknown mode: {mode}")
+
+    progress[job_id] = solution.total_distance
+    return {
+        "total_distance": solution.total_distance,
+        "num_vehicles": len(solution.routes),
+        "routes": [[instance.nodes[node].string_id for node in route] for route in solution.routes],
+        "iterations": stats["total_iterations"],
+        "runtime": time.perf_counter() - t_start,
+        "cancelled": cancelled,
+    }
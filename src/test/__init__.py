@@ -1,14 +1,14 @@
-from .verifier import run_verifier_all_solutions_in_directories, run_verifier_on_single_solution
-from .run_heuristic import run_heuristic_on_all_instances
-from .heuristic_mode import HeuristicMode
-from .parameter_tuning import tune_wait_time_weight_on_folder
-from .multi_seed_run import multi_seed_alns_experiment
+from common.lazy_exports import lazy_exports
 
-__all__ = [
-    "run_verifier_all_solutions_in_directories",
-    "run_verifier_on_single_solution",
-    "run_heuristic_on_all_instances",
-    "tune_wait_time_weight_on_folder",
-    "multi_seed_alns_experiment",
-    "HeuristicMode",
-]
\ No newline at end of file
+# Exported name -> submodule, imported on first access: the verifier does not need the solvers
+_EXPORTS = {
+    "run_verifier_all_solutions_in_directories": ".verifier",
+    "run_verifier_on_single_solution": ".verifier",
+    "run_heuristic_on_all_instances": ".run_heuristic",
+    "tune_wait_time_weight_on_folder": ".parameter_tuning",
+    "multi_seed_alns_experiment": ".multi_seed_run",
+    "HeuristicMode": ".heuristic_mode",
+}
+
+__all__ = list(_EXPORTS)
+lazy_exports(__name__)
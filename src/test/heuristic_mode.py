@@ -3,4 +3,7 @@ from enum import Enum, auto
 class HeuristicMode(Enum):
     CONSTRUCT_ONLY = auto()
     CONSTRUCT_LOCAL = auto()
-    CONSTRUCT_ALNS = auto()
\ No newline at end of file
+    CONSTRUCT_ALNS = auto()
+    CONSTRUCT_ISLAND_ALNS = auto()
+    CONSTRUCT_DECOMPOSITION = auto()
+    CONSTRUCT_RACING = auto()
\ No newline at end of file
@@ -1,9 +1,11 @@
 import json
 from pathlib import Path
 
+from data import ResultsStore, ResultCache, RunArchive, config_label
 from .run_heuristic import run_heuristic_on_all_instances
 
-def multi_seed_alns_experiment(instance_folder, base_solution_folder, base_log_folder, base_config_path, seed_values, mode):
+def multi_seed_alns_experiment(instance_folder, base_solution_folder, base_log_folder, base_config_path, seed_values, mode, results_path=None, warm_start=False,
+                               cache_path=None, force=False, archive_path=None):
     instance_folder = Path(instance_folder)
     base_solution_folder = Path(base_solution_folder)
     base_log_folder = Path(base_log_folder)
@@ -12,6 +14,21 @@ def multi_seed_alns_experiment(instance_folder, base_solution_folder, base_log_f
     with open(base_config_path) as f:
         base_config = json.load(f)
 
+    results_store = ResultsStore(results_path) if results_path is not None else None
+    result_cache = ResultCache(cache_path) if cache_path is not None else None
+    # Archive mode: the solutions and logs of every seed go into one archive file instead of the seed folders
+    archive = RunArchive(archive_path) if archive_path is not None else None
+
+    # Warm start: every seed continues from the best solution saved by any seed of the previous runs
+    if not warm_start:
+        warm_start_folders = None
+    elif archive is not None:
+        warm_start_folders = archive
+    else:
+        warm_start_folders = [
+            base_solution_folder.parent / f"{base_solution_folder.name}_seed{seed}" for seed in seed_values
+        ]
+
     for seed in seed_values:
         config = base_config.copy()
         config['seed'] = seed
@@ -26,7 +43,17 @@ def multi_seed_alns_experiment(instance_folder, base_solution_folder, base_log_f
             instance_folder=str(instance_folder),
             solution_folder=str(solution_folder),
             mode=mode,
-            log_folder=str(log_folder)
+            log_folder=str(log_folder),
+            results_store=results_store,
+            seed=seed,
+            config=config_label(config),
+            warm_start_folder=warm_start_folders,
+            result_cache=result_cache,
+            force=force,
+            archive=archive
         )
 
+    if archive is not None:
+        archive.close()
+
     print("\n=== ALL SEEDS READY ===")
@@ -1,15 +1,20 @@
 import json
+import time
 from pathlib import Path
 from collections import Counter
 import csv
 
 from construction import construct_greedy_solution
-from data import read_evrptw_instance, save_solution_to_file
+from data import read_evrptw_instance, save_solution_to_file, ResultsStore, ResultCache, job_key
+from model import Solution
 
-def tune_wait_time_weight_on_folder(instance_folder: str, solution_folder: str, config_path: str, weight_values):
+def tune_wait_time_weight_on_folder(instance_folder: str, solution_folder: str, config_path: str, weight_values, results_path: str = None,
+                                   cache_path: str = None, force: bool = False):
     instance_folder = Path(instance_folder)
     config_path = Path(config_path)
     results = []
+    results_store = ResultsStore(results_path) if results_path is not None else None
+    result_cache = ResultCache(cache_path) if cache_path is not None else None
 
     for instance_file in sorted(instance_folder.glob("*.txt")):
         instance_name = instance_file.stem
@@ -21,11 +26,26 @@ def tune_wait_time_weight_on_folder(instance_folder: str, solution_folder: str,
         best_solution = None
         distances = {}
 
+        base_config = json.loads(config_path.read_text()) if config_path.exists() else {} # keeps the other sections
         for w in weight_values:
             with open(config_path, 'w') as f:
-                json.dump({"wait_time_weight": w}, f)
+                json.dump({**base_config, "wait_time_weight": w}, f)
 
-            solution = construct_greedy_solution(instance)
+            cached = None
+            if result_cache is not None:
+                cache_key = job_key(instance_file, "CONSTRUCT_ONLY", -1, {"construction": {"wait_time_weight": w}})
+                cached = None if force else result_cache.get(cache_key)
+
+            if cached is not None:
+                solution = Solution(routes=cached["routes"])
+                solution.compute_total_distance(instance)
+                elapsed = cached["summary"]["time"]
+            else:
+                start = time.time()
+                solution = construct_greedy_solution(instance)
+                elapsed = time.time() - start
+                if result_cache is not None and solution is not None:
+                    result_cache.put(cache_key, solution.routes, {"distance": solution.total_distance, "time": elapsed})
             if solution is None:
                 print(f"Weight {w}: NO FEASIBLE SOLUTION")
                 continue
@@ -33,6 +53,10 @@ def tune_wait_time_weight_on_folder(instance_folder: str, solution_folder: str,
             distances[w] = distance
             print(f"Weight {w}: Distance = {distance:.3f}")
 
+            if results_store is not None:
+                results_store.append(instance_name, "construction", distance, elapsed, len(solution.routes),
+                                     config=f"wait_time_weight={w}")
+
             if distance < best_distance:
                 best_distance = distance
                 best_weight = w
@@ -52,6 +76,9 @@ def tune_wait_time_weight_on_folder(instance_folder: str, solution_folder: str,
         else:
             print(f"  {instance_name}: NO FEASIBLE SOLUTION for any weight.")
 
+    if results_store is not None:
+        results_store.flush()
+
     best_weights = [r["best_weight"] for r in results if r["best_weight"] is not None]
     print("\nTuning summary:")
     print("Best weights distribution:", Counter(best_weights))
@@ -1,18 +1,44 @@
 from pathlib import Path
 import time
 
-from data import read_evrptw_instance, save_solution_to_file
-from construction import construct_greedy_solution
-from local_search import local_search
-from alns_solve import run_alns
+from data import read_evrptw_instance, save_solution_to_file, solution_to_text, save_log, find_warm_start, ResultsStore, ResultCache, RunArchive, job_key
+from model import Solution
+from common.memory_profile import memory_profiling, memory_phase, format_bytes
+from construction import construct_greedy_solution, construct_portfolio, load_construction_config
+from alns_solve import load_alns_config
 from .heuristic_mode import HeuristicMode
 
-def run_heuristic_on_all_instances(instance_folder: str, solution_folder: str, mode: HeuristicMode, log_folder: str = None) -> None:
+# Phase name of the improvement step of every mode, in the results store and the memory log
+IMPROVEMENT_PHASES = {
+    HeuristicMode.CONSTRUCT_LOCAL: "local_search",
+    HeuristicMode.CONSTRUCT_ALNS: "alns",
+    HeuristicMode.CONSTRUCT_ISLAND_ALNS: "island_alns",
+    HeuristicMode.CONSTRUCT_DECOMPOSITION: "decomposition",
+    HeuristicMode.CONSTRUCT_RACING: "racing",
+}
+
+def run_heuristic_on_all_instances(instance_folder: str, solution_folder: str, mode: HeuristicMode, log_folder: str = None,
+                                   results_store: ResultsStore = None, seed: int = -1, config: str = "", warm_start_folder=None,
+                                   result_cache: ResultCache = None, force: bool = False, archive: RunArchive = None,
+                                   memory: bool = False) -> None:
+    """Solves every instance of the folder with the given mode.
+    If a results store is given, one row per instance and phase is appended to it (tagged with the seed and config).
+    If a warm start folder (or a list of folders) is given, the best saved solution of an instance found there
+    replaces the constructed initial solution.
+    If a result cache is given, instances already solved with the same instance file, mode, seed, config and solver
+    code are restored from the cache instead of being solved again (unless force is set).
+    If a run archive is given, the solutions and the logs are written into it (keyed by instance, seed and phase)
+    instead of the solution and log folders.
+    If memory is set, the allocations and the RSS of the construction, the improvement phase, the ALNS operators and
+    the logging are measured (see common/memory_profile.py) and written into a memory log per instance.
+    The improvement phase is imported only for the modes that use it (the alns library is slow to import).
+    """
     instance_folder = Path(instance_folder)
     solution_folder = Path(solution_folder)
-    solution_folder.mkdir(parents=True, exist_ok=True)
+    if archive is None:
+        solution_folder.mkdir(parents=True, exist_ok=True)
 
-    if log_folder is not None:
+    if log_folder is not None and archive is None:
         log_folder = Path(log_folder)
         log_folder.mkdir(parents=True, exist_ok=True)
         construction_log_folder = log_folder / "construction"
@@ -30,33 +56,141 @@ def run_heuristic_on_all_instances(instance_folder: str, solution_folder: str, m
 
         instance = read_evrptw_instance(instance_file)
 
-        construct_log_path = construction_log_folder / f"{instance_name}_log.json" if construction_log_folder else None
-        local_log_path = local_log_folder / f"{instance_name}_log.json" if local_log_folder else None
-        alns_log_path = alns_log_folder / f"{instance_name}_log.json" if alns_log_folder else None
-
-        start_construct = time.time()
-        initial_solution = construct_greedy_solution(instance, log_path=construct_log_path)
-        construct_time = time.time() - start_construct
-        construct_distance = initial_solution.total_distance
-
-        if mode == HeuristicMode.CONSTRUCT_ONLY:
-            final_solution = initial_solution
-            final_distance = construct_distance
-            final_time = construct_time
-        elif mode == HeuristicMode.CONSTRUCT_LOCAL:
-            start_local = time.time()
-            final_solution = local_search(instance, initial_solution, log_path=local_log_path)
-            final_time = time.time() - start_local
-            final_distance = final_solution.total_distance
-        elif mode == HeuristicMode.CONSTRUCT_ALNS:
-            start_alns = time.time()
-            final_solution = run_alns(instance, initial_solution, log_path=alns_log_path)
-            final_time = time.time() - start_alns
-            final_distance = final_solution.total_distance
+        if archive is not None:
+            construct_log_path, local_log_path, alns_log_path = (
+                archive.log(instance_name, seed, phase) for phase in ("construction", "local_search", "alns"))
         else:
-            raise ValueError(f"Unknown mode: {mode}")
+            construct_log_path = construction_log_folder / f"{instance_name}_log.json" if construction_log_folder else None
+            local_log_path = local_log_folder / f"{instance_name}_log.json" if local_log_folder else None
+            alns_log_path = alns_log_folder / f"{instance_name}_log.json" if alns_log_folder else None
+
+        initial_solution = find_warm_start(instance_name, instance, warm_start_folder) if warm_start_folder else None
+
+        cache_key = None
+        if result_cache is not None:
+            effective_config = {"construction": load_construction_config(), "alns": load_alns_config()}
+            warm_start_routes = initial_solution.routes if initial_solution is not None else None
+            cache_key = job_key(instance_file, mode.name, seed, effective_config, extra=warm_start_routes)
+            cached = None if force else result_cache.get(cache_key)
+            if cached is not None:
+                print(f"[CACHE] Result found, skipping (distance: {cached['summary']['final_distance']})")
+                cached_solution = Solution(routes=cached["routes"])
+                cached_solution.compute_total_distance(instance)
+                save_solution(cached_solution, instance, instance_name, solution_folder, archive, seed)
+                record_results(results_store, instance_name, mode, cached["summary"], seed, config)
+                continue
+
+        with memory_profiling(memory) as profiler:
+            with memory_phase("construction"):
+                start_construct = time.time()
+                initial_phase = "warm_start"
+                start_solutions = None
+                if initial_solution is None:
+                    construction_config = load_construction_config()
+                    if construction_config.get("portfolio", {}).get("enabled", False):
+                        top_k = load_alns_config()["islands"]["num_islands"] if mode == HeuristicMode.CONSTRUCT_ISLAND_ALNS else None
+                        start_solutions = construct_portfolio(instance, construction_config, top_k=top_k)
+                        initial_solution = start_solutions[0]
+                    else:
+                        initial_solution = construct_greedy_solution(instance, log_path=construct_log_path)
+                    initial_phase = "construction"
+                else:
+                    print(f"[INFO] Warm start from a saved solution with distance {initial_solution.total_distance}")
+            construct_time = time.time() - start_construct
+            construct_distance = initial_solution.total_distance
+            final_stats = {}
 
-        save_solution_to_file(final_solution, instance, solution_folder, f"{instance_name}.sol")
+            with memory_phase(IMPROVEMENT_PHASES.get(mode)):
+                if mode == HeuristicMode.CONSTRUCT_ONLY:
+                    final_solution = initial_solution
+                    final_distance = construct_distance
+                    final_time = construct_time
+                elif mode == HeuristicMode.CONSTRUCT_LOCAL:
+                    from local_search import local_search
+                    start_local = time.time()
+                    final_solution = local_search(instance, initial_solution, log_path=local_log_path, stats=final_stats)
+                    final_time = time.time() - start_local
+                    final_distance = final_solution.total_distance
+                elif mode == HeuristicMode.CONSTRUCT_ALNS:
+                    from alns_solve import run_alns
+                    start_alns = time.time()
+                    final_solution = run_alns(instance, initial_solution, log_path=alns_log_path, stats=final_stats)
+                    final_time = time.time() - start_alns
+                    final_distance = final_solution.total_distance
+                elif mode == HeuristicMode.CONSTRUCT_ISLAND_ALNS:
+                    from alns_solve import run_island_alns
+                    start_alns = time.time()
+                    final_solution = run_island_alns(instance, initial_solution, log_path=alns_log_path, stats=final_stats,
+                                                     start_solutions=start_solutions)
+                    final_time = time.time() - start_alns
+                    final_distance = final_solution.total_distance
+                elif mode == HeuristicMode.CONSTRUCT_DECOMPOSITION:
+                    from alns_solve import run_decomposition
+                    start_alns = time.time()
+                    final_solution = run_decomposition(instance, initial_solution, log_path=alns_log_path, stats=final_stats)
+                    final_time = time.time() - start_alns
+                    final_distance = final_solution.total_distance
+                elif mode == HeuristicMode.CONSTRUCT_RACING:
+                    from alns_solve import run_racing
+                    start_alns = time.time()
+                    final_solution = run_racing(instance, initial_solution, log_path=alns_log_path, stats=final_stats)
+                    final_time = time.time() - start_alns
+                    final_distance = final_solution.total_distance
+                else:
+                    raise ValueError(f"Unknown mode: {mode}")
+
+        if profiler is not None:
+            report_memory(profiler, instance_name, seed, log_folder, archive)
+
+        save_solution(final_solution, instance, instance_name, solution_folder, archive, seed)
 
         print(f"[RESULT] Construct → Distance: {construct_distance} | Time: {construct_time} sec")
         print(f"[RESULT] Final     → Distance: {final_distance} | Time: {final_time} sec")
+
+        summary = {
+            "initial_phase": initial_phase,
+            "construct_distance": construct_distance,
+            "construct_time": construct_time,
+            "construct_num_vehicles": len(initial_solution.routes),
+            "final_distance": final_distance,
+            "final_time": final_time,
+            "final_num_vehicles": len(final_solution.routes),
+            "num_iterations": final_stats.get("total_iterations", 0),
+        }
+        record_results(results_store, instance_name, mode, summary, seed, config)
+        if result_cache is not None:
+            result_cache.put(cache_key, final_solution.routes, summary)
+
+    if results_store is not None:
+        results_store.flush()
+    if archive is not None:
+        archive.flush()
+
+def save_solution(solution: Solution, instance, instance_name: str, solution_folder: Path, archive: RunArchive, seed: int) -> None:
+    """Saves the final solution into the archive if there is one, otherwise as <instance_name>.sol in the solution folder."""
+    if archive is not None:
+        archive.put_solution(instance_name, seed, solution_to_text(solution, instance))
+    else:
+        save_solution_to_file(solution, instance, solution_folder, f"{instance_name}.sol")
+
+def report_memory(profiler, instance_name: str, seed: int, log_folder, archive: RunArchive) -> None:
+    """Prints the memory peaks of the phases and saves the profiler report as the memory log of the instance."""
+    report = profiler.report()
+    peaks = ", ".join(f"{phase} {format_bytes(entry['peak'])}" for phase, entry in report["phases"].items())
+    print(f"[INFO] Memory peaks: {peaks} | max RSS: {format_bytes(report['max_rss'])}")
+    if archive is not None:
+        save_log(archive.log(instance_name, seed, "memory"), report)
+    elif log_folder is not None:
+        save_log(Path(log_folder) / "memory" / f"{instance_name}_log.json", report)
+
+def record_results(results_store: ResultsStore, instance_name: str, mode: HeuristicMode, summary: dict, seed: int, config: str) -> None:
+    """Appends the initial and the final phase row of a solved instance to the results store."""
+    if results_store is None:
+        return
+
+    results_store.append(instance_name, summary["initial_phase"], summary["construct_distance"], summary["construct_time"],
+                         summary["construct_num_vehicles"], seed=seed, config=config)
+    if mode != HeuristicMode.CONSTRUCT_ONLY:
+        phase = IMPROVEMENT_PHASES[mode]
+        results_store.append(instance_name, phase, summary["final_distance"], summary["final_time"], summary["final_num_vehicles"],
+                             num_iterations=summary["num_iterations"], seed=seed, config=config)